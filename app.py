@@ -1,66 +1,132 @@
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_file, send_from_directory, g, has_app_context, Response
+from werkzeug.wsgi import wrap_file
 import sqlite3
 import json
+import functools
+import hashlib
+import io
 from datetime import datetime
 import os
-import subprocess
-from pptx_builder import build_pptx_from_slides
+import re
+import tempfile
+import threading
+import time
+import asset_index
+import db
+import export_cache
+import export_jobs
+import image_renditions
+import markdown_renderer
+import preview_workspaces
+import slide_html
+from pptx_builder import build_pptx_from_decks
 
 app = Flask(__name__)
-DB_PATH = 'presentations.db'
+# PRESENTATIONS_DB lets scripts point the app at another database before it is imported (and migrated)
+DB_PATH = os.environ.get('PRESENTATIONS_DB', 'presentations.db')
+PPTX_TEMPLATE_PATH = 'templates/4734_template.potx'
+
+# Files (besides slide images) whose contents determine a deck export, by format
+EXPORT_DEPENDENCIES = {
+    'pptx': (PPTX_TEMPLATE_PATH, 'pptx_layouts.json'),
+    'odp': (PPTX_TEMPLATE_PATH, 'pptx_layouts.json'),
+    'pdf': ('presentation-styles.css', 'assets/title-background.jpg', 'assets/journalism_school_logo.png'),
+}
+
+def get_db():
+    """Return the SQLite connection for the current request, or for this thread outside a request"""
+    if not has_app_context():
+        return db.thread_connection(DB_PATH)
+    conn = g.get('db')
+    if conn is None:
+        conn = g.db = db.connect(DB_PATH)
+    return conn
+
+def db_writer():
+    """Serialized write transaction on the current connection: `with db_writer() as conn: ...`"""
+    return db.write_transaction(get_db(), DB_PATH)
+
+@app.teardown_appcontext
+def close_db(exc):
+    conn = g.pop('db', None)
+    if conn is not None:
+        conn.close()
+
+# Placeholders that slide text may contain: {assignment:Name} is replaced with the assignment's
+# due date, {{VAR}} with a deck/course variable (the same names build.js understands)
+SUBSTITUTION_PATTERN = re.compile(r'\{assignment:([^}]+)\}|\{\{([A-Z_]+)\}\}')
+
+def format_due_date(due_date):
+    """Format a YYYY-MM-DD due date as "Month Day" (e.g. "May 7")"""
+    try:
+        return datetime.strptime(due_date, '%Y-%m-%d').strftime('%B %-d')
+    except (TypeError, ValueError):
+        return due_date  # Fallback to original if parsing fails
+
+def load_substitutions(conn, **variables):
+    """Build the placeholder lookup table for one export.
+
+    Assignments are fetched and their dates formatted once; keyword arguments
+    (week, date, course_title, ...) become {{WEEK}}, {{DATE}}, {{COURSE_TITLE}}.
+    Returns a dict mapping placeholder text to its replacement.
+    """
+    substitutions = {}
+    try:
+        rows = conn.execute('SELECT name, due_date FROM assignments ORDER BY id').fetchall()
+    except sqlite3.OperationalError:
+        rows = []  # Assignments table may not exist in test DBs
+    for name, due_date in rows:
+        # First match wins, as with the old per-name lookup
+        substitutions.setdefault(f'{{assignment:{name}}}', format_due_date(due_date))
+    return with_variables(substitutions, **variables)
+
+def with_variables(substitutions, **variables):
+    """Return a copy of a substitution table with {{VAR}} entries added (e.g. per deck)"""
+    table = dict(substitutions)
+    for key, value in variables.items():
+        if value is not None:
+            table[f'{{{{{key.upper()}}}}}'] = str(value)
+    return table
+
+def substitute_text(text, substitutions):
+    """Replace every known placeholder in text; unknown placeholders are left as-is"""
+    if not text or '{' not in text:
+        return text
+    return SUBSTITUTION_PATTERN.sub(lambda m: substitutions.get(m.group(0), m.group(0)), text)
+
+def substitute_slide_row(slide, substitutions):
+    """Substitute placeholders in the text fields of a slide row.
+
+    Rows start with (slide_class, headline, paragraph, bullets, quote, quote_citation, ...);
+    bullets may be a JSON string or an already-decoded list.
+    """
+    slide = list(slide)
+    for i in (1, 2, 4, 5):
+        slide[i] = substitute_text(slide[i], substitutions)
+    bullets = slide[3]
+    if isinstance(bullets, list):
+        slide[3] = [substitute_text(b, substitutions) for b in bullets]
+    elif bullets and '{' in bullets:
+        try:
+            slide[3] = json.dumps([substitute_text(b, substitutions) for b in json.loads(bullets)])
+        except (ValueError, TypeError):
+            pass
+    return tuple(slide)
 
 def substitute_assignment_variables(text, conn=None):
-    """Replace {assignment:name} with 'Assignment Name - Due: Date'"""
+    """Replace {assignment:name} with the assignment's formatted due date"""
     if not text or '{assignment:' not in text:
         return text
-    
-    # Create connection if not provided
-    close_conn = False
-    if not conn:
-        conn = sqlite3.connect(DB_PATH)
-        close_conn = True
-    
-    c = conn.cursor()
-    
-    import re
-    # Find all {assignment:xxx} patterns
-    pattern = r'\{assignment:([^}]+)\}'
-    matches = re.findall(pattern, text)
-    
-    for assignment_name in matches:
-        # Look up the assignment
-        c.execute('SELECT name, due_date FROM assignments WHERE name = ?', (assignment_name,))
-        row = c.fetchone()
-        
-        if row:
-            # Parse date and format as "Month Day" (e.g., "May 7")
-            due_date = row[1]  # Format: YYYY-MM-DD
-            try:
-                date_obj = datetime.strptime(due_date, '%Y-%m-%d')
-                formatted_date = date_obj.strftime('%B %-d')  # "May 7"
-            except:
-                formatted_date = due_date  # Fallback to original if parsing fails
-            
-            replacement = formatted_date
-            text = text.replace(f'{{assignment:{assignment_name}}}', replacement)
-    
-    if close_conn:
-        conn.close()
-    
-    return text
+    return substitute_text(text, load_substitutions(conn or get_db()))
 
 def substitute_slide_content(content_dict, conn):
     """Apply assignment variable substitution to all slide content fields"""
-    if 'headline' in content_dict and content_dict['headline']:
-        content_dict['headline'] = substitute_assignment_variables(content_dict['headline'], conn)
-    if 'paragraph' in content_dict and content_dict['paragraph']:
-        content_dict['paragraph'] = substitute_assignment_variables(content_dict['paragraph'], conn)
-    if 'quote' in content_dict and content_dict['quote']:
-        content_dict['quote'] = substitute_assignment_variables(content_dict['quote'], conn)
-    if 'quote_citation' in content_dict and content_dict['quote_citation']:
-        content_dict['quote_citation'] = substitute_assignment_variables(content_dict['quote_citation'], conn)
-    if 'bullets' in content_dict and content_dict['bullets']:
-        content_dict['bullets'] = [substitute_assignment_variables(b, conn) for b in content_dict['bullets']]
+    substitutions = load_substitutions(conn)
+    for field in ('headline', 'paragraph', 'quote', 'quote_citation'):
+        if content_dict.get(field):
+            content_dict[field] = substitute_text(content_dict[field], substitutions)
+    if content_dict.get('bullets'):
+        content_dict['bullets'] = [substitute_text(b, substitutions) for b in content_dict['bullets']]
     return content_dict
 
 @app.route('/assets/<path:filename>')
@@ -75,10 +141,31 @@ def serve_html(filename):
         return send_from_directory('.', filename)
     return '', 404
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
+# Secondary indexes for the hot lookups (deck/slide tree, master cascade, modules,
+# assignment substitution and calendar short-code matching).
+# tests/test_query_plans.py fails if any of those queries falls back to a table scan.
+INDEXES = [
+    ('idx_slides_deck_order', 'slides', 'deck_id, order_index'),
+    ('idx_slides_master', 'slides', 'master_slide_id'),
+    ('idx_slides_module', 'slides', 'module, order_index'),
+    ('idx_decks_presentation_order', 'decks', 'presentation_id, order_index'),
+    ('idx_assignments_name', 'assignments', 'name, due_date'),
+    ('idx_assignments_semester_short', 'assignments', 'semester, short'),
+]
+
+def ensure_indexes(c):
+    """Create any missing secondary indexes from INDEXES"""
+    for name, table, columns in INDEXES:
+        c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+def _add_missing_column(c, table, column, definition):
+    c.execute(f"PRAGMA table_info({table})")
+    columns = [row[1] for row in c.fetchall()]
+    if column not in columns:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _migration_001_base_schema(c):
+    """Create the tables, backfilling columns on databases from before schema versioning"""
     # Presentations table
     c.execute('''CREATE TABLE IF NOT EXISTS presentations
                  (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -95,6 +182,12 @@ def init_db():
                   date TEXT,
                   order_index INTEGER,
                   notes TEXT,
+                  unit TEXT,
+                  reading_list TEXT,
+                  monday_details TEXT,
+                  wednesday_details TEXT,
+                  topic1 TEXT,
+                  topic2 TEXT,
                   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                   FOREIGN KEY (presentation_id) REFERENCES presentations(id) ON DELETE CASCADE)''')
     
@@ -123,6 +216,7 @@ def init_db():
                   module TEXT,
                   master_slide_id INTEGER,
                   fullscreen BOOLEAN DEFAULT 0,
+                  is_draft BOOLEAN DEFAULT 0,
                   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                   FOREIGN KEY (deck_id) REFERENCES decks(id) ON DELETE CASCADE)''')
 
@@ -134,30 +228,11 @@ def init_db():
                   due_date TEXT NOT NULL,
                   description TEXT,
                   points INTEGER DEFAULT 0,
+                  short TEXT,
+                  canvas_assignment_id TEXT,
+                  uuid TEXT,
                   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
 
-    def ensure_column(table, column, definition):
-        c.execute(f"PRAGMA table_info({table})")
-        columns = [row[1] for row in c.fetchall()]
-        if column not in columns:
-            c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
-
-    # Backfill new columns for existing databases
-    ensure_column('decks', 'notes', 'TEXT')
-    # Calendar-related columns for deck-level schedule
-    ensure_column('decks', 'unit', 'TEXT')
-    ensure_column('decks', 'reading_list', 'TEXT')
-    ensure_column('decks', 'monday_details', 'TEXT')
-    ensure_column('decks', 'wednesday_details', 'TEXT')
-    # Topics for the deck's title slide (up to two topics)
-    ensure_column('decks', 'topic1', 'TEXT')
-    ensure_column('decks', 'topic2', 'TEXT')
-    
-    # Assignment table columns
-    ensure_column('assignments', 'short', 'TEXT')
-    ensure_column('assignments', 'canvas_assignment_id', 'TEXT')
-    ensure_column('assignments', 'uuid', 'TEXT UNIQUE')
-
     # Link table for deck <-> assignment relationships
     c.execute('''CREATE TABLE IF NOT EXISTS deck_assignments (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -166,80 +241,156 @@ def init_db():
                     UNIQUE(deck_id, assignment_id)
                 )''')
 
-    ensure_column('slides', 'hide_headline', 'INTEGER DEFAULT 0')
-    ensure_column('slides', 'larger_image', 'INTEGER DEFAULT 0')
-    ensure_column('slides', 'has_bullets', 'INTEGER DEFAULT 1')
-    ensure_column('slides', 'has_image', 'INTEGER DEFAULT 0')
-    ensure_column('slides', 'has_quote', 'INTEGER DEFAULT 0')
-    ensure_column('slides', 'is_gold', 'INTEGER DEFAULT 0')
-    ensure_column('slides', 'is_two_column', 'INTEGER DEFAULT 0')
-    ensure_column('slides', 'is_photo_centered', 'INTEGER DEFAULT 0')
-    ensure_column('slides', 'template_base', 'TEXT')
-    ensure_column('slides', 'module', 'TEXT')
-    ensure_column('slides', 'master_slide_id', 'INTEGER')
-    ensure_column('slides', 'fullscreen', 'INTEGER DEFAULT 0')
-    
-    conn.commit()
-    conn.close()
+    # Backfill columns added before the schema was versioned
+    _add_missing_column(c, 'decks', 'notes', 'TEXT')
+    # Calendar-related columns for deck-level schedule
+    _add_missing_column(c, 'decks', 'unit', 'TEXT')
+    _add_missing_column(c, 'decks', 'reading_list', 'TEXT')
+    _add_missing_column(c, 'decks', 'monday_details', 'TEXT')
+    _add_missing_column(c, 'decks', 'wednesday_details', 'TEXT')
+    # Topics for the deck's title slide (up to two topics)
+    _add_missing_column(c, 'decks', 'topic1', 'TEXT')
+    _add_missing_column(c, 'decks', 'topic2', 'TEXT')
+    
+    # Assignment table columns
+    _add_missing_column(c, 'assignments', 'short', 'TEXT')
+    _add_missing_column(c, 'assignments', 'canvas_assignment_id', 'TEXT')
+    # SQLite cannot ADD a UNIQUE column, so uuid is a plain column with a unique index
+    _add_missing_column(c, 'assignments', 'uuid', 'TEXT')
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_assignments_uuid ON assignments (uuid)")
+
+    _add_missing_column(c, 'slides', 'hide_headline', 'INTEGER DEFAULT 0')
+    _add_missing_column(c, 'slides', 'larger_image', 'INTEGER DEFAULT 0')
+    _add_missing_column(c, 'slides', 'has_bullets', 'INTEGER DEFAULT 1')
+    _add_missing_column(c, 'slides', 'has_image', 'INTEGER DEFAULT 0')
+    _add_missing_column(c, 'slides', 'has_quote', 'INTEGER DEFAULT 0')
+    _add_missing_column(c, 'slides', 'is_gold', 'INTEGER DEFAULT 0')
+    _add_missing_column(c, 'slides', 'is_two_column', 'INTEGER DEFAULT 0')
+    _add_missing_column(c, 'slides', 'is_photo_centered', 'INTEGER DEFAULT 0')
+    _add_missing_column(c, 'slides', 'template_base', 'TEXT')
+    _add_missing_column(c, 'slides', 'module', 'TEXT')
+    _add_missing_column(c, 'slides', 'master_slide_id', 'INTEGER')
+    _add_missing_column(c, 'slides', 'fullscreen', 'INTEGER DEFAULT 0')
+    _add_missing_column(c, 'slides', 'is_draft', 'INTEGER DEFAULT 0')
+
+def _migration_002_indexes(c):
+    """Secondary indexes for the hot lookups"""
+    ensure_indexes(c)
+
+# Tables whose writes change a presentation's exported content, and the presentation each row
+# belongs to (NEW./OLD. are filled in per trigger). Assignments are shared by every presentation
+# and bump the global counter row 0.
+CHANGE_TRACKED_TABLES = {
+    'slides': "SELECT presentation_id, 1 FROM decks WHERE id = {row}.deck_id AND presentation_id IS NOT NULL",
+    'decks': "SELECT {row}.presentation_id, 1 WHERE {row}.presentation_id IS NOT NULL",
+    'presentations': "SELECT {row}.id, 1 WHERE {row}.id IS NOT NULL",
+    'assignments': "SELECT 0, 1 WHERE 1",
+}
+
+def _migration_003_change_counters(c):
+    """Per-presentation change counters, bumped by triggers on every content write"""
+    c.execute('''CREATE TABLE IF NOT EXISTS change_counters
+                 (presentation_id INTEGER PRIMARY KEY,
+                  version INTEGER NOT NULL DEFAULT 0)''')
+    for table, select in CHANGE_TRACKED_TABLES.items():
+        for op, rows in (('INSERT', ('NEW',)), ('DELETE', ('OLD',)), ('UPDATE', ('OLD', 'NEW'))):
+            bumps = ''.join(
+                f"INSERT INTO change_counters (presentation_id, version) {select.format(row=row)} "
+                f"ON CONFLICT(presentation_id) DO UPDATE SET version = version + 1; "
+                for row in rows)
+            c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_changes
+                         AFTER {op} ON {table} BEGIN {bumps}END''')
+
+# Ordered schema migrations. PRAGMA user_version records how many have been applied,
+# so append new migrations to the end and never reorder or edit released ones.
+MIGRATIONS = [
+    _migration_001_base_schema,
+    _migration_002_indexes,
+    _migration_003_change_counters,
+]
+
+def init_db():
+    conn = db.connect(DB_PATH)
+    try:
+        db.migrate(conn, MIGRATIONS, DB_PATH)
+    finally:
+        conn.close()
 
 init_db()
 
+def load_presentation_decks(conn, presentation_id):
+    """Load every deck of a presentation with its slides, in editor order.
+
+    Decks and slides come back from one ordered LEFT JOIN and are grouped into
+    the deck/slide tree in a single pass over the cursor, instead of one
+    slides query per deck.
+    """
+    c = conn.cursor()
+    c.execute('''SELECT d.id, d.week, d.date, d.order_index, d.notes, d.topic1, d.topic2,
+                        s.id, s.slide_class, s.headline, s.paragraph, s.bullets, s.quote, s.quote_citation,
+                        s.image_path, s.order_index, s.is_title, s.hide_headline, s.larger_image, s.has_bullets,
+                        s.has_image, s.has_quote, s.is_gold, s.is_two_column, s.is_photo_centered,
+                        s.template_base, s.module, s.master_slide_id, s.fullscreen, s.is_draft
+                 FROM decks d
+                 LEFT JOIN slides s ON s.deck_id = d.id
+                 WHERE d.presentation_id = ?
+                 ORDER BY d.order_index, d.id, s.order_index, s.id''', (presentation_id,))
+    
+    decks = []
+    deck = None
+    for r in c:
+        if deck is None or deck['id'] != r[0]:
+            deck = {'id': r[0], 'week': r[1], 'date': r[2], 'orderIndex': r[3], 'notes': r[4],
+                    'topic1': r[5], 'topic2': r[6], 'slides': []}
+            decks.append(deck)
+        if r[7] is None:
+            # Deck without slides (LEFT JOIN row)
+            continue
+        deck['slides'].append({'id': r[7], 'slideClass': r[8], 'headline': r[9], 'paragraph': r[10],
+                               'bullets': json.loads(r[11]) if r[11] else [], 'quote': r[12],
+                               'quoteCitation': r[13], 'imagePath': r[14], 'orderIndex': r[15], 'isTitle': bool(r[16]),
+                               'hideHeadline': bool(r[17]), 'largerImage': bool(r[18]), 'hasBullets': bool(r[19]), 'hasImage': bool(r[20]),
+                               'hasQuote': bool(r[21]), 'isGold': bool(r[22]), 'isTwoColumn': bool(r[23]),
+                               'isPhotoCentered': bool(r[24]), 'templateBase': r[25], 'module': r[26], 'masterSlideId': r[27],
+                               'fullscreen': bool(r[28]), 'isDraft': bool(r[29])})
+    return decks
+
 @app.route('/')
 def index():
     return render_template('editor.html')
 
 @app.route('/api/presentations', methods=['GET', 'POST'])
 def presentations():
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     c = conn.cursor()
     
     if request.method == 'GET':
         c.execute('SELECT id, name, created_at, updated_at FROM presentations ORDER BY updated_at DESC')
         presentations = [{'id': row[0], 'name': row[1], 'created_at': row[2], 'updated_at': row[3]} 
                         for row in c.fetchall()]
-        conn.close()
         return jsonify(presentations)
     
     elif request.method == 'POST':
         data = request.json
-        c.execute('INSERT INTO presentations (name, front_matter) VALUES (?, ?)',
-                 (data.get('name', 'New Presentation'), data.get('front_matter', '')))
-        presentation_id = c.lastrowid
-        conn.commit()
-        conn.close()
+        with db_writer():
+            c.execute('INSERT INTO presentations (name, front_matter) VALUES (?, ?)',
+                     (data.get('name', 'New Presentation'), data.get('front_matter', '')))
+            presentation_id = c.lastrowid
         return jsonify({'id': presentation_id})
 
 @app.route('/api/presentations/<int:presentation_id>', methods=['GET', 'PUT', 'DELETE'])
 def presentation(presentation_id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     c = conn.cursor()
     
     if request.method == 'GET':
         c.execute('SELECT * FROM presentations WHERE id = ?', (presentation_id,))
         row = c.fetchone()
         if not row:
-            conn.close()
             return jsonify({'error': 'Not found'}), 404
         
         # Get all decks with their slides
-        c.execute('SELECT id, week, date, order_index, notes, topic1, topic2 FROM decks WHERE presentation_id = ? ORDER BY order_index', 
-                 (presentation_id,))
-        decks = []
-        for deck_row in c.fetchall():
-            deck_id = deck_row[0]
-            c.execute('''SELECT id, slide_class, headline, paragraph, bullets, quote, quote_citation, 
-                        image_path, order_index, is_title, hide_headline, larger_image, has_bullets, has_image, 
-                        has_quote, is_gold, is_two_column, is_photo_centered, template_base, module, master_slide_id, fullscreen, is_draft FROM slides 
-                        WHERE deck_id = ? ORDER BY order_index''', (deck_id,))
-            slides = [{'id': s[0], 'slideClass': s[1], 'headline': s[2], 'paragraph': s[3], 
-                      'bullets': json.loads(s[4]) if s[4] else [], 'quote': s[5], 
-                      'quoteCitation': s[6], 'imagePath': s[7], 'orderIndex': s[8], 'isTitle': bool(s[9]),
-                      'hideHeadline': bool(s[10]), 'largerImage': bool(s[11]), 'hasBullets': bool(s[12]), 'hasImage': bool(s[13]),
-                      'hasQuote': bool(s[14]), 'isGold': bool(s[15]), 'isTwoColumn': bool(s[16]),
-                      'isPhotoCentered': bool(s[17]), 'templateBase': s[18], 'module': s[19], 'masterSlideId': s[20], 'fullscreen': bool(s[21]), 'isDraft': bool(s[22])}
-                     for s in c.fetchall()]
-            decks.append({'id': deck_id, 'week': deck_row[1], 'date': deck_row[2], 
-                         'orderIndex': deck_row[3], 'notes': deck_row[4], 'topic1': deck_row[5], 'topic2': deck_row[6], 'slides': slides})
+        decks = load_presentation_decks(conn, presentation_id)
         
         result = {
             'id': row[0],
@@ -247,133 +398,128 @@ def presentation(presentation_id):
             'frontMatter': row[2],
             'decks': decks
         }
-        conn.close()
         return jsonify(result)
     
     elif request.method == 'PUT':
         data = request.json
-        c.execute('UPDATE presentations SET name = ?, front_matter = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-                 (data.get('name'), data.get('frontMatter'), presentation_id))
-        conn.commit()
-        conn.close()
+        with db_writer():
+            c.execute('UPDATE presentations SET name = ?, front_matter = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                     (data.get('name'), data.get('frontMatter'), presentation_id))
         return jsonify({'success': True})
     
     elif request.method == 'DELETE':
-        c.execute('DELETE FROM presentations WHERE id = ?', (presentation_id,))
-        conn.commit()
-        conn.close()
+        with db_writer():
+            c.execute('DELETE FROM presentations WHERE id = ?', (presentation_id,))
         return jsonify({'success': True})
 
 @app.route('/api/decks', methods=['POST'])
 def create_deck():
     data = request.json
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     
-    # Get max order_index
-    c.execute('SELECT MAX(order_index) FROM decks WHERE presentation_id = ?', 
-             (data['presentation_id'],))
-    max_order = c.fetchone()[0] or -1
-    
-    c.execute('INSERT INTO decks (presentation_id, week, date, order_index) VALUES (?, ?, ?, ?)',
-             (data['presentation_id'], data.get('week', ''), data.get('date', ''), max_order + 1))
-    deck_id = c.lastrowid
-    
-    # Automatically create slides for this deck:
-    # 1. Title slide
-    c.execute('''INSERT INTO slides (deck_id, slide_class, headline, paragraph, bullets, 
-                quote, quote_citation, image_path, order_index, is_title, template_base) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-             (deck_id, 'title', '', '', '[]', '', '', '', 0, True, 'title'))
-    
-    # 2-5. Four headline/bullet slides
-    for i in range(1, 5):
-        c.execute('''INSERT INTO slides (deck_id, slide_class, headline, paragraph, bullets, 
-                    quote, quote_citation, image_path, order_index, is_title, template_base, has_bullets) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                 (deck_id, 'template-bullets', '', '', '[""]', '', '', '', i, False, 'bullets', True))
-    
-    # 6. Closing slide with default content
+    # Default contact block for the closing slide
     default_headline = """Damon Kiesow
 Knight Chair in 
 Journalism Innovation
 216 Reynolds Journalism Institute
 dkiesow@missouri.edu"""
     
-    c.execute('''INSERT INTO slides (deck_id, slide_class, headline, paragraph, bullets, 
-                quote, quote_citation, image_path, order_index, is_title, template_base) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-             (deck_id, 'closing', default_headline, 'Thank You', '[]', '', '', '', 5, False, 'closing'))
+    with db_writer() as conn:
+        c = conn.cursor()
+    
+        # Get max order_index
+        c.execute('SELECT MAX(order_index) FROM decks WHERE presentation_id = ?', 
+                 (data['presentation_id'],))
+        max_order = c.fetchone()[0] or -1
+    
+        c.execute('INSERT INTO decks (presentation_id, week, date, order_index) VALUES (?, ?, ?, ?)',
+                 (data['presentation_id'], data.get('week', ''), data.get('date', ''), max_order + 1))
+        deck_id = c.lastrowid
+    
+        # Automatically create slides for this deck:
+        # 1. Title slide
+        c.execute('''INSERT INTO slides (deck_id, slide_class, headline, paragraph, bullets, 
+                    quote, quote_citation, image_path, order_index, is_title, template_base) 
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                 (deck_id, 'title', '', '', '[]', '', '', '', 0, True, 'title'))
+    
+        # 2-5. Four headline/bullet slides
+        for i in range(1, 5):
+            c.execute('''INSERT INTO slides (deck_id, slide_class, headline, paragraph, bullets, 
+                        quote, quote_citation, image_path, order_index, is_title, template_base, has_bullets) 
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                     (deck_id, 'template-bullets', '', '', '[""]', '', '', '', i, False, 'bullets', True))
+    
+        # 6. Closing slide with default content
+        c.execute('''INSERT INTO slides (deck_id, slide_class, headline, paragraph, bullets, 
+                    quote, quote_citation, image_path, order_index, is_title, template_base) 
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                 (deck_id, 'closing', default_headline, 'Thank You', '[]', '', '', '', 5, False, 'closing'))
     
-    conn.commit()
-    conn.close()
     return jsonify({'id': deck_id})
 
 @app.route('/api/decks/<int:deck_id>', methods=['PUT', 'DELETE'])
 def deck(deck_id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     c = conn.cursor()
     
     if request.method == 'PUT':
         data = request.json
         # Update decks with topic fields if provided
-        c.execute('UPDATE decks SET week = ?, date = ?, notes = ?, topic1 = ?, topic2 = ? WHERE id = ?',
-                 (data.get('week'), data.get('date'), data.get('notes'), data.get('topic1'), data.get('topic2'), deck_id))
-        conn.commit()
-        conn.close()
+        with db_writer():
+            c.execute('UPDATE decks SET week = ?, date = ?, notes = ?, topic1 = ?, topic2 = ? WHERE id = ?',
+                     (data.get('week'), data.get('date'), data.get('notes'), data.get('topic1'), data.get('topic2'), deck_id))
         return jsonify({'success': True})
     
     elif request.method == 'DELETE':
-        c.execute('DELETE FROM decks WHERE id = ?', (deck_id,))
-        conn.commit()
-        conn.close()
+        with db_writer():
+            c.execute('DELETE FROM decks WHERE id = ?', (deck_id,))
         return jsonify({'success': True})
 
 @app.route('/api/slides', methods=['POST'])
 def create_slide():
     data = request.json
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     
     deck_id = data['deck_id']
     insert_after_slide_id = data.get('insert_after_slide_id')
     
-    if insert_after_slide_id:
-        # Get the order_index of the slide we're inserting after
-        c.execute('SELECT order_index FROM slides WHERE id = ?', (insert_after_slide_id,))
-        result = c.fetchone()
-        if result:
-            insert_after_order = result[0]
-            # Shift all slides after this position down by 1
-            c.execute('UPDATE slides SET order_index = order_index + 1 WHERE deck_id = ? AND order_index > ?',
-                     (deck_id, insert_after_order))
-            new_order_index = insert_after_order + 1
+    with db_writer() as conn:
+        c = conn.cursor()
+        
+        if insert_after_slide_id:
+            # Get the order_index of the slide we're inserting after
+            c.execute('SELECT order_index FROM slides WHERE id = ?', (insert_after_slide_id,))
+            result = c.fetchone()
+            if result:
+                insert_after_order = result[0]
+                # Shift all slides after this position down by 1
+                c.execute('UPDATE slides SET order_index = order_index + 1 WHERE deck_id = ? AND order_index > ?',
+                         (deck_id, insert_after_order))
+                new_order_index = insert_after_order + 1
+            else:
+                # Fallback to end if slide not found
+                c.execute('SELECT MAX(order_index) FROM slides WHERE deck_id = ?', (deck_id,))
+                max_order = c.fetchone()[0] or -1
+                new_order_index = max_order + 1
         else:
-            # Fallback to end if slide not found
+            # Insert at end
             c.execute('SELECT MAX(order_index) FROM slides WHERE deck_id = ?', (deck_id,))
             max_order = c.fetchone()[0] or -1
             new_order_index = max_order + 1
-    else:
-        # Insert at end
-        c.execute('SELECT MAX(order_index) FROM slides WHERE deck_id = ?', (deck_id,))
-        max_order = c.fetchone()[0] or -1
-        new_order_index = max_order + 1
-    
-    c.execute('''INSERT INTO slides (deck_id, slide_class, headline, paragraph, bullets, 
-                quote, quote_citation, image_path, order_index, is_title, is_draft) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-             (deck_id, data.get('class', ''), data.get('headline', ''),
-              data.get('paragraph', ''), json.dumps(data.get('bullets', [])),
-              data.get('quote', ''), data.get('quoteCitation', ''),
-              data.get('imagePath', ''), new_order_index, data.get('isTitle', False), data.get('isDraft', False)))
-    slide_id = c.lastrowid
-    conn.commit()
-    conn.close()
+    
+        c.execute('''INSERT INTO slides (deck_id, slide_class, headline, paragraph, bullets, 
+                    quote, quote_citation, image_path, order_index, is_title, is_draft) 
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                 (deck_id, data.get('class', ''), data.get('headline', ''),
+                  data.get('paragraph', ''), json.dumps(data.get('bullets', [])),
+                  data.get('quote', ''), data.get('quoteCitation', ''),
+                  data.get('imagePath', ''), new_order_index, data.get('isTitle', False), data.get('isDraft', False)))
+        slide_id = c.lastrowid
+    
     return jsonify({'id': slide_id})
 
 @app.route('/api/slides/<int:slide_id>', methods=['PUT', 'DELETE'])
 def slide(slide_id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     c = conn.cursor()
     
     if request.method == 'PUT':
@@ -445,70 +591,97 @@ def slide(slide_id):
             update_values.append(1 if data.get('largerImage') else 0)
         
         if update_fields:
-            update_values.append(slide_id)
-            c.execute(f"UPDATE slides SET {', '.join(update_fields)} WHERE id = ?", tuple(update_values))
+            with db_writer():
+                update_values.append(slide_id)
+                c.execute(f"UPDATE slides SET {', '.join(update_fields)} WHERE id = ?", tuple(update_values))
             
-            # Check if this is a master slide or instance and cascade changes
-            c.execute('SELECT master_slide_id FROM slides WHERE id = ?', (slide_id,))
-            result = c.fetchone()
-            master_id = result[0] if result else None
+                # Check if this is a master slide or instance and cascade changes
+                c.execute('SELECT master_slide_id FROM slides WHERE id = ?', (slide_id,))
+                result = c.fetchone()
+                master_id = result[0] if result else None
             
-            # Determine the master ID (either this slide or its master)
-            cascade_id = master_id if master_id else slide_id
+                # Determine the master ID (either this slide or its master)
+                cascade_id = master_id if master_id else slide_id
             
-            # Build cascadable update (exclude deck_id and order_index)
-            cascade_fields = []
-            cascade_values = []
-            non_cascade = ['deck_id']
+                # Build cascadable update (exclude deck_id and order_index)
+                cascade_fields = []
+                cascade_values = []
+                non_cascade = ['deck_id']
             
-            for i, field in enumerate(update_fields):
-                field_name = field.split(' = ')[0]
-                if field_name not in non_cascade:
-                    cascade_fields.append(field)
-                    cascade_values.append(update_values[i])
+                for i, field in enumerate(update_fields):
+                    field_name = field.split(' = ')[0]
+                    if field_name not in non_cascade:
+                        cascade_fields.append(field)
+                        cascade_values.append(update_values[i])
             
-            if cascade_fields:
-                # If editing an instance, update its master
-                if master_id:
-                    cascade_values_with_id = cascade_values + [cascade_id]
-                    c.execute(f"UPDATE slides SET {', '.join(cascade_fields)} WHERE id = ?", 
-                             tuple(cascade_values_with_id))
+                if cascade_fields:
+                    # If editing an instance, update its master
+                    if master_id:
+                        cascade_values_with_id = cascade_values + [cascade_id]
+                        c.execute(f"UPDATE slides SET {', '.join(cascade_fields)} WHERE id = ?", 
+                                 tuple(cascade_values_with_id))
                 
-                # Update all instances of this master
-                cascade_values_with_id = cascade_values + [cascade_id, slide_id]
-                c.execute(f"UPDATE slides SET {', '.join(cascade_fields)} WHERE master_slide_id = ? AND id != ?", 
-                         tuple(cascade_values_with_id))
-            
-            conn.commit()
+                    # Update all instances of this master
+                    cascade_values_with_id = cascade_values + [cascade_id, slide_id]
+                    c.execute(f"UPDATE slides SET {', '.join(cascade_fields)} WHERE master_slide_id = ? AND id != ?", 
+                             tuple(cascade_values_with_id))
         
-        conn.close()
         return jsonify({'success': True})
     
     elif request.method == 'DELETE':
-        c.execute('DELETE FROM slides WHERE id = ?', (slide_id,))
-        conn.commit()
-        conn.close()
+        with db_writer():
+            c.execute('DELETE FROM slides WHERE id = ?', (slide_id,))
         return jsonify({'success': True})
 
+@app.route('/api/slides/<int:slide_id>/preview', methods=['GET'])
+def slide_preview(slide_id):
+    """Render one slide to an HTML <section> for the editor, without Marp.
+
+    ?standalone=1 wraps it in a page that loads presentation-styles.css.
+    The ETag is the fragment's content hash, so unchanged slides return 304.
+    """
+    conn = get_db()
+    row = conn.execute('''SELECT s.slide_class, s.headline, s.paragraph, s.bullets, s.quote, s.quote_citation,
+                           s.image_path, s.is_title, s.hide_headline, s.larger_image, s.fullscreen,
+                           d.week, d.date, p.name
+                    FROM slides s
+                    LEFT JOIN decks d ON d.id = s.deck_id
+                    LEFT JOIN presentations p ON p.id = d.presentation_id
+                    WHERE s.id = ?''', (slide_id,)).fetchone()
+    if not row:
+        return jsonify({'error': 'Slide not found'}), 404
+
+    week, date, title = row[11:]
+    substitutions = load_substitutions(conn, course_title=title, week=week, date=date)
+    slide = markdown_renderer.SlideRecord(*substitute_slide_row(row[:11], substitutions))
+    fragment, etag = slide_html.render_fragment(slide, markdown_renderer.DeckContext(title or '', week, date))
+
+    if request.args.get('standalone') == '1':
+        fragment = slide_html.standalone_page(fragment)
+        etag += '-page'
+    response = Response(fragment, mimetype='text/html')
+    response.set_etag(etag)
+    # Revalidate every time; unchanged slides cost only the DB lookup
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @app.route('/api/slides/reorder', methods=['POST'])
 def reorder_slides():
     data = request.json
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     
-    for item in data['slides']:
-        c.execute('UPDATE slides SET order_index = ? WHERE id = ?',
-                 (item['orderIndex'], item['id']))
+    with db_writer() as conn:
+        c = conn.cursor()
+        for item in data['slides']:
+            c.execute('UPDATE slides SET order_index = ? WHERE id = ?',
+                     (item['orderIndex'], item['id']))
     
-    conn.commit()
-    conn.close()
     return jsonify({'success': True})
 
 
 @app.route('/api/modules', methods=['GET'])
 def get_modules():
     """Get list of all distinct module names"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     c = conn.cursor()
     
     c.execute('''SELECT DISTINCT module, COUNT(*) as slide_count 
@@ -518,7 +691,6 @@ def get_modules():
                  ORDER BY module''')
     
     modules = [{'name': row[0], 'slideCount': row[1]} for row in c.fetchall()]
-    conn.close()
     return jsonify(modules)
 
 @app.route('/api/decks/<int:deck_id>/insert-module', methods=['POST'])
@@ -528,7 +700,7 @@ def insert_module(deck_id):
     module_name = data.get('moduleName')
     insert_after = data.get('insertAfter', None)  # Slide ID to insert after, or None for end
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     c = conn.cursor()
     
     # Get all slides from the module (masters)
@@ -542,57 +714,54 @@ def insert_module(deck_id):
     module_slides = c.fetchall()
     
     if not module_slides:
-        conn.close()
         return jsonify({'error': 'Module not found'}), 404
     
-    # Determine insertion point
-    if insert_after:
-        c.execute('SELECT order_index FROM slides WHERE id = ?', (insert_after,))
-        result = c.fetchone()
-        if result:
-            start_order = result[0] + 1
+    with db_writer():
+        # Determine insertion point
+        if insert_after:
+            c.execute('SELECT order_index FROM slides WHERE id = ?', (insert_after,))
+            result = c.fetchone()
+            if result:
+                start_order = result[0] + 1
+            else:
+                # If slide not found, append to end
+                c.execute('SELECT MAX(order_index) FROM slides WHERE deck_id = ?', (deck_id,))
+                max_order = c.fetchone()[0]
+                start_order = (max_order or 0) + 1
         else:
-            # If slide not found, append to end
+            # Insert at end
             c.execute('SELECT MAX(order_index) FROM slides WHERE deck_id = ?', (deck_id,))
             max_order = c.fetchone()[0]
             start_order = (max_order or 0) + 1
-    else:
-        # Insert at end
-        c.execute('SELECT MAX(order_index) FROM slides WHERE deck_id = ?', (deck_id,))
-        max_order = c.fetchone()[0]
-        start_order = (max_order or 0) + 1
-    
-    # Shift existing slides if needed
-    if insert_after:
-        c.execute('''UPDATE slides 
-                     SET order_index = order_index + ? 
-                     WHERE deck_id = ? AND order_index >= ?''',
-                  (len(module_slides), deck_id, start_order))
-    
-    # Insert the module slides as linked instances
-    inserted_ids = []
-    for idx, slide_data in enumerate(module_slides):
-        master_id = slide_data[0]
-        c.execute('''INSERT INTO slides 
-                     (deck_id, slide_class, headline, paragraph, bullets, quote, quote_citation, 
-                      image_path, order_index, is_title, hide_headline, larger_image, has_bullets, has_image, 
-                      has_quote, is_gold, is_two_column, is_photo_centered, template_base, module, master_slide_id, fullscreen)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                  (deck_id, slide_data[1], slide_data[2], slide_data[3], slide_data[4], 
-                   slide_data[5], slide_data[6], slide_data[7], start_order + idx, 
-                   slide_data[8], slide_data[9], slide_data[10], slide_data[11], slide_data[12],
-                   slide_data[13], slide_data[14], slide_data[15], slide_data[16], slide_data[17], master_id, slide_data[18]))
-        inserted_ids.append(c.lastrowid)
-    
-    conn.commit()
-    conn.close()
+    
+        # Shift existing slides if needed
+        if insert_after:
+            c.execute('''UPDATE slides 
+                         SET order_index = order_index + ? 
+                         WHERE deck_id = ? AND order_index >= ?''',
+                      (len(module_slides), deck_id, start_order))
+    
+        # Insert the module slides as linked instances
+        inserted_ids = []
+        for idx, slide_data in enumerate(module_slides):
+            master_id = slide_data[0]
+            c.execute('''INSERT INTO slides 
+                         (deck_id, slide_class, headline, paragraph, bullets, quote, quote_citation, 
+                          image_path, order_index, is_title, hide_headline, larger_image, has_bullets, has_image, 
+                          has_quote, is_gold, is_two_column, is_photo_centered, template_base, module, master_slide_id, fullscreen)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                      (deck_id, slide_data[1], slide_data[2], slide_data[3], slide_data[4], 
+                       slide_data[5], slide_data[6], slide_data[7], start_order + idx, 
+                       slide_data[8], slide_data[9], slide_data[10], slide_data[11], slide_data[12],
+                       slide_data[13], slide_data[14], slide_data[15], slide_data[16], slide_data[17], master_id, slide_data[18]))
+            inserted_ids.append(c.lastrowid)
     
     return jsonify({'success': True, 'insertedCount': len(inserted_ids), 'insertedIds': inserted_ids})
 
 @app.route('/api/assignments', methods=['GET'])
 def get_assignments():
     """Get all assignments"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     c = conn.cursor()
     
     c.execute('''SELECT id, name, due_date, description, points, created_at 
@@ -608,7 +777,6 @@ def get_assignments():
         'createdAt': row[5]
     } for row in c.fetchall()]
     
-    conn.close()
     return jsonify(assignments)
 
 @app.route('/api/assignments', methods=['POST'])
@@ -623,16 +791,12 @@ def create_assignment():
     if not name or not due_date:
         return jsonify({'error': 'Name and due date are required'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    c.execute('''INSERT INTO assignments (name, due_date, description, points)
-                 VALUES (?, ?, ?, ?)''',
-              (name, due_date, description, points))
-    
-    assignment_id = c.lastrowid
-    conn.commit()
-    conn.close()
+    with db_writer() as conn:
+        c = conn.cursor()
+        c.execute('''INSERT INTO assignments (name, due_date, description, points)
+                     VALUES (?, ?, ?, ?)''',
+                  (name, due_date, description, points))
+        assignment_id = c.lastrowid
     
     return jsonify({'success': True, 'id': assignment_id})
 
@@ -641,9 +805,6 @@ def update_assignment(assignment_id):
     """Update an assignment"""
     data = request.json
     
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
     update_fields = []
     update_values = []
     
@@ -662,23 +823,18 @@ def update_assignment(assignment_id):
     
     if update_fields:
         update_values.append(assignment_id)
-        c.execute(f"UPDATE assignments SET {', '.join(update_fields)} WHERE id = ?",
-                  tuple(update_values))
+        with db_writer() as conn:
+            conn.execute(f"UPDATE assignments SET {', '.join(update_fields)} WHERE id = ?",
+                         tuple(update_values))
     
-    conn.commit()
-    conn.close()
     return jsonify({'success': True})
 
 @app.route('/api/assignments/<int:assignment_id>', methods=['DELETE'])
 def delete_assignment(assignment_id):
     """Delete an assignment"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    with db_writer() as conn:
+        conn.execute('DELETE FROM assignments WHERE id = ?', (assignment_id,))
     
-    c.execute('DELETE FROM assignments WHERE id = ?', (assignment_id,))
-    
-    conn.commit()
-    conn.close()
     return jsonify({'success': True})
 
 @app.route('/api/assignments/import-csv', methods=['POST'])
@@ -691,9 +847,6 @@ def import_assignments_csv():
         if not csv_content:
             return jsonify({'error': 'No CSV content provided'}), 400
         
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
         imported_count = 0
         errors = []
         
@@ -734,27 +887,27 @@ def import_assignments_csv():
             # Store for later insertion
             rows_to_import.append((semester, name, due_date))
         
-        # Delete all assignments for semesters present in the CSV
-        if semesters_in_csv:
-            placeholders = ','.join('?' * len(semesters_in_csv))
-            c.execute(f'DELETE FROM assignments WHERE semester IN ({placeholders})', 
-                     tuple(semesters_in_csv))
-            deleted_count = c.rowcount
-        else:
-            deleted_count = 0
-        
-        # Insert all new assignments
-        for semester, name, due_date in rows_to_import:
-            try:
-                c.execute('''INSERT INTO assignments (semester, name, due_date)
-                             VALUES (?, ?, ?)''',
-                          (semester, name, due_date))
-                imported_count += 1
-            except Exception as e:
-                errors.append(f"Database error inserting '{name}': {str(e)}")
+        with db_writer() as conn:
+            c = conn.cursor()
+            
+            # Delete all assignments for semesters present in the CSV
+            if semesters_in_csv:
+                placeholders = ','.join('?' * len(semesters_in_csv))
+                c.execute(f'DELETE FROM assignments WHERE semester IN ({placeholders})', 
+                         tuple(semesters_in_csv))
+                deleted_count = c.rowcount
+            else:
+                deleted_count = 0
         
-        conn.commit()
-        conn.close()
+            # Insert all new assignments
+            for semester, name, due_date in rows_to_import:
+                try:
+                    c.execute('''INSERT INTO assignments (semester, name, due_date)
+                                 VALUES (?, ?, ?)''',
+                              (semester, name, due_date))
+                    imported_count += 1
+                except Exception as e:
+                    errors.append(f"Database error inserting '{name}': {str(e)}")
         
         return jsonify({
             'success': True,
@@ -766,37 +919,52 @@ def import_assignments_csv():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/decks/<int:deck_id>/export', methods=['GET'])
-def export_deck(deck_id):
-    """Export a specific deck to PDF or PPTX format"""
+def prepare_deck_export(conn, deck_id, format_type, downscale_images=True):
+    """Resolve everything needed to export one deck, without building anything.
+
+    Returns a plain (picklable) dict for export_jobs.build_deck_export: the
+    substituted slide rows, the Marp markdown, layout map, cache key and
+    download name. Returns None if the deck does not exist. downscale_images=False
+    embeds PPTX/ODP images at full resolution.
+    """
+    c = conn.cursor()
+    
+    # Get deck info
+    c.execute('SELECT week, date, topic1, topic2, presentation_id FROM decks WHERE id = ?', (deck_id,))
+    deck_row = c.fetchone()
+    if not deck_row:
+        return None
+    
+    week, date, topic1, topic2, presentation_id = deck_row
+    topic1 = topic1 if topic1 else ''
+    topic2 = topic2 if topic2 else ''
+    
+    # Get presentation front matter
+    c.execute('SELECT front_matter FROM presentations WHERE id = ?', (presentation_id,))
+    pres_row = c.fetchone()
+    
+    # Get all slides for this deck
+    c.execute('''SELECT slide_class, headline, paragraph, bullets, quote, quote_citation, 
+                        image_path, is_title, hide_headline, larger_image, fullscreen, template_base
+                 FROM slides 
+                 WHERE deck_id = ?
+                 ORDER BY order_index''', (deck_id,))
+    
+    # Substitute assignment/deck placeholders in every slide once, up front
+    substitutions = load_substitutions(conn, week=week, date=date, course_title='Journalism Innovation')
+    slides = [substitute_slide_row(slide, substitutions) for slide in c.fetchall()]
+    
+    # Load PowerPoint layout mapping
     try:
-        format_type = request.args.get('format', 'pdf').lower()
-        
-        if format_type not in ['pdf', 'pptx', 'odp']:
-            return jsonify({'error': 'Invalid format. Use pdf, pptx, or odp'}), 400
-        
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        # Get deck info
-        c.execute('SELECT week, date, topic1, topic2, presentation_id FROM decks WHERE id = ?', (deck_id,))
-        deck_row = c.fetchone()
-        if not deck_row:
-            conn.close()
-            return jsonify({'error': 'Deck not found'}), 404
-        
-        week, date, topic1, topic2, presentation_id = deck_row
-        topic1 = topic1 if topic1 else ''
-        topic2 = topic2 if topic2 else ''
-        
-        # Get presentation front matter
-        c.execute('SELECT front_matter FROM presentations WHERE id = ?', (presentation_id,))
-        pres_row = c.fetchone()
-        
-        # Build markdown content for this deck only
-        # Only add Marp frontmatter for PDF exports
-        if format_type == 'pdf':
-            content = '''---
+        with open('pptx_layouts.json', 'r') as f:
+            pptx_layouts = json.load(f)
+    except:
+        pptx_layouts = {}
+    
+    # Markdown is only needed for PDF (Marp); PPTX/ODP are built from the slide rows
+    content = ''
+    if format_type == 'pdf':
+        content = '''---
 marp: true
 theme: classroom
 paginate: true
@@ -804,423 +972,210 @@ COURSE_TITLE: "Journalism Innovation"
 ---
 
 '''
-        else:
-            # For PPTX/ODP, start with empty content (no Marp directives)
-            content = ''
-        
-        # Get all slides for this deck
-        c.execute('''SELECT slide_class, headline, paragraph, bullets, quote, quote_citation, 
-                            image_path, is_title, hide_headline, larger_image, fullscreen, template_base
-                     FROM slides 
-                     WHERE deck_id = ?
-                     ORDER BY order_index''', (deck_id,))
-        
-        slides = c.fetchall()
-        
-        # Load PowerPoint layout mapping
-        try:
-            with open('pptx_layouts.json', 'r') as f:
-                pptx_layouts = json.load(f)
-        except:
-            pptx_layouts = {}
-        
-        is_first_slide = True
-        for slide in slides:
-            slide_class, headline, paragraph, bullets, quote, quote_citation, image_path, is_title, hide_headline, larger_image, fullscreen, template_base = slide
-            
-            # Apply assignment variable substitution
-            if headline:
-                headline = substitute_assignment_variables(headline, conn)
-            if paragraph:
-                paragraph = substitute_assignment_variables(paragraph, conn)
-            if bullets:
-                try:
-                    bullet_list = json.loads(bullets)
-                    bullets = json.dumps([substitute_assignment_variables(b, conn) for b in bullet_list])
-                except:
-                    pass
-            if quote:
-                quote = substitute_assignment_variables(quote, conn)
-            if quote_citation:
-                quote_citation = substitute_assignment_variables(quote_citation, conn)
-            
-            # Add slide separator (skip for first slide if no frontmatter)
-            if is_first_slide and format_type in ['pptx', 'odp']:
-                # First slide in PPTX/ODP - no separator needed
-                is_first_slide = False
-            else:
-                content += '\n---\n\n'
-                is_first_slide = False
-            
-            # For PPTX/ODP export: add layout hint based on template_base
-            pptx_layout = None
-            if format_type in ['pptx', 'odp'] and template_base:
-                pptx_layout = pptx_layouts.get(template_base)
-            
-            # Check if this is a title slide
-            if is_title:
-                # Title slide background + colorbar div (for PDF)
-                if format_type == 'pdf':
-                    content += f'<!-- _class: title -->\n'
-                    content += f'![bg](../assets/title-background.jpg)\n'
-                    content += f'<div class="colorbar"></div>\n'
-                    content += f'# Journalism Innovation\n'
-                    content += f'## {week}\n'
-                    content += f'{date}\n'
-                elif format_type in ['pptx', 'odp']:
-                    # For PPTX, use Arches_Title layout
-                    # Put everything in the div to ensure pandoc treats it as slide content
-                    content += f'::: {{custom-style="Arches_Title"}}\n\n'
-                    content += f'# Journalism Innovation\n\n'
-                    content += f'## {week}\n\n'
-                    content += f'{date}\n\n'
-                    content += f':::\n'
-                else:
-                    # Fallback for other formats
-                    content += f'# Journalism Innovation\n'
-                    content += f'## {week}\n'
-                    content += f'{date}\n'
-                continue
-            
-            # Add class for PDF (Marp uses CSS classes)
-            if slide_class and format_type == 'pdf':
-                classes = [slide_class]
-                if hide_headline:
-                    classes.append('hide-headline')
-                if fullscreen:
-                    classes.append('fullscreen')
-                content += f'<!-- _class: {" ".join(classes)} -->\n'
-            
-            # Determine template type FIRST before using these variables
-            is_quote_template = slide_class and 'quote' in slide_class
-            is_image_template = slide_class and ('image' in slide_class or slide_class == 'photo-centered')
-            is_text_only = slide_class and 'lines' in slide_class
-            is_photo_centered = slide_class == 'photo-centered'
-            is_closing = slide_class == 'closing'
-            
-            # For PPTX/ODP with pandoc: headline and images go BEFORE the div, text content goes INSIDE
-            if format_type in ['pptx', 'odp'] and pptx_layout:
-                # Add headline at top level (becomes slide title) - but not for quotes or closing
-                if headline and not is_closing and not is_quote_template:
-                    content += f'# {headline}\n\n'
-                
-                # Add image at top level (before div) for photo-centered and image templates
-                if image_path and (is_photo_centered or is_image_template):
-                    # Convert image paths for PPTX/ODP
-                    if image_path.startswith('/assets/'):
-                        image_path = 'assets/' + image_path[8:]
-                    elif image_path.startswith('assets/'):
-                        pass  # Keep as-is
-                    content += f'![Image]({image_path})\n\n'
-                
-                # Start custom-style div for text content only
-                content += f'::: {{custom-style="{pptx_layout}"}}\n\n'
-            
-            if is_closing:
-                # Closing slide: headline (contact info) and paragraph (thank you)
-                if headline:
-                    if format_type in ['pptx', 'odp']:
-                        # For PPTX, put first line as title, rest in content div
-                        lines = headline.split('\n')
-                        if lines:
-                            content += f'# {lines[0]}\n\n'
-                            # Add custom-style div if pptx_layout exists
-                            if pptx_layout and format_type in ['pptx', 'odp']:
-                                content += f'::: {{custom-style="{pptx_layout}"}}\n\n'
-                            # Add remaining headline lines
-                            if len(lines) > 1:
-                                content += '\n'.join(lines[1:]) + '\n\n'
-                            # Add paragraph
-                            if paragraph:
-                                content += f'{paragraph}\n\n'
-                            # Add logo
-                            if format_type == 'pdf':
-                                content += f'![width:400px](../assets/journalism_school_logo.png)\n'
-                            # Close div for PPTX
-                            if pptx_layout and format_type in ['pptx', 'odp']:
-                                content += ':::\n'
-                    else:
-                        # For PDF, use span styling
-                        lines = headline.split('\n')
-                        if lines:
-                            remaining_lines = '<br>'.join(lines[1:]) if len(lines) > 1 else ''
-                            if remaining_lines:
-                                content += f'# <span class="closing-name">{lines[0]}</span><br>{remaining_lines}\n'
-                            else:
-                                content += f'# <span class="closing-name">{lines[0]}</span>\n'
-                        if paragraph:
-                            content += f'\n{paragraph}\n'
-                        # Add school logo at bottom
-                        content += f'\n![width:400px](../assets/journalism_school_logo.png)\n'
-            elif is_quote_template:
-                # Quote templates: only export quote and citation
-                if quote:
-                    content += f'> {quote}\n'
-                    if quote_citation:
-                        content += f'>\n> {quote_citation}\n'
-            elif is_photo_centered:
-                # Photo centered: only headline and image (headline already added above for PPTX, image too)
-                if headline and format_type == 'pdf':
-                    content += f'# {headline}\n'
-                
-                # Add image if present (only for PDF, PPTX already added it above)
-                if image_path and format_type == 'pdf':
-                    # Convert absolute web paths to relative filesystem paths
-                    if image_path.startswith('/assets/'):
-                        image_path = '../assets/' + image_path[8:]
-                    elif image_path.startswith('assets/'):
-                        image_path = '../' + image_path
-                    content += f'\n![Image]({image_path})\n'
-            else:
-                # Non-quote templates: export headline, paragraph, bullets
-                # For PDF, add headline here; for PPTX it was already added above
-                if headline and format_type == 'pdf':
-                    content += f'# {headline}\n'
-                
-                if is_text_only:
-                    # Text-only template: preserve line breaks as they are semantic
-                    if paragraph:
-                        content += f'\n{paragraph}\n'
-                else:
-                    # Bullet templates: show paragraph (if any) then bullets
-                    if paragraph:
-                        content += f'\n{paragraph}\n'
-                    
-                    if bullets:
-                        try:
-                            bullet_list = json.loads(bullets)
-                            content += '\n'
-                            for bullet in bullet_list:
-                                if bullet.strip():
-                                    content += f'- {bullet}\n'
-                        except json.JSONDecodeError:
-                            pass
-                
-                # Add image if present (only for PDF; PPTX already added it before the div)
-                if image_path and is_image_template and format_type == 'pdf':
-                    # Convert absolute web paths to relative filesystem paths
-                    if image_path.startswith('/assets/'):
-                        image_path = '../assets/' + image_path[8:]
-                    elif image_path.startswith('assets/'):
-                        image_path = '../' + image_path
-                    content += f'\n![Image]({image_path})\n'
-            
-            # Close PPTX/ODP layout div
-            if format_type in ['pptx', 'odp'] and pptx_layout:
-                content += '\n:::\n'
-        
-        conn.close()
-        
-        # Write temporary markdown file
-        # Sanitize filename - replace slashes and other problematic characters
-        safe_week = str(week).replace('/', '-')
-        safe_date = str(date).replace('/', '-').replace(' ', '_')
-        
-        temp_md = f'output/deck_{deck_id}_temp.md'
-        output_file = f'output/Week_{safe_week}_{safe_date}.{format_type}'
-        download_name = f'Week_{safe_week}_{safe_date}.{format_type}'
-        
-        with open(temp_md, 'w') as f:
-            f.write(content)
-        
-        # Export logic by format
-        if format_type == 'pdf':
-            # Use Marp for PDF - renders with perfect styling
-            cmd = f'marp "{temp_md}" -o "{output_file}" --allow-local-files --pdf --theme presentation-styles.css'
-            print(f"Running command: {cmd}")
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            print(f"Return code: {result.returncode}")
-            print(f"Stdout: {result.stdout}")
-            print(f"Stderr: {result.stderr}")
-        elif format_type == 'pptx':
-            # Use python-pptx for direct PPTX generation with custom layouts
-            print(f"Building PPTX with python-pptx using custom layouts")
-            try:
-                # Get slides data again for pptx_builder
-                conn = sqlite3.connect(DB_PATH)
-                c = conn.cursor()
-                c.execute('''SELECT slide_class, headline, paragraph, bullets, quote, quote_citation, 
-                                    image_path, is_title, hide_headline, larger_image, fullscreen, template_base
-                             FROM slides 
-                             WHERE deck_id = ?
-                             ORDER BY order_index''', (deck_id,))
-                slides_data = c.fetchall()
-                
-                # Apply assignment variable substitution to slides_data
-                processed_slides = []
-                for slide in slides_data:
-                    slide_class, headline, paragraph, bullets, quote, quote_citation, image_path, is_title, hide_headline, larger_image, fullscreen, template_base = slide
-                    
-                    # Substitute assignment variables
-                    if headline:
-                        headline = substitute_assignment_variables(headline, conn)
-                    if paragraph:
-                        paragraph = substitute_assignment_variables(paragraph, conn)
-                    if bullets:
-                        try:
-                            bullet_list = json.loads(bullets)
-                            bullets = json.dumps([substitute_assignment_variables(b, conn) for b in bullet_list])
-                        except:
-                            pass
-                    if quote:
-                        quote = substitute_assignment_variables(quote, conn)
-                    if quote_citation:
-                        quote_citation = substitute_assignment_variables(quote_citation, conn)
-                    
-                    processed_slides.append((slide_class, headline, paragraph, bullets, quote, quote_citation, image_path, is_title, hide_headline, larger_image, fullscreen, template_base))
-                
-                conn.close()
-                
-                # Build PPTX using custom layouts
-                success = build_pptx_from_slides(
-                    slides_data=processed_slides,
-                    output_path=output_file,
-                    template_path='templates/4734_template.potx',
-                    pptx_layouts_map=pptx_layouts,
-                    deck_info={'week': week, 'date': date, 'course_title': 'Journalism Innovation'}
-                )
-                
-                if success:
-                    print(f"Successfully created PPTX: {output_file}")
-                    # Create a result-like object with stderr for consistent error handling
-                    result = type('obj', (object,), {'returncode': 0, 'stderr': ''})()
-                else:
-                    print(f"Failed to create PPTX")
-                    result = type('obj', (object,), {'returncode': 1, 'stderr': 'pptx_builder reported failure'})()
-            except Exception as e:
-                print(f"Error building PPTX: {e}")
-                import traceback
-                traceback.print_exc()
-                result = type('obj', (object,), {'returncode': 1, 'stderr': str(e)})()
-        elif format_type == 'odp':
-            # For ODP, first create PPTX with python-pptx then convert with LibreOffice
-            temp_pptx = output_file.replace('.odp', '_temp.pptx')
-            print(f"Building temporary PPTX for ODP conversion")
-            try:
-                # Get slides data for pptx_builder
-                conn = sqlite3.connect(DB_PATH)
-                c = conn.cursor()
-                c.execute('''SELECT slide_class, headline, paragraph, bullets, quote, quote_citation, 
-                                    image_path, is_title, hide_headline, larger_image, fullscreen, template_base
-                             FROM slides 
-                             WHERE deck_id = ?
-                             ORDER BY order_index''', (deck_id,))
-                slides_data = c.fetchall()
-                
-                # Apply assignment variable substitution to slides_data
-                processed_slides = []
-                for slide in slides_data:
-                    slide_class, headline, paragraph, bullets, quote, quote_citation, image_path, is_title, hide_headline, larger_image, fullscreen, template_base = slide
-                    
-                    # Substitute assignment variables
-                    if headline:
-                        headline = substitute_assignment_variables(headline, conn)
-                    if paragraph:
-                        paragraph = substitute_assignment_variables(paragraph, conn)
-                    if bullets:
-                        try:
-                            bullet_list = json.loads(bullets)
-                            bullets = json.dumps([substitute_assignment_variables(b, conn) for b in bullet_list])
-                        except:
-                            pass
-                    if quote:
-                        quote = substitute_assignment_variables(quote, conn)
-                    if quote_citation:
-                        quote_citation = substitute_assignment_variables(quote_citation, conn)
-                    
-                    processed_slides.append((slide_class, headline, paragraph, bullets, quote, quote_citation, image_path, is_title, hide_headline, larger_image, fullscreen, template_base))
-                
-                conn.close()
-                
-                # Build PPTX
-                build_pptx_from_slides(
-                    slides_data=processed_slides,
-                    output_path=temp_pptx,
-                    template_path='templates/4734_template.potx',
-                    pptx_layouts_map=pptx_layouts,
-                    deck_info={'week': week, 'date': date, 'course_title': 'Journalism Innovation'}
-                )
-                # Provide a minimal result object with stderr for downstream error handling
-                result = type('obj', (object,), {'returncode': 0, 'stderr': ''})()
-            except Exception as e:
-                print(f"Error building temp PPTX: {e}")
-                result = type('obj', (object,), {'returncode': 1, 'stderr': str(e)})()
-        
-        # For ODP, convert PPTX to ODP using LibreOffice  
-        if format_type == 'odp' and result.returncode == 0:
-            soffice_path = '/Applications/LibreOffice.app/Contents/MacOS/soffice'
-            odp_cmd = f'"{soffice_path}" --headless --convert-to odp --outdir output "{temp_pptx}"'
-            print(f"Converting to ODP: {odp_cmd}")
-            odp_result = subprocess.run(odp_cmd, shell=True, capture_output=True, text=True)
-            print(f"ODP conversion return code: {odp_result.returncode}")
-            
-            # Clean up temp PPTX
-            if os.path.exists(temp_pptx):
-                os.remove(temp_pptx)
-            
-            if odp_result.returncode != 0:
-                return jsonify({'error': f'ODP conversion failed: {odp_result.stderr}'}), 500
-        
-        # Keep temp file for debugging - do not delete
-        # if os.path.exists(temp_md):
-        #     os.remove(temp_md)
+        deck = markdown_renderer.DeckContext(markdown_renderer.PDF_COURSE_TITLE, week, date)
+        content += ''.join('\n---\n\n' + chunk for chunk in markdown_renderer.render_slides(slides, deck, 'pdf'))
+    
+    # Sanitize filename - replace slashes and other problematic characters
+    safe_week = str(week).replace('/', '-')
+    safe_date = str(date).replace('/', '-').replace(' ', '_')
+    download_name = f'Week_{safe_week}_{safe_date}.{format_type}'
+    
+    # Exports are cached by content: slides, deck values, template, layouts, theme and images
+    variables = {'week': week, 'date': date, 'topic1': topic1, 'topic2': topic2}
+    if format_type != 'pdf':
+        variables['imageDpi'] = image_renditions.TARGET_DPI if downscale_images else None
+    key = export_cache.export_key(format_type, slides, variables, files=EXPORT_DEPENDENCIES[format_type])
+    
+    return {
+        'deck_id': deck_id,
+        'format': format_type,
+        'key': key,
+        'download_name': download_name,
+        'content': content,
+        'slides': slides,
+        'pptx_layouts': pptx_layouts,
+        'template_path': PPTX_TEMPLATE_PATH,
+        'deck_info': {'week': week, 'date': date, 'course_title': 'Journalism Innovation'},
+        'downscale_images': downscale_images,
+    }
+
+@app.route('/api/decks/<int:deck_id>/export', methods=['GET'])
+def export_deck(deck_id):
+    """Export a specific deck to PDF or PPTX format"""
+    try:
+        format_type = request.args.get('format', 'pdf').lower()
         
-        if result.returncode != 0:
-            print(f"Conversion error: {result.stderr}")
-            return jsonify({'error': f'Conversion failed: {result.stderr}'}), 500
+        if format_type not in ['pdf', 'pptx', 'odp']:
+            return jsonify({'error': 'Invalid format. Use pdf, pptx, or odp'}), 400
         
-        # Check if output file was created
-        if not os.path.exists(output_file):
-            return jsonify({'error': f'Output file was not created: {output_file}'}), 500
+        # ?images=original embeds full-resolution images instead of downscaled renditions
+        spec = prepare_deck_export(get_db(), deck_id, format_type, request.args.get('images') != 'original')
+        if spec is None:
+            return jsonify({'error': 'Deck not found'}), 404
         
-        # Send file
-        return send_file(
-            output_file,
-            as_attachment=True,
-            download_name=download_name,
-            mimetype='application/pdf' if format_type == 'pdf' else 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
-        )
+        # Built into memory (or served from the cache) and streamed; nothing is read back from disk
+        export_file, size = export_cache.fetch(
+            spec['key'], format_type, functools.partial(export_jobs.build_deck_export, spec))
+        return stream_export(export_file, size, format_type, spec['download_name'], etag=spec['key'])
     except Exception as e:
         print(f"Export error: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-def process_paragraph_linebreaks(text):
-    """Preserve line breaks in paragraph text"""
-    if not text:
-        return text
-    # Return text as-is to preserve original formatting
-    return text
+@app.route('/api/decks/<int:deck_id>/export-jobs', methods=['POST'])
+def create_export_job(deck_id):
+    """Queue a background export of a deck; poll GET /api/export-jobs/<id> for the result"""
+    format_type = (request.args.get('format') or (request.get_json(silent=True) or {}).get('format') or 'pdf').lower()
+    if format_type not in ['pdf', 'pptx', 'odp']:
+        return jsonify({'error': 'Invalid format. Use pdf, pptx, or odp'}), 400
+    
+    spec = prepare_deck_export(get_db(), deck_id, format_type, request.args.get('images') != 'original')
+    if spec is None:
+        return jsonify({'error': 'Deck not found'}), 404
+    
+    try:
+        job_id = export_jobs.submit(spec)
+    except export_jobs.QueueFull as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '30'}
+    info = export_jobs.describe(export_jobs.get(job_id))
+    info['statusUrl'] = f'/api/export-jobs/{job_id}'
+    return jsonify(info), 202
+
+@app.route('/api/export-jobs/<job_id>', methods=['GET'])
+def export_job_status(job_id):
+    """Report an export job's status; with ?download=1 serve the finished file"""
+    job = export_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Export job not found'}), 404
+    
+    if request.args.get('download'):
+        if job['status'] != 'done':
+            return jsonify({'error': f"Export job is {job['status']}"}), 409
+        return send_export(job['path'], job['format'], job['downloadName'])
+    
+    info = export_jobs.describe(job)
+    if job['status'] == 'done':
+        info['downloadUrl'] = f'/api/export-jobs/{job_id}?download=1'
+    return jsonify(info)
+
+EXPORT_MIMETYPES = {
+    'pdf': 'application/pdf',
+    'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    'odp': 'application/vnd.oasis.opendocument.presentation',
+}
+
+def send_export(path, format_type, download_name):
+    """Send a finished export file as a download"""
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=download_name,
+        mimetype=EXPORT_MIMETYPES[format_type]
+    )
 
+def stream_export(export_file, size, format_type, download_name, etag):
+    """Stream an open export file as a download with Content-Length and ETag (closes the file)"""
+    response = Response(wrap_file(request.environ, export_file), mimetype=EXPORT_MIMETYPES[format_type],
+                        direct_passthrough=True)
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    response.content_length = size
+    response.set_etag(etag)
+    return response.make_conditional(request, accept_ranges=True, complete_length=size)
 
-def generate_presentation_markdown(presentation_id, deck_id=None):
-    """Generate markdown content for a presentation or single deck"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+def prepare_presentation_exports(conn, presentation_id, format_type):
+    """Export specs for every deck of a presentation, in deck order (None if it does not exist)"""
     c = conn.cursor()
+    c.execute('SELECT name FROM presentations WHERE id = ?', (presentation_id,))
+    row = c.fetchone()
+    if not row:
+        return None
+    c.execute('SELECT id FROM decks WHERE presentation_id = ? ORDER BY order_index, id', (presentation_id,))
+    specs = []
+    for position, (deck_id,) in enumerate(c.fetchall(), start=1):
+        spec = prepare_deck_export(conn, deck_id, format_type)
+        spec['position'] = position
+        specs.append(spec)
+    return row[0], specs
+
+@app.route('/api/presentations/<int:presentation_id>/export-all', methods=['GET'])
+def export_all_decks(presentation_id):
+    """Export every deck of a presentation in parallel, streamed back as one ZIP"""
+    format_type = request.args.get('format', 'pptx').lower()
+    if format_type not in ['pdf', 'pptx', 'odp']:
+        return jsonify({'error': 'Invalid format. Use pdf, pptx, or odp'}), 400
+    
+    prepared = prepare_presentation_exports(get_db(), presentation_id, format_type)
+    if prepared is None:
+        return jsonify({'error': 'Presentation not found'}), 404
+    name, specs = prepared
+    
+    # The generator only touches the filesystem, so it can outlive the request's DB connection
+    archive = export_jobs.stream_zip(export_jobs.export_many(specs))
+    safe_name = re.sub(r'[^A-Za-z0-9_-]+', '_', name or 'presentation').strip('_')
+    return Response(archive, mimetype='application/zip', headers={
+        'Content-Disposition': f'attachment; filename="{safe_name}_{format_type}.zip"'
+    })
+
+@app.route('/api/presentations/<int:presentation_id>/export-pptx', methods=['GET'])
+def export_presentation_pptx(presentation_id):
+    """Export every deck of a presentation as one PPTX, one section per deck (?sections=0 leaves them out)"""
+    prepared = prepare_presentation_exports(get_db(), presentation_id, 'pptx')
+    if prepared is None:
+        return jsonify({'error': 'Presentation not found'}), 404
+    name, specs = prepared
+    sections = request.args.get('sections') != '0'
+    
+    # Cached on the decks' own export keys, so an unchanged semester is not rebuilt
+    key = hashlib.sha256(json.dumps({'decks': [spec['key'] for spec in specs], 'sections': sections}).encode()).hexdigest()
+    build = functools.partial(build_pptx_from_decks, specs, template_path=PPTX_TEMPLATE_PATH,
+                              pptx_layouts_map=specs[0]['pptx_layouts'] if specs else {}, sections=sections)
+    export_file, size = export_cache.fetch(key, 'pptx', lambda output_file: build(output_path=output_file))
+    safe_name = re.sub(r'[^A-Za-z0-9_-]+', '_', name or 'presentation').strip('_')
+    return stream_export(export_file, size, 'pptx', f'{safe_name}.pptx', etag=key)
+
+def generate_presentation_markdown(presentation_id, deck_id=None, export_metadata=True):
+    """Generate markdown content for a presentation or single deck
+
+    export_metadata adds EXPORT_DATE and the ASSIGNMENTS list to the front matter
+    (used by build.js); the plain download omits them.
+    """
+    conn = get_db()
+    c = conn.cursor()
+    c.row_factory = sqlite3.Row
     
     # Get presentation
     c.execute('SELECT * FROM presentations WHERE id = ?', (presentation_id,))
     row = c.fetchone()
     if not row:
-        conn.close()
         return None, 'Presentation not found'
     
     # Build proper front matter with Marp configuration and dynamic variables
     import datetime
     presentation_title = row['name'] if isinstance(row, sqlite3.Row) else row[1]
+    substitutions = load_substitutions(conn, course_title=presentation_title)
 
-    # Attempt to fetch assignments (table may not exist in test DBs)
-    assignments_list = []
-    try:
-        c.execute('SELECT name, due_date FROM assignments ORDER BY due_date')
-        assignments_list = c.fetchall()
-    except Exception:
+    if not export_metadata:
+        content = f'''---
+marp: true
+theme: classroom
+paginate: true
+COURSE_TITLE: "{presentation_title}"
+PRESENTATION_TITLE: "{presentation_title}"
+---
+
+'''
+    else:
+        # Attempt to fetch assignments (table may not exist in test DBs)
         assignments_list = []
+        try:
+            c.execute('SELECT name, due_date FROM assignments ORDER BY due_date')
+            assignments_list = c.fetchall()
+        except Exception:
+            assignments_list = []
 
-    # Compose YAML front matter
-    content = f'''---
+        # Compose YAML front matter
+        content = f'''---
 marp: true
 theme: classroom
 paginate: true
@@ -1230,32 +1185,24 @@ EXPORT_DATE: "{datetime.date.today().isoformat()}"
 ASSIGNMENTS:
 '''
 
-    # Add assignments entries if present
-    for a in assignments_list:
-        try:
-            a_name = a['name'] if isinstance(a, sqlite3.Row) else a[0]
-            a_due = a['due_date'] if isinstance(a, sqlite3.Row) else a[1]
-            a_due = a_due if a_due else ''
-            content += f'  - name: "{a_name}"\n    due_date: "{a_due}"\n'
-        except Exception:
-            continue
+        # Add assignments entries if present
+        for a in assignments_list:
+            try:
+                a_name = a['name'] if isinstance(a, sqlite3.Row) else a[0]
+                a_due = a['due_date'] if isinstance(a, sqlite3.Row) else a[1]
+                a_due = a_due if a_due else ''
+                content += f'  - name: "{a_name}"\n    due_date: "{a_due}"\n'
+            except Exception:
+                continue
 
-    content += '\n'
+        content += '\n'
 
     # Get all decks and slides (or just one deck if deck_id specified)
-    try:
-        if deck_id:
-            c.execute('SELECT id, week, date, topic1, topic2 FROM decks WHERE id = ?', (deck_id,))
-        else:
-            c.execute('SELECT id, week, date, topic1, topic2 FROM decks WHERE presentation_id = ? ORDER BY order_index', 
-                     (presentation_id,))
-    except sqlite3.OperationalError:
-        # Older test databases may not have topic1/topic2 columns yet - fall back to simpler select
-        if deck_id:
-            c.execute('SELECT id, week, date FROM decks WHERE id = ?', (deck_id,))
-        else:
-            c.execute('SELECT id, week, date FROM decks WHERE presentation_id = ? ORDER BY order_index', 
-                     (presentation_id,))
+    if deck_id:
+        c.execute('SELECT id, week, date FROM decks WHERE id = ?', (deck_id,))
+    else:
+        c.execute('SELECT id, week, date FROM decks WHERE presentation_id = ? ORDER BY order_index', 
+                 (presentation_id,))
     decks = c.fetchall()
     
     slides_markdown = []
@@ -1264,212 +1211,101 @@ ASSIGNMENTS:
         deck_id = deck[0]
         week = deck[1]
         date = deck[2]
+        deck_substitutions = with_variables(substitutions, week=week, date=date)
         
         c.execute('''SELECT slide_class, headline, paragraph, bullets, quote, quote_citation, 
                     image_path, is_title, hide_headline, larger_image, fullscreen FROM slides WHERE deck_id = ? ORDER BY order_index''', 
                  (deck_id,))
         
-        for slide in c.fetchall():
-            slide_class = slide[0]
-            headline = slide[1]
-            paragraph = slide[2]
-            bullets = json.loads(slide[3]) if slide[3] else []
-            quote = slide[4]
-            quote_citation = slide[5]
-            image_path = slide[6]
-            is_title = slide[7]
-            hide_headline = slide[8]
-            larger_image = slide[9]
-            fullscreen = slide[10]
-            
-            # Apply assignment variable substitution
-            if headline:
-                headline = substitute_assignment_variables(headline, conn)
-            if paragraph:
-                paragraph = substitute_assignment_variables(paragraph, conn)
-            if bullets:
-                bullets = [substitute_assignment_variables(b, conn) for b in bullets]
-            if quote:
-                quote = substitute_assignment_variables(quote, conn)
-            if quote_citation:
-                quote_citation = substitute_assignment_variables(quote_citation, conn)
-            
-            slide_md = ''
-            
-            if is_title:
-                # Title slide with week/date variables
-                slide_md = f'<!--\nWEEK: "{week}"\nDATE: "{date}"\n_class: title\n-->\n'
-                slide_md += f'# {presentation_title}\n'
-                if week:
-                    slide_md += f'## {week}\n'
-                if date:
-                    slide_md += f'{date}\n'
-                # Render topics (topic1, topic2) if present on deck tuple
-                t1 = deck[3] if len(deck) > 3 else ''
-                t2 = deck[4] if len(deck) > 4 else ''
-                topics = [t for t in (t1, t2) if t]
-                if topics:
-                    topic_text = ' <br> '.join(topics)
-                    slide_md += f'## {topic_text}\n'
-            else:
-                # Add class (append hide-headline and/or fullscreen class if needed)
-                classes = [slide_class] if slide_class else []
-                if hide_headline:
-                    classes.append('hide-headline')
-                if fullscreen:
-                    classes.append('fullscreen')
-                slide_md = f'<!-- _class: {" ".join(classes)} -->\n' if classes else ''
-                
-                # Determine what fields to export based on template type
-                is_quote_template = slide_class and 'quote' in slide_class
-                is_image_template = slide_class and ('image' in slide_class or slide_class == 'photo-centered')
-                is_text_only = slide_class and 'lines' in slide_class
-                is_photo_centered = slide_class == 'photo-centered'
-                is_closing = slide_class == 'closing'
-                
-                if is_closing:
-                    # Closing slide: headline (contact info) and paragraph (thank you)
-                    if headline:
-                        # Split headline into lines and wrap first line in span, join rest with <br>
-                        lines = headline.split('\n')
-                        if lines:
-                            remaining_lines = '<br>'.join(lines[1:]) if len(lines) > 1 else ''
-                            if remaining_lines:
-                                slide_md += f'# <span class="closing-name">{lines[0]}</span><br>{remaining_lines}\n'
-                            else:
-                                slide_md += f'# <span class="closing-name">{lines[0]}</span>\n'
-                    
-                    if paragraph:
-                        slide_md += f'\n{paragraph}\n'
-                elif is_quote_template:
-                    # Quote templates: only export quote and citation
-                    if quote:
-                        slide_md += f'> {quote}\n'
-                        if quote_citation:
-                            slide_md += f'>\n> {quote_citation}\n'
-                elif is_photo_centered:
-                    # Photo centered: only headline and image
-                    if headline:
-                        slide_md += f'# {headline}\n'
-                    
-                    # Add image if present
-                    if image_path:
-                        slide_md += f'\n![Image]({image_path})\n'
-                else:
-                    # Non-quote templates: export headline, paragraph, bullets
-                    if headline:
-                        slide_md += f'# {headline}\n'
-                    
-                    if is_text_only:
-                        # Text-only template: show paragraph, skip bullets
-                        if paragraph:
-                            slide_md += f'\n{process_paragraph_linebreaks(paragraph)}\n'
-                    else:
-                        # Bullet templates: show paragraph (if any) then bullets
-                        if paragraph:
-                            slide_md += f'\n{process_paragraph_linebreaks(paragraph)}\n'
-                        
-                        if bullets:
-                            slide_md += '\n'
-                            if slide_class and '2col' in slide_class:
-                                midpoint = (len(bullets) + 1) // 2
-                                slide_md += '<div>\n\n'
-                                for bullet in bullets[:midpoint]:
-                                    slide_md += f'- {bullet}\n'
-                                slide_md += '\n</div>\n<div>\n\n'
-                                for bullet in bullets[midpoint:]:
-                                    slide_md += f'- {bullet}\n'
-                                slide_md += '\n</div>\n'
-                            else:
-                                for bullet in bullets:
-                                    slide_md += f'- {bullet}\n'
-                    
-                    # Only export image if template supports images (but not photo-centered, handled above)
-                    if is_image_template and not is_photo_centered and image_path:
-                        slide_md += f'\n![Image]({image_path})\n'
-            
-                # If no headline was provided, and this is an image/photo template, ensure the
-                # Marp class comment includes `hide-headline` so layout CSS can collapse reserved space.
-                if not headline and slide_class and any(k in slide_class for k in ('image', 'photo', 'full-photo')):
-                    if slide_md:
-                        if 'hide-headline' not in slide_md:
-                            slide_md = slide_md.replace('-->\n', ' hide-headline -->\n')
-                    else:
-                        slide_md = '<!-- _class: hide-headline -->\n'
-
-            # Sanitize title slides: ensure topics are not rendered as extra subtitle lines
-            if is_title:
-                parts = slide_md.split('\n')
-                out = []
-                seen_sub = False
-                for p in parts:
-                    if p.startswith('## '):
-                        if not seen_sub:
-                            out.append(p)
-                            seen_sub = True
-                        else:
-                            # skip additional subtitle lines (these would be topics)
-                            continue
-                    elif p:
-                        out.append(p)
-                slide_md = '\n'.join(out) + ('\n' if out else '')
-
-            # Append the rendered slide markdown to the list
-            slides_markdown.append(slide_md)
-
-    content += '\n\n---\n\n'.join(slides_markdown)
+        # Apply assignment/deck variable substitution, then render (memoized per slide)
+        slides = [substitute_slide_row(slide, deck_substitutions) for slide in c.fetchall()]
+        context = markdown_renderer.DeckContext(presentation_title, week, date)
+        slides_markdown.extend(markdown_renderer.render_slides(slides, context))
+    
+    content += markdown_renderer.SLIDE_SEPARATOR.join(slides_markdown)
+    # Resolve any remaining front-matter/comment {{VAR}}s here rather than in build.js
+    content = markdown_renderer.apply_template_variables(content)
     
     filename = f"{row[1].replace(' ', '_')}.md"
-    conn.close()
     return content, filename
 
+def presentation_version(conn, presentation_id):
+    """Return the change counters that cover a presentation's content, or None if untracked.
+
+    The pair (presentation counter, shared assignments counter) changes whenever a
+    slide, deck, the presentation itself or any assignment is written.
+    """
+    try:
+        rows = conn.execute('SELECT presentation_id, version FROM change_counters WHERE presentation_id IN (?, 0)',
+                            (presentation_id,)).fetchall()
+    except sqlite3.OperationalError:
+        return None  # Databases without change tracking are always treated as dirty
+    versions = dict(rows)
+    return versions.get(presentation_id, 0), versions.get(0, 0)
+
+def write_file_atomically(path, content):
+    """Write text to path via a temp file and rename, so readers never see a partial file"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.' + os.path.basename(path) + '.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+# Where auto-export writes <presentation name>.md
+AUTO_EXPORT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# presentation_id -> ((change counters, export date), path) of the last auto-export
+_auto_exports = {}
+
 @app.route('/api/presentations/<int:presentation_id>/auto-export', methods=['POST'])
 def auto_export_presentation(presentation_id):
+    # EXPORT_DATE is in the front matter, so a new day also counts as a change
+    state = (presentation_version(get_db(), presentation_id), datetime.now().date().isoformat())
+    last = _auto_exports.get(presentation_id)
+    if state[0] is not None and last and last[0] == state and os.path.exists(last[1]):
+        return jsonify({'success': True, 'file': os.path.basename(last[1]), 'changed': False, 'generationMs': 0})
+    
+    started = time.perf_counter()
     content, filename = generate_presentation_markdown(presentation_id)
     if content is None:
         return jsonify({'error': filename}), 404
     
     # Save to file
-    filepath = os.path.join(os.path.dirname(__file__), filename)
-    with open(filepath, 'w') as f:
-        f.write(content)
+    filepath = os.path.join(AUTO_EXPORT_DIR, filename)
+    write_file_atomically(filepath, content)
+    generation_ms = (time.perf_counter() - started) * 1000
+    _auto_exports[presentation_id] = (state, filepath)
     
-    return jsonify({'success': True, 'file': filename})
+    return jsonify({'success': True, 'file': filename, 'changed': True, 'generationMs': round(generation_ms, 1)})
+
+def render_preview(scope, content):
+    """Render preview markdown in its own workspace and return its URL"""
+    try:
+        url = preview_workspaces.render(scope, content)
+    except RuntimeError as e:
+        return jsonify({'error': 'Build failed', 'output': str(e)}), 500
+    return jsonify({'success': True, 'file': url.lstrip('/'), 'url': url})
 
 @app.route('/api/presentations/<int:presentation_id>/preview', methods=['POST'])
 def preview_presentation(presentation_id):
-    # Generate markdown for full presentation
+    # Generate markdown for full presentation ({{VAR}}s are already resolved)
     content, _ = generate_presentation_markdown(presentation_id)
     if content is None:
         return jsonify({'error': 'Failed to generate markdown'}), 500
     
-    # Write to presentation.md
-    presentation_path = os.path.join(os.path.dirname(__file__), 'presentation.md')
-    with open(presentation_path, 'w') as f:
-        f.write(content)
-    
-    # Run build.js to preprocess
-    try:
-        result = subprocess.run(['npm', 'run', 'build'], 
-                              capture_output=True, 
-                              text=True, 
-                              cwd=os.path.dirname(__file__))
-        if result.returncode != 0:
-            return jsonify({'error': 'Build failed', 'output': result.stderr}), 500
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    
-    return jsonify({'success': True, 'file': 'output/presentation.html'})
+    return render_preview(f'presentation-{presentation_id}', content)
 
 @app.route('/api/decks/<int:deck_id>/preview', methods=['POST'])
 def preview_deck(deck_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_db().cursor()
     
     # Get deck's presentation_id
     c.execute('SELECT presentation_id FROM decks WHERE id = ?', (deck_id,))
     deck_row = c.fetchone()
-    conn.close()
     
     if not deck_row:
         return jsonify({'error': 'Deck not found'}), 404
@@ -1481,223 +1317,17 @@ def preview_deck(deck_id):
     if content is None:
         return jsonify({'error': 'Failed to generate markdown'}), 500
     
-    # Write to presentation.md
-    presentation_path = os.path.join(os.path.dirname(__file__), 'presentation.md')
-    with open(presentation_path, 'w') as f:
-        f.write(content)
-    
-    # Run build.js to preprocess
-    try:
-        result = subprocess.run(['npm', 'run', 'build'], 
-                              capture_output=True, 
-                              text=True, 
-                              cwd=os.path.dirname(__file__))
-        if result.returncode != 0:
-            return jsonify({'error': 'Build failed', 'output': result.stderr}), 500
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    
-    return jsonify({'success': True, 'file': 'output/presentation.html'})
+    return render_preview(f'deck-{deck_id}', content)
 
 @app.route('/api/presentations/<int:presentation_id>/export', methods=['GET'])
 def export_presentation(presentation_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    c.execute('SELECT name, front_matter FROM presentations WHERE id = ?', (presentation_id,))
-    row = c.fetchone()
-    if not row:
-        conn.close()
+    content, filename = generate_presentation_markdown(presentation_id, export_metadata=False)
+    if content is None:
         return jsonify({'error': 'Not found'}), 404
-
-    # Presentation title (used for title slides)
-    presentation_title = row['name'] if isinstance(row, sqlite3.Row) else row[0]
-    
-    # Build proper front matter with Marp configuration
-    content = f'''---
-marp: true
-theme: classroom
-paginate: true
-COURSE_TITLE: "{presentation_title}"
-PRESENTATION_TITLE: "{presentation_title}"
----
-
-'''
-    
-    # Get all decks and slides
-    c.execute('SELECT id, week, date FROM decks WHERE presentation_id = ? ORDER BY order_index', 
-             (presentation_id,))
-    decks = c.fetchall()
-    
-    slides_markdown = []
-    
-    for deck in decks:
-        deck_id = deck[0]
-        week = deck[1]
-        date = deck[2]
-        
-        c.execute('''SELECT slide_class, headline, paragraph, bullets, quote, quote_citation, 
-                    image_path, is_title, hide_headline, larger_image, fullscreen FROM slides WHERE deck_id = ? ORDER BY order_index''', 
-                 (deck_id,))
-        
-        for slide in c.fetchall():
-            slide_class = slide[0]
-            headline = slide[1]
-            paragraph = slide[2]
-            bullets = json.loads(slide[3]) if slide[3] else []
-            quote = slide[4]
-            quote_citation = slide[5]
-            image_path = slide[6]
-            is_title = slide[7]
-            hide_headline = slide[8]
-            larger_image = slide[9]
-            fullscreen = slide[10]
-            
-            # Apply assignment variable substitution
-            if headline:
-                headline = substitute_assignment_variables(headline, conn)
-            if paragraph:
-                paragraph = substitute_assignment_variables(paragraph, conn)
-            if bullets:
-                bullets = [substitute_assignment_variables(b, conn) for b in bullets]
-            if quote:
-                quote = substitute_assignment_variables(quote, conn)
-            if quote_citation:
-                quote_citation = substitute_assignment_variables(quote_citation, conn)
-            
-            slide_md = ''
-            
-            if is_title:
-                # Title slide with week/date variables
-                slide_md = f'<!--\nWEEK: "{week}"\nDATE: "{date}"\n_class: title\n-->\n'
-                slide_md += f'# {presentation_title}\n'
-                if week:
-                    slide_md += f'## {week}\n'
-                if date:
-                    slide_md += f'{date}\n'
-                # Render topics (topic1, topic2) if present on deck tuple
-                t1 = deck[3] if len(deck) > 3 else ''
-                t2 = deck[4] if len(deck) > 4 else ''
-                topics = [t for t in (t1, t2) if t]
-                if topics:
-                    topic_text = ' <br> '.join(topics)
-                    slide_md += f'## {topic_text}\n'
-            else:
-                # Add class (append hide-headline and/or fullscreen class if needed)
-                classes = [slide_class] if slide_class else []
-                if hide_headline:
-                    classes.append('hide-headline')
-                if fullscreen:
-                    classes.append('fullscreen')
-                slide_md = f'<!-- _class: {" ".join(classes)} -->\n' if classes else ''
-                
-                # Determine what fields to export based on template type
-                is_quote_template = slide_class and 'quote' in slide_class
-                is_image_template = slide_class and ('image' in slide_class or slide_class == 'photo-centered')
-                is_text_only = slide_class and 'lines' in slide_class
-                is_photo_centered = slide_class == 'photo-centered'
-                is_closing = slide_class == 'closing'
-                
-                if is_closing:
-                    # Closing slide: headline (contact info) and paragraph (thank you)
-                    if headline:
-                        # Split headline into lines and wrap first line in span, join rest with <br>
-                        lines = headline.split('\n')
-                        if lines:
-                            remaining_lines = '<br>'.join(lines[1:]) if len(lines) > 1 else ''
-                            if remaining_lines:
-                                slide_md += f'# <span class="closing-name">{lines[0]}</span><br>{remaining_lines}\n'
-                            else:
-                                slide_md += f'# <span class="closing-name">{lines[0]}</span>\n'
-                    
-                    if paragraph:
-                        slide_md += f'\n{paragraph}\n'
-                elif is_quote_template:
-                    # Quote templates: only export quote and citation
-                    if quote:
-                        slide_md += f'> {quote}\n'
-                        if quote_citation:
-                            slide_md += f'>\n> {quote_citation}\n'
-                elif is_photo_centered:
-                    # Photo centered: only headline and image
-                    if headline:
-                        slide_md += f'# {headline}\n'
-                    
-                    # Add image if present
-                    if image_path:
-                        slide_md += f'\n![Image]({image_path})\n'
-                else:
-                    # Non-quote templates: export headline, paragraph, bullets
-                    if headline:
-                        slide_md += f'# {headline}\n'
-                    
-                    if is_text_only:
-                        # Text-only template: show paragraph, skip bullets
-                        if paragraph:
-                            slide_md += f'\n{process_paragraph_linebreaks(paragraph)}\n'
-                    else:
-                        # Bullet templates: show paragraph (if any) then bullets
-                        if paragraph:
-                            slide_md += f'\n{process_paragraph_linebreaks(paragraph)}\n'
-                        
-                        if bullets:
-                            slide_md += '\n'
-                            if slide_class and '2col' in slide_class:
-                                midpoint = (len(bullets) + 1) // 2
-                                slide_md += '<div>\n\n'
-                                for bullet in bullets[:midpoint]:
-                                    slide_md += f'- {bullet}\n'
-                                slide_md += '\n</div>\n<div>\n\n'
-                                for bullet in bullets[midpoint:]:
-                                    slide_md += f'- {bullet}\n'
-                                slide_md += '\n</div>\n'
-                            else:
-                                for bullet in bullets:
-                                    slide_md += f'- {bullet}\n'
-                    
-                    # Only export image if template supports images (but not photo-centered, handled above)
-                    if is_image_template and not is_photo_centered and image_path:
-                        slide_md += f'\n![Image]({image_path})\n'
-            
-                # If no headline was provided, and this is an image/photo template, ensure the
-                # Marp class comment includes `hide-headline` so layout CSS can collapse reserved space.
-                if not headline and slide_class and any(k in slide_class for k in ('image', 'photo', 'full-photo')):
-                    if slide_md:
-                        if 'hide-headline' not in slide_md:
-                            slide_md = slide_md.replace('-->\n', ' hide-headline -->\n')
-                    else:
-                        slide_md = '<!-- _class: hide-headline -->\n'
-
-            # Sanitize title slides: ensure topics are not rendered as extra subtitle lines
-            if is_title:
-                parts = slide_md.split('\n')
-                out = []
-                seen_sub = False
-                for p in parts:
-                    if p.startswith('## '):
-                        if not seen_sub:
-                            out.append(p)
-                            seen_sub = True
-                        else:
-                            # skip additional subtitle lines (these would be topics)
-                            continue
-                    elif p:
-                        out.append(p)
-                slide_md = '\n'.join(out) + ('\n' if out else '')
-
-            slides_markdown.append(slide_md)
-    
-    content += '\n\n---\n\n'.join(slides_markdown)
-    
-    conn.close()
     
-    # Save to file
-    filename = f"{row[0].replace(' ', '_')}.md"
-    filepath = f"/tmp/{filename}"
-    with open(filepath, 'w') as f:
-        f.write(content)
-    
-    return send_file(filepath, as_attachment=True, download_name=filename)
+    data = content.encode('utf-8')
+    return send_file(io.BytesIO(data), as_attachment=True, download_name=filename, mimetype='text/markdown',
+                     etag=hashlib.sha256(data).hexdigest())
 
 @app.route('/api/presentations/import', methods=['POST'])
 def import_presentation():
@@ -1708,186 +1338,183 @@ def import_presentation():
     # Parse markdown content
     slides_raw = markdown_content.split('---')
     
-    conn = sqlite3.connect('presentations.db')
-    c = conn.cursor()
+    with db_writer() as conn:
+        c = conn.cursor()
     
-    # Create presentation
-    front_matter = slides_raw[0].strip() if slides_raw else ''
-    name = filename.replace('.md', '')
+        # Create presentation
+        front_matter = slides_raw[0].strip() if slides_raw else ''
+        name = filename.replace('.md', '')
     
-    c.execute('INSERT INTO presentations (name, front_matter) VALUES (?, ?)',
-              (name, front_matter))
-    presentation_id = c.lastrowid
+        c.execute('INSERT INTO presentations (name, front_matter) VALUES (?, ?)',
+                  (name, front_matter))
+        presentation_id = c.lastrowid
     
-    # Parse slides and organize into decks
-    current_deck_id = None
-    deck_order = 0
-    slide_order = 0
+        # Parse slides and organize into decks
+        current_deck_id = None
+        deck_order = 0
+        slide_order = 0
     
-    for i, slide_content in enumerate(slides_raw[1:], 1):  # Skip front matter
-        lines = slide_content.strip().split('\n')
-        if not lines:
-            continue
+        for i, slide_content in enumerate(slides_raw[1:], 1):  # Skip front matter
+            lines = slide_content.strip().split('\n')
+            if not lines:
+                continue
         
-        # Parse slide class
-        slide_class = ''
-        content_start = 0
-        for idx, line in enumerate(lines):
-            stripped = line.strip()
-            # Handle both formats: "class: template" and "<!-- _class: template -->"
-            if stripped.startswith('class:'):
-                slide_class = stripped.replace('class:', '').strip()
-                content_start = idx + 1
-                break
-            elif stripped.startswith('<!--') and '_class:' in stripped:
-                # Extract class from <!-- _class: gold-quote-headline -->
-                import re
-                match = re.search(r'_class:\s*([\w-]+)', stripped)
-                if match:
-                    slide_class = match.group(1)
-                content_start = idx + 1
-                break
+            # Parse slide class
+            slide_class = ''
+            content_start = 0
+            for idx, line in enumerate(lines):
+                stripped = line.strip()
+                # Handle both formats: "class: template" and "<!-- _class: template -->"
+                if stripped.startswith('class:'):
+                    slide_class = stripped.replace('class:', '').strip()
+                    content_start = idx + 1
+                    break
+                elif stripped.startswith('<!--') and '_class:' in stripped:
+                    # Extract class from <!-- _class: gold-quote-headline -->
+                    import re
+                    match = re.search(r'_class:\s*([\w-]+)', stripped)
+                    if match:
+                        slide_class = match.group(1)
+                    content_start = idx + 1
+                    break
         
-        # Check if title slide
-        is_title = slide_class == 'title'
+            # Check if title slide
+            is_title = slide_class == 'title'
         
-        # Extract content
-        headline = ''
-        paragraph = ''
-        bullets = []
-        quote = ''
-        quote_citation = ''
-        image_path = ''
-        week = ''
-        date = ''
+            # Extract content
+            headline = ''
+            paragraph = ''
+            bullets = []
+            quote = ''
+            quote_citation = ''
+            image_path = ''
+            week = ''
+            date = ''
         
-        # Parse in order: headline, then paragraph, then bullets/quote
-        j = content_start
-        headline_found = False
-        paragraph_lines = []
-        quote_lines = []
-        in_quote = False
+            # Parse in order: headline, then paragraph, then bullets/quote
+            j = content_start
+            headline_found = False
+            paragraph_lines = []
+            quote_lines = []
+            in_quote = False
         
-        while j < len(lines):
-            line = lines[j].strip()
+            while j < len(lines):
+                line = lines[j].strip()
             
-            # Skip empty lines (but continue quote if already in one)
-            if not line:
-                if in_quote:
-                    quote_lines.append('')  # Preserve empty lines in quotes
-                j += 1
-                continue
+                # Skip empty lines (but continue quote if already in one)
+                if not line:
+                    if in_quote:
+                        quote_lines.append('')  # Preserve empty lines in quotes
+                    j += 1
+                    continue
             
-            # Extract headline
-            if line.startswith('# '):
-                headline = line[2:]
-                headline_found = True
-                j += 1
-                continue
+                # Extract headline
+                if line.startswith('# '):
+                    headline = line[2:]
+                    headline_found = True
+                    j += 1
+                    continue
             
-            # Title slide specific fields
-            if line.startswith('WEEK:'):
-                week = line.replace('WEEK:', '').strip()
-                j += 1
-                continue
-            elif line.startswith('DATE:'):
-                date = line.replace('DATE:', '').strip()
-                j += 1
-                continue
+                # Title slide specific fields
+                if line.startswith('WEEK:'):
+                    week = line.replace('WEEK:', '').strip()
+                    j += 1
+                    continue
+                elif line.startswith('DATE:'):
+                    date = line.replace('DATE:', '').strip()
+                    j += 1
+                    continue
             
-            # Bullets
-            if line.startswith('- '):
-                bullets.append(line[2:])
-                j += 1
-                continue
+                # Bullets
+                if line.startswith('- '):
+                    bullets.append(line[2:])
+                    j += 1
+                    continue
             
-            # Quote (can be multiline, may include citation)
-            if line.startswith('> '):
-                content = line[2:]
-                # Check if this is a citation line (starts with em dash)
-                if content.startswith('—'):
-                    quote_citation = content[1:].strip()
-                    in_quote = False
-                else:
-                    in_quote = True
-                    quote_lines.append(content)
-                j += 1
-                continue
-            elif line.startswith('>'):
-                content = line[1:].strip()
-                if content:  # Non-empty line after >
+                # Quote (can be multiline, may include citation)
+                if line.startswith('> '):
+                    content = line[2:]
+                    # Check if this is a citation line (starts with em dash)
                     if content.startswith('—'):
                         quote_citation = content[1:].strip()
                         in_quote = False
                     else:
                         in_quote = True
                         quote_lines.append(content)
-                else:
-                    # Empty quote line (just >)
-                    if in_quote:
-                        quote_lines.append('')
-                j += 1
-                continue
+                    j += 1
+                    continue
+                elif line.startswith('>'):
+                    content = line[1:].strip()
+                    if content:  # Non-empty line after >
+                        if content.startswith('—'):
+                            quote_citation = content[1:].strip()
+                            in_quote = False
+                        else:
+                            in_quote = True
+                            quote_lines.append(content)
+                    else:
+                        # Empty quote line (just >)
+                        if in_quote:
+                            quote_lines.append('')
+                    j += 1
+                    continue
             
-            # Citation not in quote block (marks end of quote)
-            if line.startswith('—'):
-                quote_citation = line[1:].strip()
-                in_quote = False
-                j += 1
-                continue
+                # Citation not in quote block (marks end of quote)
+                if line.startswith('—'):
+                    quote_citation = line[1:].strip()
+                    in_quote = False
+                    j += 1
+                    continue
             
-            # Image
-            if line.startswith('!['):
-                import re
-                match = re.search(r'\((.+?)\)', line)
-                if match:
-                    image_path = match.group(1)
-                j += 1
-                continue
+                # Image
+                if line.startswith('!['):
+                    import re
+                    match = re.search(r'\((.+?)\)', line)
+                    if match:
+                        image_path = match.group(1)
+                    j += 1
+                    continue
             
-            # Paragraph text (after headline, before bullets/quote)
-            if headline_found and not bullets and not in_quote and not quote_lines:
-                paragraph_lines.append(line)
+                # Paragraph text (after headline, before bullets/quote)
+                if headline_found and not bullets and not in_quote and not quote_lines:
+                    paragraph_lines.append(line)
             
-            j += 1
+                j += 1
         
-        paragraph = '\n'.join(paragraph_lines).strip()
-        quote = '\n'.join(quote_lines).strip()
+            paragraph = '\n'.join(paragraph_lines).strip()
+            quote = '\n'.join(quote_lines).strip()
         
-        # If title slide, create new deck
-        if is_title:
-            c.execute('INSERT INTO decks (presentation_id, week, date, order_index) VALUES (?, ?, ?, ?)',
-                     (presentation_id, week or f'Week {deck_order + 1}', date or 'TBD', deck_order))
-            current_deck_id = c.lastrowid
-            deck_order += 1
-            slide_order = 0
-            
-            # Insert title slide
-            c.execute('''INSERT INTO slides 
-                        (deck_id, slide_class, headline, order_index, is_title) 
-                        VALUES (?, ?, ?, ?, ?)''',
-                     (current_deck_id, slide_class, headline, slide_order, 1))
-        else:
-            # Regular slide - need a deck
-            if current_deck_id is None:
-                # Create default deck if none exists
+            # If title slide, create new deck
+            if is_title:
                 c.execute('INSERT INTO decks (presentation_id, week, date, order_index) VALUES (?, ?, ?, ?)',
-                         (presentation_id, 'Week 1', 'TBD', deck_order))
+                         (presentation_id, week or f'Week {deck_order + 1}', date or 'TBD', deck_order))
                 current_deck_id = c.lastrowid
                 deck_order += 1
                 slide_order = 0
             
-            # Insert slide
-            c.execute('''INSERT INTO slides 
-                        (deck_id, slide_class, headline, paragraph, bullets, quote, quote_citation, image_path, order_index, is_title) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                     (current_deck_id, slide_class, headline, paragraph, 
-                      json.dumps(bullets), quote, quote_citation, image_path, slide_order, 0))
+                # Insert title slide
+                c.execute('''INSERT INTO slides 
+                            (deck_id, slide_class, headline, order_index, is_title) 
+                            VALUES (?, ?, ?, ?, ?)''',
+                         (current_deck_id, slide_class, headline, slide_order, 1))
+            else:
+                # Regular slide - need a deck
+                if current_deck_id is None:
+                    # Create default deck if none exists
+                    c.execute('INSERT INTO decks (presentation_id, week, date, order_index) VALUES (?, ?, ?, ?)',
+                             (presentation_id, 'Week 1', 'TBD', deck_order))
+                    current_deck_id = c.lastrowid
+                    deck_order += 1
+                    slide_order = 0
+            
+                # Insert slide
+                c.execute('''INSERT INTO slides 
+                            (deck_id, slide_class, headline, paragraph, bullets, quote, quote_citation, image_path, order_index, is_title) 
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                         (current_deck_id, slide_class, headline, paragraph, 
+                          json.dumps(bullets), quote, quote_citation, image_path, slide_order, 0))
         
-        slide_order += 1
-    
-    conn.commit()
-    conn.close()
+            slide_order += 1
     
     return jsonify({'id': presentation_id, 'name': name}), 201
 
@@ -1952,12 +1579,9 @@ def canvas_link_assignment():
     if not all([app_assignment_id, canvas_assignment_id]):
         return jsonify({'error': 'Missing required fields'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('UPDATE assignments SET canvas_assignment_id = ? WHERE id = ?',
-              (canvas_assignment_id, app_assignment_id))
-    conn.commit()
-    conn.close()
+    with db_writer() as conn:
+        conn.execute('UPDATE assignments SET canvas_assignment_id = ? WHERE id = ?',
+                     (canvas_assignment_id, app_assignment_id))
     
     return jsonify({'status': 'success'})
 
@@ -1982,12 +1606,10 @@ def canvas_sync_assignment():
         config = json.load(f)
     
     # Get assignment details
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_db().cursor()
     c.execute('SELECT name, due_date, canvas_assignment_id FROM assignments WHERE id = ?',
               (app_assignment_id,))
     row = c.fetchone()
-    conn.close()
     
     if not row:
         return jsonify({'error': 'Assignment not found'}), 404
@@ -2027,8 +1649,7 @@ def canvas_manager():
 @app.route('/canvas/assignments', methods=['GET'])
 def get_app_assignments():
     """Get all app assignments with their Canvas linkage."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    c = get_db().cursor()
     c.execute('''SELECT id, name, due_date, semester, short, canvas_assignment_id 
                  FROM assignments ORDER BY due_date''')
     assignments = [{
@@ -2039,9 +1660,10 @@ def get_app_assignments():
         'short': row[4],
         'canvas_assignment_id': row[5]
     } for row in c.fetchall()]
-    conn.close()
     
     return jsonify(assignments)
 
 if __name__ == '__main__':
+    # Index new assets and forget deleted ones without holding up startup
+    threading.Thread(target=asset_index.refresh, name='asset-index-refresh', daemon=True).start()
     app.run(debug=True, port=5001)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Metadata index for the images under assets/.
+
+Exports need each image's pixel size, format and whether it is animated, and
+the export cache needs its content hash. Reading those means decoding image
+headers and hashing whole files, so they are kept in a small SQLite sidecar
+(output/asset_index.db) keyed by path. A row is reused as long as the file's
+size and mtime are unchanged; otherwise lookup() rescans that one file.
+refresh() brings a whole directory up to date the same way and drops rows for
+deleted files; the app runs it in the background when the server starts.
+
+Each process and thread opens its own connection, so forked export workers
+can use the index too.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from typing import NamedTuple, Optional
+
+import db
+
+log = logging.getLogger(__name__)
+
+INDEX_PATH = os.path.join('output', 'asset_index.db')
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS assets (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        width INTEGER,
+        height INTEGER,
+        format TEXT,
+        animated INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+_local = threading.local()
+
+
+class AssetInfo(NamedTuple):
+    """Indexed metadata of one image file (width/height/format are None if PIL cannot read it)"""
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    width: Optional[int]
+    height: Optional[int]
+    format: Optional[str]
+    animated: int
+
+
+def _connection():
+    # Keyed by pid as well: a connection must not be reused across fork
+    key = (os.getpid(), os.path.abspath(INDEX_PATH))
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(key)
+    if conn is None:
+        os.makedirs(os.path.dirname(INDEX_PATH) or '.', exist_ok=True)
+        conn = db.connect(INDEX_PATH)
+        conn.execute(SCHEMA)
+        connections[key] = conn
+    return conn
+
+
+def _scan(path, st):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    width = height = image_format = None
+    animated = 0
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            width, height = img.size
+            image_format = img.format
+            animated = int(getattr(img, 'is_animated', False))
+    except Exception as e:
+        log.warning("Could not read image metadata for %s: %s", path, e)
+    return AssetInfo(path, st.st_size, st.st_mtime_ns, h.hexdigest(), width, height, image_format, animated)
+
+
+def lookup(path):
+    """Return the AssetInfo for an image file, rescanning it if it changed; None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    conn = _connection()
+    row = conn.execute('SELECT * FROM assets WHERE path = ?', (path,)).fetchone()
+    if row and row[1] == st.st_size and row[2] == st.st_mtime_ns:
+        return AssetInfo(*row)
+    info = _scan(path, st)
+    with conn:
+        conn.execute('INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?, ?, ?)', info)
+    return info
+
+
+def refresh(directory='assets'):
+    """Index new or changed files under directory and forget deleted ones; return the number rescanned"""
+    conn = _connection()
+    known = {row[0]: (row[1], row[2]) for row in conn.execute(
+        'SELECT path, size, mtime_ns FROM assets WHERE path LIKE ?', (directory.rstrip('/') + '/%',))}
+    scanned = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.startswith('.'):
+                continue
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            if known.pop(path, None) != (st.st_size, st.st_mtime_ns):
+                info = _scan(path, st)
+                with conn:
+                    conn.execute('INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?, ?, ?)', info)
+                scanned += 1
+    with conn:
+        conn.executemany('DELETE FROM assets WHERE path = ?', [(path,) for path in known])
+    return scanned
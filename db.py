@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+SQLite connection helpers shared by the Flask app.
+
+Every connection is opened in WAL mode with a busy timeout so that readers
+never block on a writer (and vice versa), and all writes go through
+write_transaction(), which serializes writers per database file behind a
+single lock and a `BEGIN IMMEDIATE` transaction.
+
+Schema changes are applied by migrate(), which runs an ordered list of
+migrations once each and records progress in `PRAGMA user_version`.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# How long a connection waits on a locked database before raising (milliseconds)
+BUSY_TIMEOUT_MS = 10000
+
+# One writer lock per database path, shared by every thread in the process
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+# Connections owned by threads running outside a Flask request (scripts, tests, workers)
+_local = threading.local()
+
+
+def connect(db_path):
+    """Open a connection to db_path with the app's standard pragmas applied."""
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA foreign_keys=ON')
+    return conn
+
+
+def thread_connection(db_path):
+    """Return a connection to db_path owned by the calling thread, opening it on first use."""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = connections[db_path] = connect(db_path)
+    return conn
+
+
+def close_thread_connections():
+    """Close every connection opened by thread_connection() in the calling thread."""
+    connections = getattr(_local, 'connections', None) or {}
+    for conn in connections.values():
+        try:
+            conn.close()
+        except Exception:
+            pass
+    connections.clear()
+
+
+def _write_lock(db_path):
+    with _write_locks_guard:
+        lock = _write_locks.get(db_path)
+        if lock is None:
+            lock = _write_locks[db_path] = threading.RLock()
+        return lock
+
+
+@contextmanager
+def write_transaction(conn, db_path):
+    """Run a block of writes on conn as one serialized transaction.
+
+    Commits when the block exits normally and rolls back if it raises. Nested
+    use on the same connection joins the outer transaction.
+    """
+    with _write_lock(db_path):
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+
+def schema_version(conn):
+    """Return the schema version recorded in PRAGMA user_version."""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn, migrations, db_path):
+    """Apply every migration in the ordered list that the database has not seen yet.
+
+    Each migration is a callable taking a cursor. Migration N (1-based) runs in
+    its own serialized transaction together with the bump of PRAGMA
+    user_version to N, so it is applied exactly once even when several
+    processes start at the same time. Returns the resulting schema version.
+    """
+    version = schema_version(conn)
+    if version >= len(migrations):
+        return version
+    for number in range(version + 1, len(migrations) + 1):
+        with write_transaction(conn, db_path):
+            # Another process may have migrated while we waited for the write lock
+            if schema_version(conn) >= number:
+                continue
+            migrations[number - 1](conn.cursor())
+            conn.execute(f'PRAGMA user_version = {number}')
+        version = number
+    # Another process may have applied later migrations meanwhile
+    return max(version, schema_version(conn))
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for exported decks (PPTX, PDF, ODP).
+
+An export is keyed by a SHA-256 over everything that affects the output: the
+resolved (already substituted) slide rows, deck variables, and the contents of
+the template, layout map, theme and every referenced image. Entries live in
+output/cache/<key>.<format>; a repeated download of an unchanged deck is
+served straight from disk.
+
+get_or_build() and fetch() coalesce concurrent requests for the same key into
+a single build: callers arriving while it runs wait for it and share its
+result instead of building again. evict() keeps the cache directory under
+MAX_BYTES by deleting the least recently used entries; evict_lru() does the
+same for any directory and is shared with image_renditions.
+
+fetch() is the streaming variant for downloads: the export is built into a
+spooled buffer (memory, spilling to an anonymous temp file when large) that
+is sent straight to the client. It is written to the cache only if
+should_keep() accepts it, so a download never needs to be written and then
+read back from disk.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+
+import asset_index
+
+CACHE_DIR = os.path.join('output', 'cache')
+
+# Size cap for CACHE_DIR in bytes (override with EXPORT_CACHE_MAX_BYTES)
+MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Exports larger than this are streamed but not cached (they would evict many others)
+MAX_ENTRY_BYTES = MAX_BYTES // 8
+
+# In-memory size of a build buffer before it spills to a temp file
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+# Bump when the export code changes in a way that makes old entries stale
+CACHE_VERSION = 1
+
+# path -> (mtime_ns, size, sha256 of the file contents); one entry per file, replaced when it changes
+_file_digests = {}
+_file_digests_guard = threading.Lock()
+
+# Builds in progress by cache key, so identical concurrent exports build once
+_flights = {}
+_flights_guard = threading.Lock()
+
+
+def resolve_asset_path(image_path):
+    """Map a slide image_path to the file the exporters read (same rules as pptx_builder)"""
+    if image_path.startswith('/assets/'):
+        return 'assets' + image_path[7:]
+    if image_path.startswith('assets/'):
+        return image_path
+    return 'assets/' + image_path
+
+
+def file_digest(path):
+    """Return the SHA-256 of a file's contents, or None if it does not exist.
+
+    Digests are memoized per path on (mtime, size) so unchanged files are only read once.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    abs_path = os.path.abspath(path)
+    with _file_digests_guard:
+        cached = _file_digests.get(abs_path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _file_digests_guard:
+        _file_digests[abs_path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+def _image_digest(image_path):
+    # Images share the persistent asset index with the builder
+    info = asset_index.lookup(resolve_asset_path(image_path))
+    return info.sha256 if info else None
+
+
+def export_key(format_type, slides, variables, files=(), image_column=6):
+    """Compute the cache key for one export.
+
+    slides are the resolved slide rows, variables a dict of deck values
+    (week, date, topics, ...), files the paths of template/layout/theme files
+    the output depends on. Images referenced by slides are hashed by content.
+    """
+    images = sorted({row[image_column] for row in slides if row[image_column]})
+    payload = {
+        'version': CACHE_VERSION,
+        'format': format_type,
+        'slides': [list(row) for row in slides],
+        'variables': variables,
+        'files': {path: file_digest(path) for path in files},
+        'images': {path: _image_digest(path) for path in images},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def cache_path(key, format_type):
+    return os.path.join(CACHE_DIR, f'{key}.{format_type}')
+
+
+class _Flight:
+    """One build of a cache key in progress, shared by every caller that asks for the key meanwhile"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+        self.waiters = 0
+        self.shared_path = None  # fetch(): an export too large to cache, handed to the waiters
+        self.unclaimed = 0
+
+
+def _join(key):
+    """Return (flight, True) to lead a new build of key, or (the running flight, False) to wait for it"""
+    with _flights_guard:
+        flight = _flights.get(key)
+        if flight is None:
+            flight = _flights[key] = _Flight()
+            return flight, True
+        flight.waiters += 1
+        return flight, False
+
+
+def _land(key, flight):
+    """Take a finished flight out of the map; returns how many callers are waiting on it"""
+    with _flights_guard:
+        _flights.pop(key, None)
+        return flight.waiters
+
+
+def _wait(flight):
+    flight.done.wait()
+    if flight.error is not None:
+        raise RuntimeError(f'Export failed: {flight.error}') from flight.error
+
+
+def get_or_build(key, format_type, build):
+    """Return the cached file for key, calling build(path) to create it on a miss.
+
+    build must write the export to the path it is given (a temporary name in
+    CACHE_DIR with the right extension) or raise. The finished file is moved
+    into place atomically, so readers never see a partial export.
+    """
+    path = cache_path(key, format_type)
+    if os.path.exists(path):
+        os.utime(path)  # Mark as recently used
+        return path
+    flight, leader = _join(key)
+    if not leader:
+        _wait(flight)
+        return get_or_build(key, format_type, build)
+    try:
+        if not os.path.exists(path):  # Unless a build finished just before we joined
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = _partial_path(key, format_type)
+            try:
+                build(tmp_path)
+                if not os.path.exists(tmp_path):
+                    raise RuntimeError(f'Output file was not created: {tmp_path}')
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        _land(key, flight)
+        flight.done.set()
+    evict(keep=(path,))
+    return path
+
+
+def should_keep(size):
+    """Whether a freshly built export of this many bytes is worth caching"""
+    return 0 < size <= min(MAX_ENTRY_BYTES, MAX_BYTES)
+
+
+def fetch(key, format_type, build):
+    """Return (binary file, size) with the export for key, calling build(file) on a miss.
+
+    build must write the export to the binary file object it is given or raise.
+    On a hit the cache entry is opened; on a miss the returned file is the
+    in-memory/spooled build buffer, rewound, and the entry is stored first if
+    should_keep() says so. Callers waiting on the same build get the stored
+    entry, or their own handle on a shared copy if it was not kept. The caller
+    closes the file.
+    """
+    path = cache_path(key, format_type)
+    cached = _open_entry(path)
+    if cached:
+        return cached
+    flight, leader = _join(key)
+    if not leader:
+        _wait(flight)
+        if flight.shared_path is None:
+            return fetch(key, format_type, build)  # Stored in the cache
+        return _claim(flight)
+
+    buf = None
+    landed = False
+    try:
+        cached = _open_entry(path)  # Unless a build finished just before we joined
+        if cached:
+            return cached
+        buf = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        build(buf)
+        size = buf.seek(0, os.SEEK_END)
+        if size == 0:
+            raise RuntimeError('Export produced no output')
+        kept = should_keep(size)
+        if kept:
+            _store(buf, key, format_type)
+        waiters = _land(key, flight)
+        landed = True
+        if waiters and not kept:
+            flight.shared_path = _write_partial(buf, key, format_type)
+            flight.unclaimed = waiters
+        buf.seek(0)
+    except BaseException as e:
+        if buf is not None:
+            buf.close()
+        flight.error = e
+        raise
+    finally:
+        if not landed:
+            _land(key, flight)
+        flight.done.set()
+    evict(keep=(path,))
+    return buf, size
+
+
+def _open_entry(path):
+    try:
+        cached = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    os.utime(path)  # Mark as recently used
+    return cached, os.fstat(cached.fileno()).st_size
+
+
+def _claim(flight):
+    # The shared copy is deleted once every waiter has it open
+    shared = open(flight.shared_path, 'rb')
+    with _flights_guard:
+        flight.unclaimed -= 1
+        last = flight.unclaimed == 0
+    if last:
+        os.remove(flight.shared_path)
+    return shared, os.fstat(shared.fileno()).st_size
+
+
+def _partial_path(key, format_type):
+    # Partial names are skipped by evict()
+    return os.path.join(CACHE_DIR, f'{key}.{uuid.uuid4().hex}.partial.{format_type}')
+
+
+def _write_partial(buf, key, format_type):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = _partial_path(key, format_type)
+    buf.seek(0)
+    try:
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(buf, f)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def _store(buf, key, format_type):
+    # Same partial-then-rename scheme as get_or_build
+    tmp_path = _write_partial(buf, key, format_type)
+    try:
+        os.replace(tmp_path, cache_path(key, format_type))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def evict(max_bytes=None, keep=()):
+    """Delete least recently used cache entries until CACHE_DIR fits in max_bytes.
+
+    Paths in keep (e.g. the file about to be sent) are never removed. Returns
+    the list of deleted paths.
+    """
+    return evict_lru(CACHE_DIR, MAX_BYTES if max_bytes is None else max_bytes, keep)
+
+
+def evict_lru(directory, max_bytes, keep=()):
+    """Delete the files in directory with the oldest mtime until the rest fit in max_bytes.
+
+    Files being written (with '.partial.' in the name) and paths in keep are
+    left alone. Returns the list of deleted paths.
+    """
+    keep = {os.path.abspath(p) for p in keep}
+    entries = []
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    for name in names:
+        if '.partial.' in name:
+            continue  # Build in progress
+        path = os.path.join(directory, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if os.path.abspath(path) in keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed.append(path)
+    return removed
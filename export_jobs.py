@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Deck export builds and the background export job queue.
+
+build_deck_export() turns a spec from app.prepare_deck_export() into a PDF
+(Marp), PPTX (python-pptx) or ODP (python-pptx + LibreOffice) file, or writes
+it to a file object (PPTX directly, the others via a private temp directory).
+
+Marp and LibreOffice run in a session of their own, so when a synchronous
+build times out they are killed together with everything they started.
+
+submit() queues a build as a job. Each job runs in its own child process and
+session, which is killed as a whole when it exceeds its format's timeout. At
+most MAX_WORKERS builds run at once, with a further per-format limit
+(FORMAT_LIMITS) so e.g. PDF renders cannot starve PPTX builds. Jobs wait on a
+fixed thread pool per format; once MAX_QUEUED_JOBS are waiting or running,
+submit() raises QueueFull. Results go through export_cache, so a job for an
+unchanged deck finishes immediately and identical jobs share one build.
+
+export_many() and stream_zip() do the same for a whole presentation at once,
+producing a ZIP that is streamed out deck by deck as builds finish.
+"""
+
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import export_cache
+from pptx_builder import build_pptx_from_slides
+
+log = logging.getLogger(__name__)
+
+# Total builds running at once, across all formats
+MAX_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# Concurrent builds per format (Chromium and LibreOffice are the heavy ones)
+FORMAT_LIMITS = {'pdf': 1, 'pptx': 2, 'odp': 1}
+
+# Seconds before a build is killed
+FORMAT_TIMEOUTS = {'pdf': 300, 'pptx': 120, 'odp': 300}
+
+# Jobs waiting or running before submit() turns new ones away
+MAX_QUEUED_JOBS = 32
+
+# Finished jobs are forgotten after this many seconds
+JOB_TTL_SECONDS = 3600
+
+_worker_slots = threading.BoundedSemaphore(MAX_WORKERS)
+_format_slots = {fmt: threading.BoundedSemaphore(n) for fmt, n in FORMAT_LIMITS.items()}
+
+# Job threads: one fixed pool per format, sized to its limit
+_job_pools = {fmt: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f'export-{fmt}')
+              for fmt, n in FORMAT_LIMITS.items()}
+
+_jobs = {}
+_jobs_guard = threading.Lock()
+
+# True inside build_in_child(), whose whole session is killed on timeout
+_in_build_child = False
+
+
+class QueueFull(RuntimeError):
+    """Raised by submit() when MAX_QUEUED_JOBS jobs are already waiting or running"""
+
+
+def _run_command(cmd, timeout):
+    """Run a shell command, killing it and everything it started if it exceeds timeout"""
+    if _in_build_child:
+        # Stay in the child's session so build_in_child can kill the command with it
+        return subprocess.run(cmd, shell=True, capture_output=True, text=True)
+    proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                            start_new_session=True)
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        # Killing only the shell would orphan Marp/Chromium or soffice
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.communicate()
+        raise
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+def build_deck_export(spec, output_file):
+    """Write the export described by spec to output_file (a path or binary file object), raising on failure"""
+    format_type = spec['format']
+    timeout = FORMAT_TIMEOUTS.get(format_type)
+
+    if hasattr(output_file, 'write') and format_type != 'pptx':
+        # Marp and LibreOffice only write files: build in a private directory and copy the result
+        with tempfile.TemporaryDirectory(prefix='deck_export_') as tmp:
+            path = os.path.join(tmp, f"deck_{spec['deck_id']}.{format_type}")
+            build_deck_export(spec, path)
+            with open(path, 'rb') as f:
+                shutil.copyfileobj(f, output_file)
+        return
+
+    if format_type == 'pdf':
+        # Write temporary markdown file next to the assets it references (unique per build)
+        fd, temp_md = tempfile.mkstemp(prefix=f"deck_{spec['deck_id']}_", suffix='.md', dir='output')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(spec['content'])
+            # Use Marp for PDF - renders with perfect styling
+            cmd = f'marp "{temp_md}" -o "{output_file}" --allow-local-files --pdf --theme presentation-styles.css'
+            log.debug("Running command: %s", cmd)
+            result = _run_command(cmd, timeout)
+        finally:
+            os.remove(temp_md)
+        log.debug("Return code: %s", result.returncode)
+        log.debug("Stdout: %s", result.stdout)
+        log.debug("Stderr: %s", result.stderr)
+        if result.returncode != 0:
+            raise RuntimeError(f'Conversion failed: {result.stderr}')
+        return
+
+    # PPTX is built directly; ODP is built as PPTX first and converted with LibreOffice
+    pptx_file = output_file if format_type == 'pptx' else os.path.splitext(output_file)[0] + '.pptx'
+    log.debug("Building PPTX with python-pptx using custom layouts")
+    success = build_pptx_from_slides(
+        slides_data=spec['slides'],
+        output_path=pptx_file,
+        template_path=spec['template_path'],
+        pptx_layouts_map=spec['pptx_layouts'],
+        deck_info=spec['deck_info'],
+        downscale_images=spec.get('downscale_images', True)
+    )
+    if format_type == 'pptx':
+        if not success:
+            raise RuntimeError('Conversion failed: pptx_builder reported failure')
+        log.debug("Successfully created PPTX: %s", pptx_file)
+        return
+
+    try:
+        soffice_path = '/Applications/LibreOffice.app/Contents/MacOS/soffice'
+        odp_cmd = f'"{soffice_path}" --headless --convert-to odp --outdir "{os.path.dirname(output_file)}" "{pptx_file}"'
+        log.debug("Converting to ODP: %s", odp_cmd)
+        odp_result = _run_command(odp_cmd, timeout)
+        log.debug("ODP conversion return code: %s", odp_result.returncode)
+        if odp_result.returncode != 0:
+            raise RuntimeError(f'ODP conversion failed: {odp_result.stderr}')
+    finally:
+        # Clean up temp PPTX
+        if os.path.exists(pptx_file):
+            os.remove(pptx_file)
+
+
+def _child_main(spec, output_file, pipe):
+    # Own session, so Marp/Chromium or soffice started by the build can be killed with it
+    global _in_build_child
+    os.setsid()
+    _in_build_child = True
+    try:
+        build_deck_export(spec, output_file)
+        pipe.send(None)
+    except BaseException as e:
+        pipe.send(str(e) or e.__class__.__name__)
+    finally:
+        pipe.close()
+
+
+def build_in_child(spec, output_file, on_start=None):
+    """Run build_deck_export in a child process, killing it if it exceeds its timeout.
+
+    Blocks until a worker slot for the spec's format is free, then calls
+    on_start() (if given) before launching the build.
+    """
+    format_type = spec['format']
+    timeout = FORMAT_TIMEOUTS.get(format_type)
+    with _format_slots[format_type], _worker_slots:
+        if on_start:
+            on_start()
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        proc = multiprocessing.Process(target=_child_main, args=(spec, output_file, sender), daemon=True)
+        proc.start()
+        sender.close()
+        try:
+            if not receiver.poll(timeout):
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    proc.kill()
+                raise TimeoutError(f'{format_type} export timed out after {timeout}s')
+            try:
+                error = receiver.recv()
+            except EOFError:
+                error = f'Export worker exited with code {proc.exitcode}'
+        finally:
+            proc.join()
+            receiver.close()
+    if error:
+        raise RuntimeError(error)
+
+
+def _run(job, spec):
+    def started():
+        job['status'] = 'running'
+        job['startedAt'] = time.time()
+
+    try:
+        job['path'] = export_cache.get_or_build(
+            spec['key'], spec['format'], lambda output_file: build_in_child(spec, output_file, started))
+        status = 'done'
+    except Exception as e:
+        job['error'] = str(e)
+        status = 'failed'
+    job['finishedAt'] = time.time()
+    job['status'] = status
+
+
+def submit(spec):
+    """Queue an export build for spec and return the new job id.
+
+    Raises QueueFull if MAX_QUEUED_JOBS jobs are already waiting or running.
+    """
+    _prune()
+    job = {
+        'id': uuid.uuid4().hex,
+        'deckId': spec['deck_id'],
+        'format': spec['format'],
+        'downloadName': spec['download_name'],
+        'status': 'queued',
+        'error': None,
+        'path': None,
+        'createdAt': time.time(),
+        'startedAt': None,
+        'finishedAt': None,
+    }
+    with _jobs_guard:
+        if sum(1 for j in _jobs.values() if j['finishedAt'] is None) >= MAX_QUEUED_JOBS:
+            raise QueueFull(f'{MAX_QUEUED_JOBS} export jobs are already queued')
+        _jobs[job['id']] = job
+    _job_pools[spec['format']].submit(_run, job, spec)
+    return job['id']
+
+
+def get(job_id):
+    """Return the job dict for job_id, or None if unknown or expired"""
+    with _jobs_guard:
+        return _jobs.get(job_id)
+
+
+def describe(job):
+    """JSON-safe status for a job, including how long it has been queued or running"""
+    now = time.time()
+    info = {k: job[k] for k in ('id', 'deckId', 'format', 'status', 'error', 'downloadName')}
+    info['queuedSeconds'] = round((job['startedAt'] or job['finishedAt'] or now) - job['createdAt'], 3)
+    if job['startedAt']:
+        info['runningSeconds'] = round((job['finishedAt'] or now) - job['startedAt'], 3)
+    return info
+
+
+def _prune():
+    cutoff = time.time() - JOB_TTL_SECONDS
+    with _jobs_guard:
+        for job_id in [j['id'] for j in _jobs.values() if j['finishedAt'] and j['finishedAt'] < cutoff]:
+            del _jobs[job_id]
+
+
+def export_many(specs):
+    """Build every spec in parallel, yielding (spec, path, error) as each one finishes.
+
+    Builds share the worker and per-format limits with queued jobs.
+    """
+    def build(spec):
+        return export_cache.get_or_build(
+            spec['key'], spec['format'], lambda output_file: build_in_child(spec, output_file))
+
+    if not specs:
+        return
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(specs))) as pool:
+        futures = {pool.submit(build, spec): spec for spec in specs}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, str(e)
+
+
+class _ChunkWriter:
+    """Write-only, unseekable file object that hands written bytes back in chunks"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(results):
+    """Yield a ZIP archive of (spec, path, error) results, one entry per finished export.
+
+    Entries are named after the deck's download name, prefixed with its
+    position so the archive lists decks in order. Failures are collected into
+    an errors.txt entry at the end.
+    """
+    sink = _ChunkWriter()
+    errors = []
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for spec, path, error in results:
+            name = f"{spec.get('position', 0):02d}_{spec['download_name']}"
+            if error is None:
+                try:
+                    archive.write(path, name)
+                except OSError as e:
+                    error = str(e)  # Evicted from the cache before we got to it
+            if error is not None:
+                errors.append(f'{name}: {error}')
+            yield sink.drain()
+        if errors:
+            archive.writestr('errors.txt', '\n'.join(errors) + '\n')
+    yield sink.drain()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Downscaled image renditions for PPTX exports.
+
+A photo placed in a four-inch placeholder does not need its full camera
+resolution. rendition() takes the size an image is placed at (in EMU), works
+out the pixels needed at TARGET_DPI and, when the source is larger than that,
+returns a resized and recompressed copy to embed instead. Images without real
+transparency are flattened to JPEG. Transparent ones stay PNG. Animated
+images, unreadable files and images already small enough are embedded as-is.
+
+Renditions are stored in RENDITION_DIR and keyed by the source's content hash
+(from asset_index) plus the target pixel size, so they are built once and
+shared by every export that places the image at that size. gif_fallback()
+keeps the still PNG used in place of oversized GIFs there too. evict() keeps
+RENDITION_DIR under MAX_BYTES by deleting the least recently used files.
+"""
+
+import math
+import os
+import uuid
+
+import export_cache
+
+RENDITION_DIR = os.path.join('output', 'renditions')
+
+# Size cap for RENDITION_DIR in bytes (override with RENDITION_MAX_BYTES)
+MAX_BYTES = int(os.environ.get('RENDITION_MAX_BYTES', 256 * 1024 * 1024))
+
+# Pixels per inch of placed size to keep
+TARGET_DPI = 150
+
+JPEG_QUALITY = 85
+
+EMU_PER_INCH = 914400
+
+# Source formats PIL can resize without losing anything PowerPoint would show
+RESIZABLE_FORMATS = {'JPEG', 'PNG', 'GIF', 'BMP', 'TIFF', 'WEBP'}
+
+
+def target_size(info, width_emu, height_emu, dpi=None):
+    """Pixel size of a rendition covering the placed box, or None if the source is already small enough"""
+    dpi = TARGET_DPI if dpi is None else dpi
+    needed_w = width_emu / EMU_PER_INCH * dpi
+    needed_h = height_emu / EMU_PER_INCH * dpi
+    scale = max(needed_w / info.width, needed_h / info.height)
+    if scale >= 1:
+        return None  # Never upscale
+    return max(1, math.ceil(info.width * scale)), max(1, math.ceil(info.height * scale))
+
+
+def _has_transparency(img):
+    if img.mode in ('RGBA', 'LA'):
+        return img.getchannel('A').getextrema()[0] < 255
+    return False
+
+
+def _build(image_path, size, base):
+    from PIL import Image
+    with Image.open(image_path) as img:
+        img.load()
+        exif = img.info.get('exif')
+        icc_profile = img.info.get('icc_profile')
+        if img.mode == 'P' or img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'CMYK'):
+            img = img.convert('RGBA')
+        resized = img.resize(size, Image.LANCZOS)
+
+    extra = {k: v for k, v in (('exif', exif), ('icc_profile', icc_profile)) if v}
+    if _has_transparency(resized):
+        ext, save = '.png', lambda path: resized.save(path, 'PNG', optimize=True, **extra)
+    else:
+        if resized.mode in ('RGBA', 'LA'):
+            resized = resized.convert('RGB' if resized.mode == 'RGBA' else 'L')  # Opaque alpha: flatten
+        ext, save = '.jpg', lambda path: resized.save(path, 'JPEG', quality=JPEG_QUALITY, optimize=True, **extra)
+
+    path = base + ext
+    _save_atomically(path, save)
+    return path
+
+
+def _save_atomically(path, save):
+    # Concurrent exports may build the same file; readers only ever see a complete one
+    base, ext = os.path.splitext(path)
+    tmp_path = f'{base}.{uuid.uuid4().hex}.partial{ext}'
+    try:
+        save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def rendition(image_path, info, width_emu, height_emu):
+    """Return the path of the file to embed for image_path placed at width_emu x height_emu.
+
+    info is the image's asset_index.AssetInfo. Falls back to image_path
+    whenever a rendition would not be smaller.
+    """
+    if info.width is None or info.animated or info.format not in RESIZABLE_FORMATS:
+        return image_path
+    size = target_size(info, width_emu, height_emu)
+    if size is None:
+        return image_path
+
+    base = os.path.join(RENDITION_DIR, f'{info.sha256[:32]}_{size[0]}x{size[1]}')
+    for ext in ('.jpg', '.png'):
+        if _reuse(base + ext):
+            path = base + ext
+            break
+    else:
+        os.makedirs(RENDITION_DIR, exist_ok=True)
+        path = _build(image_path, size, base)
+        evict(keep=(path,))
+    return path if os.path.getsize(path) < info.size else image_path
+
+
+def gif_fallback(image_path, info):
+    """Return a PNG of a GIF's first frame, converted once per GIF content"""
+    path = os.path.join(RENDITION_DIR, f'{info.sha256[:32]}_frame0.png')
+    if not _reuse(path):
+        from PIL import Image
+        os.makedirs(RENDITION_DIR, exist_ok=True)
+        with Image.open(image_path) as img:
+            img.seek(0)
+            frame = img.convert('RGBA')
+        _save_atomically(path, lambda tmp_path: frame.save(tmp_path, 'PNG'))
+        evict(keep=(path,))
+    return path
+
+
+def _reuse(path):
+    # True if path exists, marking it as recently used for evict()
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def evict(max_bytes=None, keep=()):
+    """Delete least recently used renditions until RENDITION_DIR fits in max_bytes.
+
+    Paths in keep (e.g. the rendition about to be embedded) are never removed.
+    Returns the list of deleted paths.
+    """
+    return export_cache.evict_lru(RENDITION_DIR, MAX_BYTES if max_bytes is None else max_bytes, keep)
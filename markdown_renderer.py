@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Slide-to-Marp-markdown rendering shared by every markdown export.
+
+There are two styles:
+- 'marp': the editor's markdown (auto-export, previews, presentation export);
+  image paths are left as stored and the title slide uses the presentation name.
+- 'pdf': the single-deck PDF export rendered by Marp from output/; asset paths
+  are rewritten relative to output/ and title/closing slides get the course
+  background and logo.
+
+render_slide() is memoized on the (already substituted) slide record, the deck
+context and the style, so re-rendering a large presentation after an edit only
+re-renders the slides whose content or deck actually changed. Callers assemble
+decks by joining the returned chunks.
+
+apply_template_variables() is the Python port of build.js: it resolves {{VAR}}
+placeholders from the front matter and per-slide comments, so the generated
+markdown can go straight to Marp without a Node preprocessing step.
+"""
+
+import functools
+import json
+import re
+from typing import NamedTuple, Optional
+
+# Joins rendered slides in the editor's markdown files
+SLIDE_SEPARATOR = '\n\n---\n\n'
+
+# Chunks kept in the render memo; a semester is a few hundred slides
+RENDER_CACHE_SIZE = 4096
+
+PDF_COURSE_TITLE = 'Journalism Innovation'
+
+# build.js syntax: VAR: "value" lines in the front matter or a slide's HTML comment
+FRONT_MATTER_PATTERN = re.compile(r'^---\n([\s\S]*?)\n---')
+TEMPLATE_VARIABLE_PATTERN = re.compile(r'^([A-Z_]+):\s*"([^"]*)"', re.M)
+COMMENT_PATTERN = re.compile(r'(<!--[\s\S]*?-->)')
+
+
+class SlideRecord(NamedTuple):
+    """One slide row, in the column order the exports select it"""
+    slide_class: Optional[str]
+    headline: Optional[str]
+    paragraph: Optional[str]
+    bullets: Optional[str]  # JSON list
+    quote: Optional[str]
+    quote_citation: Optional[str]
+    image_path: Optional[str]
+    is_title: int = 0
+    hide_headline: int = 0
+    larger_image: int = 0
+    fullscreen: int = 0
+    template_base: Optional[str] = None
+
+
+class DeckContext(NamedTuple):
+    """Deck-level values a slide's markdown can depend on"""
+    title: str
+    week: Optional[str] = None
+    date: Optional[str] = None
+
+
+def bullet_list(bullets):
+    """Decode a slide's JSON bullets column; bad or empty data gives []"""
+    if not bullets:
+        return []
+    try:
+        return json.loads(bullets)
+    except (ValueError, TypeError):
+        return []
+
+
+def _pdf_asset_path(image_path):
+    # Marp renders from output/, so web paths become relative filesystem paths
+    if image_path.startswith('/assets/'):
+        return '../assets/' + image_path[8:]
+    if image_path.startswith('assets/'):
+        return '../' + image_path
+    return image_path
+
+
+def _closing_headline(headline):
+    lines = headline.split('\n')
+    if len(lines) > 1:
+        return f'# <span class="closing-name">{lines[0]}</span><br>{"<br>".join(lines[1:])}\n'
+    return f'# <span class="closing-name">{lines[0]}</span>\n'
+
+
+def slide_classes(slide):
+    """The section classes of a non-title slide in the editor's markdown"""
+    slide_class = slide.slide_class
+    classes = [slide_class] if slide_class else []
+    if slide.hide_headline:
+        classes.append('hide-headline')
+    if slide.fullscreen:
+        classes.append('fullscreen')
+    # Image/photo slides without a headline collapse the space reserved for it
+    if (not slide.headline and not slide.hide_headline and slide_class
+            and any(k in slide_class for k in ('image', 'photo', 'full-photo'))):
+        classes.append('hide-headline')
+    return classes
+
+
+def _render_marp(slide, deck):
+    if slide.is_title:
+        # Title slide with week/date variables; deck topics are deliberately not rendered
+        out = [f'<!--\nWEEK: "{deck.week}"\nDATE: "{deck.date}"\n_class: title\n-->\n', f'# {deck.title}\n']
+        if deck.week:
+            out.append(f'## {deck.week}\n')
+        if deck.date:
+            out.append(f'{deck.date}\n')
+        return ''.join(out)
+
+    slide_class = slide.slide_class
+    headline = slide.headline
+    classes = slide_classes(slide)
+    out = [f'<!-- _class: {" ".join(classes)} -->\n'] if classes else []
+
+    # Determine what fields to export based on template type
+    is_quote_template = slide_class and 'quote' in slide_class
+    is_image_template = slide_class and ('image' in slide_class or slide_class == 'photo-centered')
+    is_text_only = slide_class and 'lines' in slide_class
+    is_photo_centered = slide_class == 'photo-centered'
+
+    if slide_class == 'closing':
+        # Closing slide: headline (contact info) and paragraph (thank you)
+        if headline:
+            out.append(_closing_headline(headline))
+        if slide.paragraph:
+            out.append(f'\n{slide.paragraph}\n')
+    elif is_quote_template:
+        # Quote templates: only export quote and citation
+        if slide.quote:
+            out.append(f'> {slide.quote}\n')
+            if slide.quote_citation:
+                out.append(f'>\n> {slide.quote_citation}\n')
+    elif is_photo_centered:
+        # Photo centered: only headline and image
+        if headline:
+            out.append(f'# {headline}\n')
+        if slide.image_path:
+            out.append(f'\n![Image]({slide.image_path})\n')
+    else:
+        # Non-quote templates: export headline, paragraph, bullets
+        if headline:
+            out.append(f'# {headline}\n')
+        if slide.paragraph:
+            out.append(f'\n{slide.paragraph}\n')
+        bullets = [] if is_text_only else bullet_list(slide.bullets)
+        if bullets:
+            out.append('\n')
+            if slide_class and '2col' in slide_class:
+                midpoint = (len(bullets) + 1) // 2
+                out.append('<div>\n\n')
+                out.extend(f'- {bullet}\n' for bullet in bullets[:midpoint])
+                out.append('\n</div>\n<div>\n\n')
+                out.extend(f'- {bullet}\n' for bullet in bullets[midpoint:])
+                out.append('\n</div>\n')
+            else:
+                out.extend(f'- {bullet}\n' for bullet in bullets)
+        if is_image_template and slide.image_path:
+            out.append(f'\n![Image]({slide.image_path})\n')
+    return ''.join(out)
+
+
+def _render_pdf(slide, deck):
+    if slide.is_title:
+        # Title slide background + colorbar div
+        return (f'<!-- _class: title -->\n'
+                f'![bg](../assets/title-background.jpg)\n'
+                f'<div class="colorbar"></div>\n'
+                f'# {PDF_COURSE_TITLE}\n'
+                f'## {deck.week}\n'
+                f'{deck.date}\n')
+
+    slide_class = slide.slide_class
+    headline = slide.headline
+    out = []
+    if slide_class:
+        classes = [slide_class]
+        if slide.hide_headline:
+            classes.append('hide-headline')
+        if slide.fullscreen:
+            classes.append('fullscreen')
+        out.append(f'<!-- _class: {" ".join(classes)} -->\n')
+
+    is_quote_template = slide_class and 'quote' in slide_class
+    is_image_template = slide_class and ('image' in slide_class or slide_class == 'photo-centered')
+    is_text_only = slide_class and 'lines' in slide_class
+    is_photo_centered = slide_class == 'photo-centered'
+
+    if slide_class == 'closing':
+        if headline:
+            out.append(_closing_headline(headline))
+            if slide.paragraph:
+                out.append(f'\n{slide.paragraph}\n')
+            # Add school logo at bottom
+            out.append('\n![width:400px](../assets/journalism_school_logo.png)\n')
+    elif is_quote_template:
+        if slide.quote:
+            out.append(f'> {slide.quote}\n')
+            if slide.quote_citation:
+                out.append(f'>\n> {slide.quote_citation}\n')
+    elif is_photo_centered:
+        if headline:
+            out.append(f'# {headline}\n')
+        if slide.image_path:
+            out.append(f'\n![Image]({_pdf_asset_path(slide.image_path)})\n')
+    else:
+        if headline:
+            out.append(f'# {headline}\n')
+        if slide.paragraph:
+            out.append(f'\n{slide.paragraph}\n')
+        if not is_text_only and slide.bullets:
+            try:
+                bullets = json.loads(slide.bullets)
+            except (ValueError, TypeError):
+                bullets = None
+            if bullets is not None:
+                out.append('\n')
+                out.extend(f'- {bullet}\n' for bullet in bullets if bullet.strip())
+        if slide.image_path and is_image_template:
+            out.append(f'\n![Image]({_pdf_asset_path(slide.image_path)})\n')
+    return ''.join(out)
+
+
+_RENDERERS = {'marp': _render_marp, 'pdf': _render_pdf}
+
+
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_slide(slide, deck, style='marp'):
+    """Render one SlideRecord (placeholders already substituted) to a markdown chunk"""
+    return _RENDERERS[style](slide, deck)
+
+
+def render_slides(rows, deck, style='marp'):
+    """Render slide rows (tuples in SlideRecord column order) to a list of chunks"""
+    return [render_slide(SlideRecord(*row), deck, style) for row in rows]
+
+
+def _replace_variables(text, variables):
+    for key, value in variables.items():
+        text = text.replace(f'{{{{{key}}}}}', value)
+    return text
+
+
+def apply_template_variables(markdown):
+    """Resolve {{VAR}} placeholders the way build.js does.
+
+    Front-matter variables apply everywhere; variables declared in a slide's
+    HTML comment (e.g. WEEK/DATE on title slides) override them for the text
+    that follows that comment, up to the next comment.
+    """
+    front_matter = FRONT_MATTER_PATTERN.match(markdown)
+    global_vars = dict(TEMPLATE_VARIABLE_PATTERN.findall(front_matter.group(1))) if front_matter else {}
+    if not global_vars and '<!--' not in markdown:
+        return markdown
+
+    parts = COMMENT_PATTERN.split(markdown)
+    out = []
+    i = 0
+    while i < len(parts):
+        part = parts[i]
+        if part.startswith('<!--'):
+            local_vars = {**global_vars, **dict(TEMPLATE_VARIABLE_PATTERN.findall(part))}
+            out.append(part)
+            if i + 1 < len(parts):
+                i += 1
+                out.append(_replace_variables(parts[i], local_vars))
+        else:
+            out.append(_replace_variables(part, global_vars))
+        i += 1
+    return ''.join(out)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+A warm Marp process for HTML previews.
+
+Instead of starting Node and Marp for every preview (`npm run build`), one
+`marp --watch --input-dir` process is kept running. render() writes the
+already-preprocessed markdown into the watched directory and waits for Marp
+to rewrite the matching HTML file, which takes well under a second once the
+worker is up. Unchanged markdown is not rewritten at all, so previewing it
+again returns immediately. Renders of different names run concurrently.
+
+The worker is started lazily on the first render and restarted if it exits.
+"""
+
+import atexit
+import contextlib
+import os
+import subprocess
+import threading
+import time
+
+# Marp watches SOURCE_DIR and writes <name>.html for each <name>.md into OUTPUT_DIR
+SOURCE_DIR = os.path.join('output', 'preview_src')
+OUTPUT_DIR = 'output'
+LOG_PATH = os.path.join('output', 'marp-worker.log')
+
+MARP_EXECUTABLE = 'marp'
+MARP_OPTIONS = ['--html', '--allow-local-files', '--theme', 'presentation-styles.css']
+
+# Seconds to wait for Marp to produce the HTML (the first render includes startup)
+RENDER_TIMEOUT = 30
+
+_process = None
+_process_lock = threading.Lock()
+
+# One lock per output name, so different previews render concurrently. Each entry is
+# [lock, threads holding or waiting for it] and is dropped when the last one is done
+_render_locks = {}
+_render_locks_guard = threading.Lock()
+
+
+def command():
+    """The command line of the watch-mode worker"""
+    return [MARP_EXECUTABLE, '--watch', '--input-dir', SOURCE_DIR, '--output', OUTPUT_DIR] + MARP_OPTIONS
+
+
+def _ensure_running():
+    global _process
+    with _process_lock:
+        if _process is not None and _process.poll() is None:
+            return _process
+        os.makedirs(SOURCE_DIR, exist_ok=True)
+        os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+        # Marp's output goes to a log file; an unread pipe would eventually block it
+        with open(LOG_PATH, 'ab') as log:
+            _process = subprocess.Popen(command(), stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+        return _process
+
+
+@contextlib.contextmanager
+def _render_lock(name):
+    with _render_locks_guard:
+        entry = _render_locks.get(name)
+        if entry is None:
+            entry = _render_locks[name] = [threading.Lock(), 0]
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _render_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _render_locks[name]
+
+
+def _log_tail(limit=2000):
+    try:
+        with open(LOG_PATH, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - limit))
+            return f.read().decode('utf-8', 'replace')
+    except OSError:
+        return ''
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def render(name, markdown, timeout=None):
+    """Render markdown to OUTPUT_DIR/<name>.html with the warm worker and return that path.
+
+    name may contain subdirectories. Raises RuntimeError if Marp is missing,
+    exits, or does not produce the file within the timeout.
+    """
+    source = os.path.join(SOURCE_DIR, name + '.md')
+    output = os.path.join(OUTPUT_DIR, name + '.html')
+    timeout = RENDER_TIMEOUT if timeout is None else timeout
+
+    with _render_lock(name):
+        try:
+            with open(source, 'r') as f:
+                unchanged = f.read() == markdown
+        except FileNotFoundError:
+            unchanged = False
+        if unchanged and _mtime_ns(output) >= _mtime_ns(source):
+            return output
+
+        try:
+            process = _ensure_running()
+        except OSError as e:
+            raise RuntimeError(f'Could not start Marp: {e}')
+
+        before = _mtime_ns(output)
+        os.makedirs(os.path.dirname(source), exist_ok=True)
+        with open(source, 'w') as f:
+            f.write(markdown)
+
+        deadline = time.monotonic() + timeout
+        while _mtime_ns(output) <= before:
+            if process.poll() is not None:
+                raise RuntimeError(f'Marp worker exited with code {process.returncode}: {_log_tail()}')
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'Marp did not render {name} within {timeout}s: {_log_tail()}')
+            time.sleep(0.02)
+        return output
+
+
+def discard(name):
+    """Delete the markdown and HTML rendered under name"""
+    with _render_lock(name):
+        for path in (os.path.join(SOURCE_DIR, name + '.md'), os.path.join(OUTPUT_DIR, name + '.html')):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def stop():
+    """Terminate the worker (it is restarted on the next render)"""
+    global _process
+    with _process_lock:
+        if _process is not None and _process.poll() is None:
+            _process.terminate()
+            try:
+                _process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                _process.kill()
+        _process = None
+
+
+atexit.register(stop)
@@ -7,17 +7,75 @@ This replaces pandoc for PPTX generation.
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN, MSO_AUTO_SIZE
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import PACKAGE_URI, PackURI
+from pptx.opc.serialized import _ContentTypesItem
+from pptx.parts.image import ImagePart
+import functools
+import io
 import json
+import logging
 import os
-import sys
-import tempfile
-import shutil
+import re
+import threading
+import uuid
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 import xml.etree.ElementTree as ET
+from typing import NamedTuple, Optional
+
+from lxml import etree
+
+import asset_index
+import image_renditions
+
+log = logging.getLogger(__name__)
 
 # Threshold (in bytes) above which animated GIFs are converted to PNG fallbacks
 GIF_FALLBACK_THRESHOLD = 5 * 1024 * 1024  # 5 MB
 
+# Standard slide size (10" x 7.5") in EMUs
+SLIDE_WIDTH = 9144000
+SLIDE_HEIGHT = 6858000
+
+# Template keys grouped by the populate function that fills them
+PHOTO_TEMPLATES = {"photo-centered", "gold-photo-centered", "full-photo-headline", "gold-full-photo-headline",
+                   "template-photo-centered", "template-gold-photo-centered", "template-full-photo-headline", "template-gold-full-photo-headline"}
+QUOTE_TEMPLATES = {"quote", "gold-quote", "template-quote", "template-gold-quote"}
+IMAGE_TEMPLATES = {"bullets-image", "bullets-image-split", "bullets-image-top", "gold-bullets-image-split", "gold-bullets-image-top",
+                   "template-bullets-image", "template-bullets-image-split", "template-bullets-image-top", "template-gold-bullets-image-split", "template-gold-bullets-image-top"}
+
+# Placeholder types: title, the text bodies content goes into (Body, Object, Content), picture
+TITLE_PLACEHOLDER = 1
+BODY_PLACEHOLDER_TYPES = (2, 7, 14)
+PICTURE_PLACEHOLDER = 18
+
+# Inline markdown: `code`, **bold**, *italic* and [text](url); bold, italic and link text are tokenized again inside
+INLINE_TOKEN = re.compile(
+    r'`([^`]+)`'
+    r'|\*\*([\s\S]+?)\*\*(?!\*)'
+    r'|\*([\s\S]+?)\*'
+    r'|\[([^\]]+)\]\(([^)\s]+)\)'
+)
+INLINE_RUN_CACHE_SIZE = 4096
+
+# Threads preparing a deck's images (hashing, decoding, resizing) before slides are populated
+IMAGE_PREFETCH_WORKERS = max(1, min(8, os.cpu_count() or 1))
+
+DRAWINGML_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+PRESENTATIONML_NS = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+POWERPOINT_2010_NS = 'http://schemas.microsoft.com/office/powerpoint/2010/main'
+
+# Timestamp of every member of a reproducible package (the earliest a ZIP header can hold)
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+# p:ext holding the PowerPoint 2010 section list
+SECTION_LIST_URI = '{521415D9-36F7-43E2-AB2F-B90AF26B5E84}'
+
+# Prepared templates by path: {abspath: ((mtime_ns, size), PreparedTemplate)}
+_prepared_templates = {}
+_prepared_lock = threading.Lock()
+
 
 def _fix_xml_declaration(xml_bytes):
     """
@@ -38,42 +96,16 @@ def _fix_xml_declaration(xml_bytes):
     return xml_bytes
 
 
-def build_pptx_from_slides(slides_data, output_path, template_path, pptx_layouts_map, deck_info=None):
-    """
-    Build a PPTX file directly from slide data using custom layouts.
-    
-    Args:
-        slides_data: List of tuples containing slide data from database
-        output_path: Path where PPTX should be saved
-        template_path: Path to POTX/PPTX template file  
-        pptx_layouts_map: Dict mapping template_base to layout names
-        deck_info: Dict with course_title, week, date for title slide
+def patch_template_package(package):
+    """Turn POTX package bytes into PPTX bytes python-pptx can open.
+
+    The main content type becomes a presentation and GIF images are declared.
+    ZIP member metadata is preserved.
     """
-    import zipfile
-    import shutil
-    
-    # python-pptx doesn't support POTX files, so we need to convert it
-    temp_pptx = 'temp_template.pptx'
-    
-    # Remove old temp file if it exists to ensure we use latest template
-    if os.path.exists(temp_pptx):
-        os.remove(temp_pptx)
-    
-    # Copy the template
-    shutil.copy2(template_path, temp_pptx)
-    
-    # Modify the content type in [Content_Types].xml to make it a presentation
-    try:
-        # Read the ZIP while preserving ZipInfo metadata
-        file_list = []
-        with zipfile.ZipFile(temp_pptx, 'r') as zf:
-            for item in zf.infolist():
-                data = zf.read(item.filename)
-                file_list.append((item, data))
-        
-        # Modify content types
-        modified_files = {}
-        for item, data in file_list:
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(package), 'r') as zin, zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
             if item.filename == '[Content_Types].xml':
                 content_xml = data.decode('utf-8')
                 content_xml = content_xml.replace(
@@ -87,127 +119,245 @@ def build_pptx_from_slides(slides_data, output_path, template_path, pptx_layouts
                         '<Default Extension="png" ContentType="image/png"/>',
                         '<Default Extension="png" ContentType="image/png"/><Default Extension="gif" ContentType="image/gif"/>'
                     )
-                    print("Added GIF content type support to template")
-                modified_files[item.filename] = content_xml.encode('utf-8')
-            else:
-                modified_files[item.filename] = data
-        
-        # Write back with preserved metadata
-        with zipfile.ZipFile(temp_pptx, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for item, _ in file_list:
-                data = modified_files[item.filename]
-                # Create new ZipInfo with same metadata
-                new_item = zipfile.ZipInfo(item.filename)
-                new_item.compress_type = item.compress_type
-                new_item.create_system = item.create_system
-                new_item.create_version = item.create_version
-                new_item.extract_version = item.extract_version
-                new_item.flag_bits = item.flag_bits
-                new_item.external_attr = item.external_attr
-                new_item.date_time = item.date_time
-                zf.writestr(new_item, data)
-    except Exception as e:
-        print(f"Warning: Could not patch template: {e}")
+                data = content_xml.encode('utf-8')
+            zout.writestr(item, data)
+    return out.getvalue()
+
+
+class PreparedTemplate:
+    """A template patched into a presentation package once and kept in memory.
+
+    layout_index maps each layout name to its (master, layout) position, across
+    all masters (prs.slide_layouts only covers the first). placeholder_geometry
+    maps each layout name to {placeholder idx: (type, left, top, width, height)}.
+    """
+
+    def __init__(self, path, package):
+        self.path = path
+        self.package = package
+        self.layout_index = {}
+        self.placeholder_geometry = {}
+        prs = Presentation(io.BytesIO(package))
+        for m, master in enumerate(prs.slide_masters):
+            for l, layout in enumerate(master.slide_layouts):
+                self.layout_index[layout.name] = (m, l)
+                self.placeholder_geometry[layout.name] = {
+                    ph.placeholder_format.idx: (int(ph.placeholder_format.type), ph.left, ph.top, ph.width, ph.height)
+                    for ph in layout.placeholders
+                }
+
+    @property
+    def layout_names(self):
+        return list(self.layout_index)
+
+    def open(self):
+        """Open a fresh Presentation from memory; returns (prs, {layout name: layout})"""
+        prs = Presentation(io.BytesIO(self.package))
+        masters = prs.slide_masters
+        layout_map = {name: masters[m].slide_layouts[l] for name, (m, l) in self.layout_index.items()}
+        return prs, layout_map
+
+
+def prepared_template(template_path):
+    """Return the PreparedTemplate for a template file, rebuilding it when the file changes"""
+    st = os.stat(template_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = os.path.abspath(template_path)
+    with _prepared_lock:
+        cached = _prepared_templates.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        with open(template_path, 'rb') as f:
+            package = f.read()
+        try:
+            package = patch_template_package(package)
+        except (zipfile.BadZipFile, KeyError, UnicodeDecodeError) as e:
+            log.warning("Could not patch template: %s", e)
+        prepared = PreparedTemplate(template_path, package)
+        _prepared_templates[key] = (stamp, prepared)
+        log.debug("Prepared template %s with layouts: %s", template_path, prepared.layout_names)
+        return prepared
+
+
+def _slide_layout(slide_data, pptx_layouts_map):
+    """Return (layout name, template key) for a slide row; the key is None for title slides"""
+    (slide_class, headline, paragraph, bullets, quote, quote_citation, 
+     image_path, is_title, hide_headline, larger_image, fullscreen, template_base) = slide_data
+    
+    # Determine layout name directly from slide_class (no guessing)
+    if is_title:
+        return "Arches_Title", None
+    
+    # Use slide_class if it exists, otherwise template_base
+    template_key = slide_class if slide_class else template_base
+    
+    # For bullets-image-top templates with fullscreen, switch to full-photo-headline
+    if template_key == 'bullets-image-top' and fullscreen:
+        template_key = 'full-photo-headline'
+    elif template_key == 'gold-bullets-image-top' and fullscreen:
+        template_key = 'gold-full-photo-headline'
+    
+    layout_name = pptx_layouts_map.get(template_key)
+    
+    # For photo-centered templates, use headline version if hide_headline is False
+    if template_key == 'photo-centered' and not hide_headline:
+        layout_name = "White_Photo_Headline"
+    elif template_key == 'gold-photo-centered' and not hide_headline:
+        layout_name = "Gold_Photo_Headline"
+    # For bullets-image-top templates, use big photo version if larger_image is True
+    elif template_key == 'bullets-image-top' and larger_image:
+        layout_name = "White_Top_Bullets_Big_Photo"
+    elif template_key == 'gold-bullets-image-top' and larger_image:
+        layout_name = "Gold_Top_Bullets_Big_Photo"
+    
+    if not layout_name:
+        log.warning("No layout mapping for template '%s'", template_key)
+        layout_name = "White_Bullets"
+    return layout_name, template_key
+
+
+def build_pptx_from_slides(slides_data, output_path, template_path, pptx_layouts_map, deck_info=None, downscale_images=True,
+                           reproducible=True):
+    """
+    Build a PPTX file directly from slide data using custom layouts.
+    
+    Args:
+        slides_data: List of tuples containing slide data from database
+        output_path: Path where PPTX should be saved, or a writable binary file object
+        template_path: Path to POTX/PPTX template file  
+        pptx_layouts_map: Dict mapping template_base to layout names
+        deck_info: Dict with course_title, week, date for title slide
+        downscale_images: Embed images as renditions sized for their placeholders
+            instead of at full resolution
+        reproducible: Write identical bytes for identical input (see write_presentation)
+    """
+    # Patched package and layout index are prepared once per template revision
+    template = prepared_template(template_path)
+    prs, layout_map = template.open()
+    
+    log.debug("Available layouts: %s", list(layout_map))
+    add_slides(prs, layout_map, template, slides_data, pptx_layouts_map, deck_info, downscale_images)
     
-    # Now load with python-pptx
-    prs = Presentation(temp_pptx)
+    # Save with docProps and package fix-ups applied in the same pass
+    write_presentation(prs, output_path, reproducible)
+    return True
+
+
+def build_pptx_from_decks(decks, output_path, template_path, pptx_layouts_map, sections=True, downscale_images=True,
+                          reproducible=True):
+    """
+    Build one PPTX containing several decks, e.g. a whole semester.
+    
+    Args:
+        decks: Iterable of dicts with 'slides' (slide rows), 'deck_info' (for that
+            deck's title slide) and optionally 'section' (section name). Deck
+            export specs from app.prepare_deck_export work as-is. It is consumed
+            one deck at a time, so a generator keeps only the current deck's
+            rows in memory.
+        output_path: Path where PPTX should be saved, or a writable binary file object
+        template_path: Path to POTX/PPTX template file
+        pptx_layouts_map: Dict mapping template_base to layout names
+        sections: Start a PowerPoint section at each deck
+        downscale_images: Embed images as renditions sized for their placeholders
+            instead of at full resolution
+        reproducible: Write identical bytes for identical input (see write_presentation)
+    
+    Returns the number of slides written.
+    """
+    # The template is opened once for all decks; images shared between decks are embedded once
+    template = prepared_template(template_path)
+    prs, layout_map = template.open()
     
-    # Build a map of layout names to layout objects
-    # Must iterate through all slide_masters since prs.slide_layouts only returns first master's layouts
-    layout_map = {}
-    for master in prs.slide_masters:
-        for layout in master.slide_layouts:
-            layout_map[layout.name] = layout
+    deck_sections = []
+    for deck in decks:
+        first_slide = len(prs.slides)
+        add_slides(prs, layout_map, template, deck['slides'], pptx_layouts_map, deck.get('deck_info'), downscale_images)
+        if len(prs.slides) > first_slide:
+            deck_sections.append((_section_name(deck, len(deck_sections) + 1), first_slide))
     
-    print(f"Available layouts: {list(layout_map.keys())}")
+    if sections and deck_sections:
+        slide_ids = [slide.slide_id for slide in prs.slides]
+        bounds = [start for _, start in deck_sections[1:]] + [len(slide_ids)]
+        add_sections(prs, [(name, slide_ids[start:end]) for (name, start), end in zip(deck_sections, bounds)])
+    
+    write_presentation(prs, output_path, reproducible)
+    return len(prs.slides)
+
+
+def _section_name(deck, position):
+    if deck.get('section'):
+        return deck['section']
+    deck_info = deck.get('deck_info') or {}
+    name = ' '.join(str(deck_info[k]) for k in ('week', 'date') if deck_info.get(k))
+    return name or f'Deck {position}'
+
+
+def add_sections(prs, sections):
+    """Replace the presentation's sections with [(name, [slide ids])], in order"""
+    root = prs.part._element
+    ext_lst = root.find(f'{{{PRESENTATIONML_NS}}}extLst')
+    if ext_lst is None:
+        # extLst is the last child of p:presentation
+        ext_lst = etree.SubElement(root, f'{{{PRESENTATIONML_NS}}}extLst')
+    for ext in ext_lst.findall(f'{{{PRESENTATIONML_NS}}}ext'):
+        if ext.get('uri') == SECTION_LIST_URI:
+            ext_lst.remove(ext)
+    ext = etree.SubElement(ext_lst, f'{{{PRESENTATIONML_NS}}}ext', uri=SECTION_LIST_URI)
+    section_lst = etree.SubElement(ext, f'{{{POWERPOINT_2010_NS}}}sectionLst', nsmap={'p14': POWERPOINT_2010_NS})
+    for position, (name, slide_ids) in enumerate(sections):
+        # Section ids only need to be unique GUIDs; derive them so rebuilds match
+        section_id = '{%s}' % str(uuid.uuid5(uuid.NAMESPACE_URL, f'section:{position}:{name}')).upper()
+        section = etree.SubElement(section_lst, f'{{{POWERPOINT_2010_NS}}}section', name=name, id=section_id)
+        id_lst = etree.SubElement(section, f'{{{POWERPOINT_2010_NS}}}sldIdLst')
+        for slide_id in slide_ids:
+            etree.SubElement(id_lst, f'{{{POWERPOINT_2010_NS}}}sldId', id=str(slide_id))
+
+
+def add_slides(prs, layout_map, template, slides_data, pptx_layouts_map, deck_info=None, downscale_images=True):
+    """Append one deck's slides to prs (opened from template; layout_map from template.open())"""
+    # Layouts are chosen up front so images can be prepared for their placeholders in parallel
+    slide_layouts = [_slide_layout(slide_data, pptx_layouts_map) for slide_data in slides_data]
+    prefetch_images(slides_data, slide_layouts, template, downscale_images)
     
     # Process each slide
-    for slide_data in slides_data:
+    for slide_data, (layout_name, template_key) in zip(slides_data, slide_layouts):
         (slide_class, headline, paragraph, bullets, quote, quote_citation, 
          image_path, is_title, hide_headline, larger_image, fullscreen, template_base) = slide_data
-        
-        # Determine layout name directly from slide_class (no guessing)
-        if is_title:
-            layout_name = "Arches_Title"
-        else:
-            # Use slide_class if it exists, otherwise template_base
-            template_key = slide_class if slide_class else template_base
-            
-            import sys
-            print(f"  Slide template_key: {template_key}, quote: {repr(quote[:50] if quote else None)}, image_path: {repr(image_path)}", file=sys.stderr, flush=True)
-            
-            # For bullets-image-top templates with fullscreen, switch to full-photo-headline
-            if template_key == 'bullets-image-top' and fullscreen:
-                template_key = 'full-photo-headline'
-            elif template_key == 'gold-bullets-image-top' and fullscreen:
-                template_key = 'gold-full-photo-headline'
-            
-            layout_name = pptx_layouts_map.get(template_key)
-            
-            # For photo-centered templates, use headline version if hide_headline is False
-            if template_key == 'photo-centered' and not hide_headline:
-                layout_name = "White_Photo_Headline"
-            elif template_key == 'gold-photo-centered' and not hide_headline:
-                layout_name = "Gold_Photo_Headline"
-            # For bullets-image-top templates, use big photo version if larger_image is True
-            elif template_key == 'bullets-image-top' and larger_image:
-                layout_name = "White_Top_Bullets_Big_Photo"
-            elif template_key == 'gold-bullets-image-top' and larger_image:
-                layout_name = "Gold_Top_Bullets_Big_Photo"
-            
-            if not layout_name:
-                print(f"Warning: No layout mapping for template '{template_key}'")
-                layout_name = "White_Bullets"
+        if not is_title:
+            log.debug("Slide template_key: %s, quote: %r, image_path: %r", template_key, quote[:50] if quote else None, image_path)
         
         # Get the layout
         layout = layout_map.get(layout_name)
+        geometry = template.placeholder_geometry.get(layout_name)
         if not layout:
-            print(f"Warning: Layout '{layout_name}' not found, using first available layout")
+            log.warning("Layout '%s' not found, using first available layout", layout_name)
             layout = prs.slide_layouts[0]
+            geometry = None
         
         # Add slide with the layout
         slide = prs.slides.add_slide(layout)
+        placeholders = PlaceholderIndex(slide, geometry)
         
         # Populate placeholders based on slide type
         if is_title:
             populate_title_slide(slide, headline, paragraph, deck_info)
         elif template_key == "closing":
-            populate_closing_slide(slide, headline, paragraph, image_path)
-        elif template_key in ["photo-centered", "gold-photo-centered", "full-photo-headline", "gold-full-photo-headline", 
-                              "template-photo-centered", "template-gold-photo-centered", "template-full-photo-headline", "template-gold-full-photo-headline"]:
-            populate_photo_slide(slide, image_path, headline, hide_headline, paragraph, bullets, larger_image, prs)
-        elif template_key in ["quote", "gold-quote", "template-quote", "template-gold-quote"]:
+            populate_closing_slide(slide, headline, paragraph, image_path, downscale_images, placeholders)
+        elif template_key in PHOTO_TEMPLATES:
+            populate_photo_slide(slide, image_path, headline, hide_headline, paragraph, bullets, larger_image, prs, downscale_images, placeholders)
+        elif template_key in QUOTE_TEMPLATES:
             populate_quote_slide(slide, quote, quote_citation)
-        elif template_key in ["bullets-image", "bullets-image-split", "bullets-image-top", "gold-bullets-image-split", "gold-bullets-image-top",
-                              "template-bullets-image", "template-bullets-image-split", "template-bullets-image-top", "template-gold-bullets-image-split", "template-gold-bullets-image-top"]:
+        elif template_key in IMAGE_TEMPLATES:
             # Image layouts - add image
-            populate_content_slide(slide, headline, paragraph, bullets, image_path, hide_headline, slide_class, larger_image, prs)
+            populate_content_slide(slide, headline, paragraph, bullets, image_path, hide_headline, slide_class, larger_image, prs, downscale_images, placeholders)
         else:
             # Regular content - no image unless it's explicitly an image layout
-            populate_content_slide(slide, headline, paragraph, bullets, None, hide_headline, slide_class, larger_image, prs)
+            populate_content_slide(slide, headline, paragraph, bullets, None, hide_headline, slide_class, larger_image, prs, placeholders=placeholders)
     
-    # Save the presentation
-    prs.save(output_path)
-    
-    # Clean up temp template file
-    try:
-        if os.path.exists(temp_pptx):
-            os.remove(temp_pptx)
-    except Exception as e:
-        print(f"Warning: Could not remove temp file: {e}")
-    
-    # Normalize PPTX docProps (populate Slides/Words/etc) to keep document metadata accurate
-    try:
-        normalize_pptx(output_path)
-    except Exception as e:
-        print(f"Warning: Could not normalize PPTX: {e}")
-    return True
 
 
 def add_formatted_text_to_frame(text_frame, text):
     """Add text with markdown formatting to a text frame."""
-    import re
-    
     # Clear existing paragraphs but keep the first one for formatting
     if text_frame.paragraphs:
         text_frame.paragraphs[0].text = ""
@@ -232,59 +382,122 @@ def add_formatted_text_to_frame(text_frame, text):
             text_frame.add_paragraph()
 
 
+class InlineRun(NamedTuple):
+    """One run of inline-formatted text"""
+    text: str
+    bold: bool = False
+    italic: bool = False
+    code: bool = False
+    link: Optional[str] = None
+
+
+def _tokenize_inline(text, bold=False, italic=False, link=None):
+    runs = []
+    plain_start = 0
+    for match in INLINE_TOKEN.finditer(text):
+        if match.start() > plain_start:
+            runs.append(InlineRun(text[plain_start:match.start()], bold, italic, False, link))
+        code, strong, emphasis, link_text, url = match.groups()
+        if code is not None:
+            runs.append(InlineRun(code, bold, italic, True, link))
+        elif strong is not None:
+            runs.extend(_tokenize_inline(strong, True, italic, link))
+        elif emphasis is not None:
+            runs.extend(_tokenize_inline(emphasis, bold, True, link))
+        else:
+            runs.extend(_tokenize_inline(link_text, bold, italic, url))
+        plain_start = match.end()
+    if plain_start < len(text):
+        runs.append(InlineRun(text[plain_start:], bold, italic, False, link))
+    return runs
+
+
+@functools.lru_cache(maxsize=INLINE_RUN_CACHE_SIZE)
+def inline_runs(text):
+    """Split inline markdown into a tuple of InlineRuns.
+
+    Supports `code`, **bold**, *italic* and [text](url) links; bold, italic
+    and links may nest each other and contain code. Memoized by text, since
+    module slides are rendered again for every deck that includes them.
+    """
+    return tuple(_tokenize_inline(text))
+
+
 def parse_markdown_to_paragraph(paragraph, text):
     """Parse markdown formatting and add runs to paragraph."""
-    import re
-    
-    # Pattern to match **bold**, *italic*, and `code` markdown
-    # Match in order: code, bold, italic, or regular text
-    # Use DOTALL flag so . matches newlines
-    pattern = r'(`[^`]+`|\*\*[\s\S]*?\*\*|\*[\s\S]*?\*|[^*`]+|[*`])'
-    parts = re.findall(pattern, text, re.DOTALL)
-    
-    for part in parts:
-        if not part:
-            continue
-            
-        if part.startswith('`') and part.endswith('`') and len(part) > 2:
-            # Inline code
-            run = paragraph.add_run()
-            run.text = part[1:-1]  # Remove ` markers
+    for part in inline_runs(text):
+        run = paragraph.add_run()
+        run.text = part.text
+        if part.code:
             run.font.name = 'Courier New'
-        elif part.startswith('**') and part.endswith('**') and len(part) > 4:
-            # Bold text
-            run = paragraph.add_run()
-            run.text = part[2:-2]  # Remove ** markers
+        if part.bold:
             run.font.bold = True
-        elif part.startswith('*') and part.endswith('*') and len(part) > 2 and not part.startswith('**'):
-            # Italic text
-            run = paragraph.add_run()
-            run.text = part[1:-1]  # Remove * markers
+        if part.italic:
             run.font.italic = True
-        else:
-            # Regular text
-            run = paragraph.add_run()
-            run.text = part
+        if part.link:
+            run.hyperlink.address = part.link
+
+
+class PlaceholderIndex:
+    """A slide's placeholders, indexed by type in one pass over its shapes.
+
+    Built when a slide is added and shared by the populate functions, so each
+    slide's shape tree is walked once. geometry is the layout's entry from
+    PreparedTemplate.placeholder_geometry: a freshly added placeholder inherits
+    its position from the layout, and bounds() reads it from there instead of
+    resolving the inheritance for every lookup.
+    """
 
+    def __init__(self, slide, geometry=None):
+        self.slide = slide
+        self.geometry = geometry or {}
+        self.by_type = {}
+        self._position = {}
+        for position, shape in enumerate(slide.placeholders):
+            try:
+                ph_type = int(shape.placeholder_format.type)
+            except Exception:
+                continue
+            self.by_type.setdefault(ph_type, []).append(shape)
+            self._position[id(shape)] = position
+
+    def of(self, *types):
+        """Placeholders of the given types, in slide order"""
+        shapes = [shape for ph_type in types for shape in self.by_type.get(ph_type, ())]
+        return sorted(shapes, key=lambda shape: self._position[id(shape)])
+
+    def first(self, *types):
+        shapes = self.of(*types)
+        return shapes[0] if shapes else None
 
-def remove_empty_body_placeholders(slide):
+    def bounds(self, shape):
+        """(left, top, width, height) of a placeholder"""
+        cached = self.geometry.get(shape.placeholder_format.idx)
+        if cached and shape._element.xfrm is None:
+            return cached[1:]
+        return shape.left, shape.top, shape.width, shape.height
+
+    def remove(self, shape):
+        """Remove a placeholder from the slide and the index"""
+        self.slide.shapes._spTree.remove(shape._element)
+        for shapes in self.by_type.values():
+            if shape in shapes:
+                shapes.remove(shape)
+
+
+def remove_empty_body_placeholders(slide, placeholders=None):
     """Remove empty content/body placeholders from a slide.
     Returns a list of (placeholder_type, name) removed for debugging."""
+    placeholders = placeholders or PlaceholderIndex(slide)
     removed = []
-    # Iterate a copy because we'll be removing shapes from the tree
-    for shape in list(slide.shapes):
-        if not getattr(shape, 'is_placeholder', False):
-            continue
-        try:
-            ph_type = shape.placeholder_format.type
-        except Exception:
-            continue
-        # Consider Body, Object, and Content placeholders
-        if ph_type in [2, 7, 14] and getattr(shape, 'has_text_frame', False):
+    # Consider Body, Object, and Content placeholders
+    for shape in placeholders.of(*BODY_PLACEHOLDER_TYPES):
+        if getattr(shape, 'has_text_frame', False):
             txt = shape.text or ''
             if txt.strip() == '':
                 try:
-                    slide.shapes._spTree.remove(shape._element)
+                    ph_type = shape.placeholder_format.type
+                    placeholders.remove(shape)
                     removed.append((ph_type, getattr(shape, 'name', None)))
                 except Exception:
                     pass
@@ -293,6 +506,21 @@ def remove_empty_body_placeholders(slide):
 
 # --- PPTX normalization helpers (used by tests) ---
 
+def _order_overrides(types_root, overrides):
+    """Move Override elements to the end of types_root in the order: others, docProps, presentation.
+
+    Works on ElementTree and lxml elements; relative order within each group is kept.
+    """
+    def rank(override):
+        pn = override.get('PartName') or ''
+        if pn.startswith('/docProps/'):
+            return 1
+        return 2 if pn == '/ppt/presentation.xml' else 0
+    for o in sorted(overrides, key=rank):
+        types_root.remove(o)
+        types_root.append(o)
+
+
 def _reorder_content_types(ct_bytes, files=None):
     """Reorder overrides in a [Content_Types].xml blob so that docProps entries occur
     before the presentation part. Returns a bytes object with the updated XML.
@@ -302,33 +530,27 @@ def _reorder_content_types(ct_bytes, files=None):
     except Exception:
         return ct_bytes
     ns = root.tag.split('}')[0].strip('{')
-    overrides = list(root.findall(f'{{{ns}}}Override'))
-
-    others = []
-    docprops = []
-    presentation = []
-
-    for o in overrides:
-        pn = o.attrib.get('PartName')
-        if pn and pn.startswith('/docProps/'):
-            docprops.append(o)
-        elif pn == '/ppt/presentation.xml':
-            presentation.append(o)
-        else:
-            others.append(o)
-
-    # Remove existing override elements
-    for o in overrides:
-        root.remove(o)
-
-    # Append in the order: others, docprops, presentation
-    for o in others + docprops + presentation:
-        root.append(o)
+    _order_overrides(root, list(root.findall(f'{{{ns}}}Override')))
 
     xml_bytes = ET.tostring(root, encoding='utf-8', xml_declaration=True)
     return _fix_xml_declaration(xml_bytes)
 
 
+def _insert_missing_pPr(root):
+    """Give every paragraph (<a:p>) under a txBody a <a:pPr> child; return True if any was added.
+
+    Works on ElementTree and lxml elements.
+    """
+    changed = False
+    for el in root.iter():
+        if isinstance(el.tag, str) and el.tag.split('}', 1)[-1] == 'txBody':
+            for p in el.findall(f'.//{{{DRAWINGML_NS}}}p'):
+                if not any(isinstance(ch.tag, str) and ch.tag.split('}', 1)[-1] == 'pPr' for ch in p):
+                    p.insert(0, p.makeelement(f'{{{DRAWINGML_NS}}}pPr', {}))
+                    changed = True
+    return changed
+
+
 def _normalize_slide_paragraph_pPr(files):
     """Ensure every paragraph (<a:p>) in slide XML has a <a:pPr> child.
     Modifies and returns a new files dict with updated slide XML where needed.
@@ -342,17 +564,7 @@ def _normalize_slide_paragraph_pPr(files):
         except Exception:
             continue
 
-        changed = False
-        # Find txBody elements and ensure each <a:p> contains <a:pPr>
-        for el in root.iter():
-            if el.tag.split('}', 1)[-1] == 'txBody':
-                # iterate direct children paragraphs under txBody
-                for p in el.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/main}p'):
-                    # check for pPr child
-                    if not any(ch.tag.split('}', 1)[-1] == 'pPr' for ch in list(p)):
-                        pPr = ET.Element('{http://schemas.openxmlformats.org/drawingml/2006/main}pPr')
-                        p.insert(0, pPr)
-                        changed = True
+        changed = _insert_missing_pPr(root)
         if changed:
             xml_bytes = ET.tostring(root, encoding='utf-8', xml_declaration=True)
             new_files[name] = _fix_xml_declaration(xml_bytes)
@@ -379,15 +591,8 @@ def _compute_layout_master_overlap_subtract(files, used_layout_names, used_maste
     return overlap // 4
 
 
-def normalize_pptx(pptx_path):
-    """Normalize a PPTX file by populating docProps (Words, Paragraphs, Slides, TitlesOfParts).
-    This mutates the PPTX in place.
-    """
-    try:
-        prs = Presentation(pptx_path)
-    except Exception:
-        return
-
+def _app_properties_xml(prs):
+    """docProps/app.xml content (Words, Paragraphs, Slides, TitlesOfParts) for a loaded presentation"""
     # Compute counts
     slide_count = len(prs.slides)
     words = 0
@@ -429,36 +634,122 @@ def normalize_pptx(pptx_path):
         te.text = t
 
     xml_bytes = ET.tostring(props, encoding='utf-8', xml_declaration=True)
-    new_app_xml = _fix_xml_declaration(xml_bytes)
+    return _fix_xml_declaration(xml_bytes)
+
+
+
+def _zip_member(name):
+    # Fixed timestamp and attributes so the ZIP headers do not depend on when or where it was built
+    info = zipfile.ZipInfo(name, date_time=ZIP_EPOCH)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.create_system = 3
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def _name_media_by_content(package):
+    """Rename image parts after their content hash (relationship targets follow the part names)"""
+    parts = list(package.iter_parts())
+    taken = {part.partname for part in parts}
+    for part in parts:
+        if not isinstance(part, ImagePart) or not part.partname.startswith('/ppt/media/'):
+            continue  # e.g. docProps/thumbnail.jpeg keeps its name
+        partname = PackURI(f'/ppt/media/image-{part.sha1[:16]}.{part.partname.ext}')
+        if partname not in taken:
+            taken.discard(part.partname)
+            part.partname = partname
+            taken.add(partname)
+
+
+def write_presentation(prs, output, reproducible=True):
+    """Save prs to a path or binary file object in a single ZIP pass.
+
+    The package fix-ups are applied to the in-memory parts as they are written:
+    docProps/app.xml statistics from the live slides, <a:pPr> on every
+    paragraph, docProps-before-presentation content-type overrides and
+    double-quoted XML declarations. Nothing is parsed or compressed twice.
+
+    With reproducible, the same presentation always gives the same bytes:
+    members are written in part-name order with a fixed timestamp, and images
+    are named after their content instead of the order they were added in.
+    """
+    for slide in prs.slides:
+        _insert_missing_pPr(slide.element)
+    app_xml = _app_properties_xml(prs)
+
+    package = prs.part.package
+    if reproducible:
+        _name_media_by_content(package)
+    parts = list(package.iter_parts())
+    if reproducible:
+        parts.sort(key=lambda part: part.partname)
+    content_types = _ContentTypesItem.xml_for(parts)
+    _order_overrides(content_types, [el for el in content_types if el.tag.endswith('}Override')])
+    member = _zip_member if reproducible else str
+
+    # Content types, package rels, then each part followed by its rels
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(member('[Content_Types].xml'), _fix_xml_declaration(serialize_part_xml(content_types)))
+        zf.writestr(member(PACKAGE_URI.rels_uri.membername), _fix_xml_declaration(package._rels.xml))
+        for part in parts:
+            blob = app_xml if part.partname == '/docProps/app.xml' else part.blob
+            zf.writestr(member(part.partname.membername), _fix_xml_declaration(blob))
+            if part._rels:
+                zf.writestr(member(part.partname.rels_uri.membername), _fix_xml_declaration(part.rels.xml))
+
+
+def normalize_pptx(pptx_path, reproducible=False):
+    """Normalize a PPTX file by populating docProps (Words, Paragraphs, Slides, TitlesOfParts).
+    This mutates the PPTX in place.
+    """
+    with open(pptx_path, 'rb') as f:
+        package = f.read()
+    normalized = normalize_pptx_bytes(package, reproducible)
+    if normalized is not package:
+        with open(pptx_path, 'wb') as f:
+            f.write(normalized)
+
+
+def normalize_pptx_bytes(package, reproducible=False):
+    """Return PPTX package bytes with docProps populated; unreadable input is returned as-is.
 
-    # Read and rewrite ZIP with updated docProps/app.xml, preserving all metadata
-    tmpfd, tmpname = tempfile.mkstemp(suffix='.pptx')
-    os.close(tmpfd)
+    Member metadata is preserved unless reproducible, which writes the members
+    sorted by name (content types first) with a fixed timestamp instead.
+    """
     try:
-        with zipfile.ZipFile(pptx_path, 'r') as zin, zipfile.ZipFile(tmpname, 'w', zipfile.ZIP_DEFLATED) as zout:
-            for item in zin.infolist():
-                data = zin.read(item.filename)
-                if item.filename == 'docProps/app.xml':
-                    # Create new ZipInfo with same metadata but updated content
-                    new_item = zipfile.ZipInfo(item.filename)
-                    new_item.compress_type = item.compress_type
-                    new_item.create_system = item.create_system
-                    new_item.create_version = item.create_version
-                    new_item.extract_version = item.extract_version
-                    new_item.flag_bits = item.flag_bits
-                    new_item.external_attr = item.external_attr
-                    new_item.date_time = item.date_time
-                    zout.writestr(new_item, new_app_xml)
-                else:
-                    # Preserve original metadata
-                    zout.writestr(item, data)
-        shutil.move(tmpname, pptx_path)
+        prs = Presentation(io.BytesIO(package))
     except Exception:
-        try:
-            os.remove(tmpname)
-        except Exception:
-            pass
-    return
+        return package
+
+    new_app_xml = _app_properties_xml(prs)
+
+    out = io.BytesIO()
+    if reproducible:
+        # Fixed order and timestamps; nothing is carried over from the input's ZIP headers
+        with zipfile.ZipFile(io.BytesIO(package), 'r') as zin, zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zout:
+            for name in sorted(zin.namelist(), key=lambda name: (name != '[Content_Types].xml', name)):
+                zout.writestr(_zip_member(name), new_app_xml if name == 'docProps/app.xml' else zin.read(name))
+        return out.getvalue()
+
+    # Rewrite the ZIP with updated docProps/app.xml, preserving all metadata
+    with zipfile.ZipFile(io.BytesIO(package), 'r') as zin, zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
+            if item.filename == 'docProps/app.xml':
+                # Create new ZipInfo with same metadata but updated content
+                new_item = zipfile.ZipInfo(item.filename)
+                new_item.compress_type = item.compress_type
+                new_item.create_system = item.create_system
+                new_item.create_version = item.create_version
+                new_item.extract_version = item.extract_version
+                new_item.flag_bits = item.flag_bits
+                new_item.external_attr = item.external_attr
+                new_item.date_time = item.date_time
+                zout.writestr(new_item, new_app_xml)
+            else:
+                # Preserve original metadata
+                zout.writestr(item, data)
+    return out.getvalue()
 
 
 def populate_title_slide(slide, headline, paragraph, deck_info=None):
@@ -495,8 +786,7 @@ def populate_title_slide(slide, headline, paragraph, deck_info=None):
 
 def populate_quote_slide(slide, quote, quote_citation):
     """Populate quote slide with quote text and citation."""
-    import sys
-    print(f"  populate_quote_slide - quote: {repr(quote)}, citation: {repr(quote_citation)}", file=sys.stderr, flush=True)
+    log.debug("populate_quote_slide - quote: %r, citation: %r", quote, quote_citation)
     
     # Find text placeholders - skip title placeholder (idx 0), use content placeholder
     for shape in slide.shapes:
@@ -539,18 +829,14 @@ def populate_quote_slide(slide, quote, quote_citation):
                 break
 
 
-def populate_closing_slide(slide, headline, paragraph, image_path):
+def populate_closing_slide(slide, headline, paragraph, image_path, downscale_images=True, placeholders=None):
     """Populate closing slide with name and optional image."""
-    # Find title placeholder
-    title_placeholder = None
-    content_placeholder = None
-    
-    for shape in slide.placeholders:
-        ph_type = shape.placeholder_format.type
-        if ph_type == 1:  # Title
-            title_placeholder = shape
-        elif ph_type in [2, 7]:  # Body or Object
-            content_placeholder = shape
+    placeholders = placeholders or PlaceholderIndex(slide)
+    # The last title and Body/Object placeholders on the slide are used
+    titles = placeholders.of(TITLE_PLACEHOLDER)
+    title_placeholder = titles[-1] if titles else None
+    bodies = placeholders.of(2, 7)
+    content_placeholder = bodies[-1] if bodies else None
     
     if title_placeholder:
         if title_placeholder.has_text_frame:
@@ -575,10 +861,10 @@ def populate_closing_slide(slide, headline, paragraph, image_path):
     
     # Add image if present
     if image_path:
-        _pic, _ph = add_image_to_slide(slide, image_path)  # placeholder info unused for closing slide
+        _pic, _ph = add_image_to_slide(slide, image_path, downscale_images=downscale_images, placeholders=placeholders)  # placeholder info unused for closing slide
 
 
-def populate_photo_slide(slide, image_path, headline=None, hide_headline=True, paragraph=None, bullets=None, larger_image=False, prs=None):
+def populate_photo_slide(slide, image_path, headline=None, hide_headline=True, paragraph=None, bullets=None, larger_image=False, prs=None, downscale_images=True, placeholders=None):
     """Populate photo-centered slide with large image and optional headline and text.
 
     Args:
@@ -590,6 +876,8 @@ def populate_photo_slide(slide, image_path, headline=None, hide_headline=True, p
         bullets: Optional bullets list
         larger_image: If True, attempt to scale the added image to occupy most of the slide
         prs: Optional Presentation object to read slide width/height from (used for scaling)
+        downscale_images: Embed a rendition sized for the slide instead of the full-resolution image
+        placeholders: The slide's PlaceholderIndex, if already built
     """
     """Populate photo-centered slide with large image and optional headline and text.
 
@@ -602,22 +890,12 @@ def populate_photo_slide(slide, image_path, headline=None, hide_headline=True, p
         bullets: Optional bullets list
         larger_image: If True, attempt to scale the added image to occupy most of the slide
     """
-    # Debug: print all placeholders in this slide
-    print(f"  populate_photo_slide - slide placeholders:")
-    for shape in slide.shapes:
-        if shape.is_placeholder:
-            ph_type = shape.placeholder_format.type
-            print(f"    Placeholder type {ph_type}: {shape.name}")
+    placeholders = placeholders or PlaceholderIndex(slide)
+    log.debug("populate_photo_slide - placeholder types: %s", sorted(placeholders.by_type))
     
     # Add headline if not hidden
     if headline and not hide_headline:
-        title_shape = None
-        for shape in slide.shapes:
-            if shape.is_placeholder:
-                ph_type = shape.placeholder_format.type
-                if ph_type == 1:  # Title placeholder
-                    title_shape = shape
-                    break
+        title_shape = placeholders.first(TITLE_PLACEHOLDER)
         
         if title_shape and title_shape.has_text_frame:
             tf = title_shape.text_frame
@@ -626,13 +904,7 @@ def populate_photo_slide(slide, image_path, headline=None, hide_headline=True, p
     
     # Add paragraph/bullets to body placeholder if present
     if paragraph or bullets:
-        body_shape = None
-        for shape in slide.shapes:
-            if shape.is_placeholder and shape.has_text_frame:
-                ph_type = shape.placeholder_format.type
-                if ph_type in [2, 7, 14]:  # Body, Object, or Content placeholder
-                    body_shape = shape
-                    break
+        body_shape = next((shape for shape in placeholders.of(*BODY_PLACEHOLDER_TYPES) if shape.has_text_frame), None)
         
         if body_shape and body_shape.has_text_frame:
             text_frame = body_shape.text_frame
@@ -664,12 +936,11 @@ def populate_photo_slide(slide, image_path, headline=None, hide_headline=True, p
             
             # Add bullets if present
             if bullets:
-                import sys
-                print(f"    populate_photo_slide bullets: {repr(bullets)}", file=sys.stderr, flush=True)
+                log.debug("populate_photo_slide bullets: %r", bullets)
                 for i, bullet in enumerate(bullets):
                     # Skip empty bullets or bracket artifacts
                     if not bullet or bullet.strip() in ['[', ']', '[]']:
-                        print(f"    Skipping bullet: {repr(bullet)}", file=sys.stderr, flush=True)
+                        log.debug("Skipping bullet: %r", bullet)
                         continue
                     if i == 0 and not paragraph:
                         p = text_frame.paragraphs[0]
@@ -682,7 +953,8 @@ def populate_photo_slide(slide, image_path, headline=None, hide_headline=True, p
     pic = None
     ph_bounds = None
     if image_path:
-        pic, ph_bounds = add_image_to_slide(slide, image_path, centered=True)
+        pic, ph_bounds = add_image_to_slide(slide, image_path, centered=True, downscale_images=downscale_images,
+                                            placeholders=placeholders)
 
     # If this slide requested a larger image, scale up the picture we just added
     try:
@@ -724,17 +996,17 @@ def populate_photo_slide(slide, image_path, headline=None, hide_headline=True, p
             pic.left = int(b_left + (b_width - pic.width) // 2)
             pic.top = int(b_top + (b_height - pic.height) // 2)
 
-            print(f"    Scaled picture for larger_image: width={pic.width/914400:.2f}in height={pic.height/914400:.2f}in", file=sys.stderr)
+            log.debug("Scaled picture for larger_image: width=%.2fin height=%.2fin", pic.width / 914400, pic.height / 914400)
     except Exception as e:
-        print(f"    Error scaling pic for larger_image: {e}", file=sys.stderr)
+        log.warning("Error scaling pic for larger_image: %s", e)
 
     # Remove empty body/content placeholders to avoid empty text boxes showing in PowerPoint
-    removed = remove_empty_body_placeholders(slide)
+    removed = remove_empty_body_placeholders(slide, placeholders)
     if removed:
-        print(f"    Removed empty placeholders: {removed}")
+        log.debug("Removed empty placeholders: %s", removed)
 
 
-def populate_content_slide(slide, headline, paragraph, bullets, image_path, hide_headline, slide_class=None, larger_image=False, prs=None):
+def populate_content_slide(slide, headline, paragraph, bullets, image_path, hide_headline, slide_class=None, larger_image=False, prs=None, downscale_images=True, placeholders=None):
     """Populate standard content slide with headline, text, bullets, and optional image.
 
     Args:
@@ -747,21 +1019,19 @@ def populate_content_slide(slide, headline, paragraph, bullets, image_path, hide
         slide_class: Optional slide class hint
         larger_image: If True, attempt to scale inserted image to occupy more slide area
         prs: Optional Presentation object used to get slide dimensions for scaling
+        downscale_images: Embed a rendition sized for the placeholder instead of the full-resolution image
+        placeholders: The slide's PlaceholderIndex, if already built
     """
-    print(f"  populate_content_slide - image_path: {repr(image_path)}, hide_headline: {hide_headline}, larger_image: {larger_image}, prs_present: {prs is not None}", file=sys.stderr, flush=True)
+    placeholders = placeholders or PlaceholderIndex(slide)
+    log.debug("populate_content_slide - image_path: %r, hide_headline: %s, larger_image: %s, prs_present: %s",
+              image_path, hide_headline, larger_image, prs is not None)
     
     # Determine if this is a text-only slide
     is_text_only = slide_class and 'lines' in slide_class
     
     # Find title placeholder
     if not hide_headline and headline:
-        title_shape = None
-        for shape in slide.shapes:
-            if shape.is_placeholder:
-                ph_type = shape.placeholder_format.type
-                if ph_type == 1:  # Title placeholder
-                    title_shape = shape
-                    break
+        title_shape = placeholders.first(TITLE_PLACEHOLDER)
         
         if title_shape and title_shape.has_text_frame:
             # Clear and add formatted headline
@@ -771,13 +1041,7 @@ def populate_content_slide(slide, headline, paragraph, bullets, image_path, hide
     
     # Find content placeholder for bullets or paragraph
     # Try multiple placeholder types (2=Body, 7=Object, 14=Content)
-    content_shape = None
-    for shape in slide.shapes:
-        if shape.is_placeholder and shape.has_text_frame:
-            ph_type = shape.placeholder_format.type
-            if ph_type in [2, 7, 14]:  # Body, Object, or Content placeholder
-                content_shape = shape
-                break
+    content_shape = next((shape for shape in placeholders.of(*BODY_PLACEHOLDER_TYPES) if shape.has_text_frame), None)
     
     # If no specific content placeholder found, try any text placeholder that's not the title
     if not content_shape:
@@ -803,7 +1067,7 @@ def populate_content_slide(slide, headline, paragraph, bullets, image_path, hide
         # For text-only slides (like template-lines), prioritize paragraph content
         if is_text_only and paragraph:
             add_formatted_text_to_frame(text_frame, paragraph)
-            print(f"    Adding formatted paragraph text for text-only slide: {paragraph[:50]}...")
+            log.debug("Adding formatted paragraph text for text-only slide: %s...", paragraph[:50])
         # For bullet slides, handle paragraph first, then bullets
         elif not is_text_only:
             paragraph_added = False
@@ -816,14 +1080,14 @@ def populate_content_slide(slide, headline, paragraph, bullets, image_path, hide
                 from lxml import etree
                 buNone = etree.SubElement(p._element.get_or_add_pPr(), '{http://schemas.openxmlformats.org/drawingml/2006/main}buNone')
                 paragraph_added = True
-                print(f"    Adding paragraph text: {paragraph[:50]}...")
+                log.debug("Adding paragraph text: %s...", paragraph[:50])
             
             # Add bullets if present
             if bullets:
                 try:
                     bullet_list = json.loads(bullets)
                     if bullet_list:  # Only add if list is not empty
-                        print(f"    Adding {len(bullet_list)} bullets")
+                        log.debug("Adding %d bullets", len(bullet_list))
                         for i, bullet in enumerate(bullet_list):
                             if i == 0 and not paragraph_added:
                                 # Use first paragraph if no paragraph text was added
@@ -875,16 +1139,13 @@ def populate_content_slide(slide, headline, paragraph, bullets, image_path, hide
             buNone = etree.SubElement(p._element.get_or_add_pPr(), '{http://schemas.openxmlformats.org/drawingml/2006/main}buNone')
     else:
         # Debug: print placeholder info
-        print(f"Warning: No content placeholder found for slide. Available placeholders:")
-        for shape in slide.shapes:
-            if shape.is_placeholder:
-                print(f"  Type: {shape.placeholder_format.type}, Has text frame: {shape.has_text_frame}")
+        log.warning("No content placeholder found for slide. Available placeholder types: %s", sorted(placeholders.by_type))
     
     # Add image if present
     pic = None
     ph_bounds = None
     if image_path:
-        pic, ph_bounds = add_image_to_slide(slide, image_path)
+        pic, ph_bounds = add_image_to_slide(slide, image_path, downscale_images=downscale_images, placeholders=placeholders)
 
     # If this slide requested a larger image, scale up the picture we just added
     try:
@@ -926,213 +1187,230 @@ def populate_content_slide(slide, headline, paragraph, bullets, image_path, hide
             pic.left = int(b_left + (b_width - pic.width) // 2)
             pic.top = int(b_top + (b_height - pic.height) // 2)
 
-            print(f"    Scaled picture for larger_image: width={pic.width/914400:.2f}in height={pic.height/914400:.2f}in", file=sys.stderr)
+            log.debug("Scaled picture for larger_image: width=%.2fin height=%.2fin", pic.width / 914400, pic.height / 914400)
     except Exception as e:
-        print(f"    Error scaling pic for larger_image: {e}", file=sys.stderr)
+        log.warning("Error scaling pic for larger_image: %s", e)
 
     # Remove empty body/content placeholders so empty text placeholders don't render
-    removed = remove_empty_body_placeholders(slide)
+    removed = remove_empty_body_placeholders(slide, placeholders)
     if removed:
-        print(f"    Removed empty placeholders: {removed}")
+        log.debug("Removed empty placeholders: %s", removed)
 
 
-def add_image_to_slide(slide, image_path, centered=False):
-    """Add an image to a slide, either in a picture placeholder or positioned."""
-    from PIL import Image
-    
-    # Clean up image path
+def _embedded_image(image_path, info, width, height, downscale_images):
+    """The file to embed for an image placed at width x height EMU (a downscaled rendition if enabled)"""
+    if not downscale_images or info is None:
+        return image_path
+    try:
+        return image_renditions.rendition(image_path, info, width, height)
+    except Exception as e:
+        log.warning("Could not create image rendition for %s: %s", image_path, e)
+        return image_path
+
+
+def _resolve_image_path(image_path):
+    """Map a slide's image_path ('/assets/x', 'assets/x' or 'x') to its file under assets/"""
     if image_path.startswith('/assets/'):
-        image_path = 'assets' + image_path[7:]
+        return 'assets' + image_path[7:]
     elif image_path.startswith('assets/'):
-        pass  # Already correct
-    else:
-        image_path = 'assets/' + image_path
+        return image_path  # Already correct
+    return 'assets/' + image_path
+
+
+def _image_source(image_path):
+    """Return (file to embed, its AssetInfo, width px, height px) for a slide's image_path, or None if missing"""
+    image_path = _resolve_image_path(image_path)
     
-    # Check if file exists
-    if not os.path.exists(image_path):
-        print(f"Warning: Image not found: {image_path}")
-        return
+    # Dimensions, size and format come from the asset index; unchanged images are not decoded
+    info = asset_index.lookup(image_path)
+    if info is None:
+        return None
+    img_width, img_height = info.width, info.height
     
     # Get image dimensions - handle GIFs specially to preserve animation
     if image_path.lower().endswith('.gif'):
         # For GIFs, either preserve animation for small files or use a PNG fallback for large GIFs
-        try:
-            from PIL import Image
-            gif_size = os.path.getsize(image_path)
-            if gif_size > GIF_FALLBACK_THRESHOLD:
-                # Convert first frame to PNG fallback to avoid embedding huge animated GIFs
-                try:
-                    with Image.open(image_path) as img:
-                        img.seek(0)
-                        fallback = tempfile.NamedTemporaryFile(delete=False, suffix='.png', prefix='pptx_gif_fallback_')
-                        fallback_path = fallback.name
-                        fallback.close()
-                        img.convert('RGBA').save(fallback_path, 'PNG')
-                        image_path = fallback_path
-                        # Update dimensions from the generated PNG
-                        with Image.open(fallback_path) as pf:
-                            img_width, img_height = pf.size
-                except Exception as e:
-                    print(f"Warning: Could not create PNG fallback for GIF: {e}")
-                    img_width, img_height = 800, 600
-            else:
-                with Image.open(image_path) as img:
-                    img_width, img_height = img.size
-        except Exception as e:
-            print(f"Warning: Could not read GIF dimensions: {e}")
+        if info.size > GIF_FALLBACK_THRESHOLD:
+            # Use a PNG of the first frame (converted once per GIF) to avoid embedding huge animated GIFs
+            try:
+                image_path = image_renditions.gif_fallback(image_path, info)
+                info = asset_index.lookup(image_path)
+                img_width, img_height = info.width, info.height
+            except Exception as e:
+                log.warning("Could not create PNG fallback for GIF: %s", e)
+                img_width, img_height = 800, 600
+        elif img_width is None:
+            log.warning("Could not read GIF dimensions: %s", image_path)
             # Use default dimensions if we can't read the file
             img_width, img_height = 800, 600
+    elif img_width is None:
+        raise OSError(f"Cannot identify image file {image_path!r}")
+    return image_path, info, img_width, img_height
+
+
+def _fit_within(img_width, img_height, box_width, box_height):
+    """Largest (width, height) with the image's aspect ratio that fits in the box"""
+    img_aspect = img_width / img_height
+    if img_aspect > box_width / box_height:
+        # Image is wider - constrain by width
+        return box_width, int(box_width / img_aspect)
+    # Image is taller - constrain by height
+    return int(box_height * img_aspect), box_height
+
+
+def _image_placeholder(candidates):
+    """Choose the placeholder add_image_to_slide puts an image in.
+
+    candidates are (placeholder, type, (left, top, width, height), empty) in
+    slide order. Returns (placeholder, bounds) for the first picture placeholder,
+    else the largest empty body/object placeholder, else None (the image is
+    centered on the slide).
+    """
+    candidates = list(candidates)
+    for placeholder, ph_type, bounds, _empty in candidates:
+        if ph_type == PICTURE_PLACEHOLDER:
+            return placeholder, bounds
+    largest, largest_area = None, 0
+    for placeholder, ph_type, bounds, empty in candidates:
+        if ph_type in BODY_PLACEHOLDER_TYPES and empty and bounds[2] * bounds[3] > largest_area:
+            largest, largest_area = (placeholder, bounds), bounds[2] * bounds[3]
+    return largest
+
+
+def _text_placeholder_idx(slide_data, template_key, geometry):
+    # The layout placeholder the populate functions will have written text into before the image is added
+    slide_class, paragraph, bullets = slide_data[0], slide_data[2], slide_data[3]
+    if template_key == "closing":
+        bodies = [idx for idx, g in geometry.items() if g[0] in (2, 7)]
+        return bodies[-1] if bodies and paragraph else None
+    has_bullets = bool(bullets) and bullets.strip() not in ('', '[]') and not (slide_class and 'lines' in slide_class)
+    bodies = [idx for idx, g in geometry.items() if g[0] in BODY_PLACEHOLDER_TYPES]
+    return bodies[0] if bodies and (paragraph or has_bullets) else None
+
+
+def _prefetch_image(image_path, box, downscale_images):
+    # Index the image, convert an oversized GIF and build the rendition add_image_to_slide will ask for
+    source = _image_source(image_path)
+    if source is None:
+        return False
+    path, info, img_width, img_height = source
+    if box is None:
+        # No picture placeholder: the native branch sizes the rendition for the whole slide
+        _embedded_image(path, info, SLIDE_WIDTH, SLIDE_HEIGHT, downscale_images)
     else:
-        # For other formats, use normal PIL processing
-        from PIL import Image
-        with Image.open(image_path) as img:
-            img_width, img_height = img.size
+        _embedded_image(path, info, *_fit_within(img_width, img_height, *box), downscale_images)
+    return True
+
+
+def prefetch_images(slides_data, slide_layouts, template, downscale_images=True):
+    """Prepare every image of a deck on a thread pool before its slides are populated.
+
+    Hashing, indexing, GIF conversion and renditions for the size each image is
+    placed at all land in their content-keyed caches (asset_index and
+    image_renditions), so add_image_to_slide only picks up finished files and
+    a deck's images take about as long as the slowest one. Missing images are
+    reported up front, before any slide is built.
+    """
+    jobs = {}
+    for slide_data, (layout_name, template_key) in zip(slides_data, slide_layouts):
+        image_path, is_title = slide_data[6], slide_data[7]
+        if not image_path or is_title:
+            continue
+        if template_key != "closing" and template_key not in PHOTO_TEMPLATES | IMAGE_TEMPLATES:
+            continue
+        # Predict the placeholder the image is fitted into once the slide's text is in place
+        geometry = template.placeholder_geometry.get(layout_name, {})
+        filled = _text_placeholder_idx(slide_data, template_key, geometry)
+        target = _image_placeholder((idx, g[0], g[1:], idx != filled) for idx, g in geometry.items())
+        jobs.setdefault((image_path, target[1][2:] if target else None), None)
+    if not jobs:
+        return
     
-    # Try to find a picture placeholder
-    picture_placeholder = None
-    for shape in slide.shapes:
-        if shape.is_placeholder:
-            ph_type = shape.placeholder_format.type
-            # Debug output
-            import sys
-            print(f"    Found placeholder: type={ph_type}, name={shape.name}", file=sys.stderr, flush=True)
-            if ph_type == 18:  # Picture placeholder
-                picture_placeholder = shape
-                print(f"    -> Using this as picture placeholder!", file=sys.stderr, flush=True)
-                break
+    def prefetch(job):
+        try:
+            return _prefetch_image(job[0], job[1], downscale_images)
+        except Exception as e:
+            log.warning("Could not prepare image %s: %s", job[0], e)
+            return True  # Retried (and reported) when the slide is populated
     
-    if picture_placeholder:
-        # Get placeholder dimensions
-        ph_width = picture_placeholder.width
-        ph_height = picture_placeholder.height
-        ph_left = picture_placeholder.left
-        ph_top = picture_placeholder.top
-        
-        import sys
-        print(f"    Picture placeholder dimensions: width={ph_width/914400:.2f}in, height={ph_height/914400:.2f}in", file=sys.stderr, flush=True)
-        print(f"    Picture placeholder position: left={ph_left/914400:.2f}in, top={ph_top/914400:.2f}in", file=sys.stderr, flush=True)
-        print(f"    Image dimensions: {img_width}x{img_height} pixels", file=sys.stderr, flush=True)
-        
-        # Use the image dimensions already determined above
-        img_aspect = img_width / img_height
-        ph_aspect = ph_width / ph_height
+    with ThreadPoolExecutor(max_workers=min(IMAGE_PREFETCH_WORKERS, len(jobs))) as pool:
+        found = dict(zip(jobs, pool.map(prefetch, jobs)))
+    for image_path in sorted({job[0] for job, ok in found.items() if not ok}):
+        log.warning("Image not found: %s", _resolve_image_path(image_path))
+
+
+def add_image_to_slide(slide, image_path, centered=False, downscale_images=True, placeholders=None):
+    """Add an image to a slide, either in a picture placeholder or positioned.
+
+    With downscale_images, images much larger than their placed size are embedded as
+    downscaled copies (see image_renditions).
+    """
+    source = _image_source(image_path)
+    if source is None:
+        log.warning("Image not found: %s", image_path)
+        return None, None
+    image_path, info, img_width, img_height = source
+    
+    placeholders = placeholders or PlaceholderIndex(slide)
+    target = _image_placeholder(
+        (shape, int(shape.placeholder_format.type), placeholders.bounds(shape),
+         not (getattr(shape, 'has_text_frame', False) and (shape.text or '').strip()))
+        for shape in placeholders.of(PICTURE_PLACEHOLDER, *BODY_PLACEHOLDER_TYPES))
+    
+    if target:
+        placeholder, (ph_left, ph_top, ph_width, ph_height) = target
+        if int(placeholder.placeholder_format.type) == PICTURE_PLACEHOLDER:
+            log.debug("Picture placeholder dimensions: width=%.2fin, height=%.2fin", ph_width / 914400, ph_height / 914400)
+            log.debug("Picture placeholder position: left=%.2fin, top=%.2fin", ph_left / 914400, ph_top / 914400)
+            log.debug("Image dimensions: %sx%s pixels", img_width, img_height)
+        else:
+            # No picture placeholder: the largest empty content/object placeholder takes the image
+            log.debug("Using largest empty placeholder for image: %s size=%.2fx%.2fin",
+                      getattr(placeholder, 'name', None), ph_width / 914400, ph_height / 914400)
         
         # Calculate size to fit within placeholder while maintaining aspect ratio
-        if img_aspect > ph_aspect:
-            # Image is wider - constrain by width
-            new_width = ph_width
-            new_height = int(ph_width / img_aspect)
-        else:
-            # Image is taller - constrain by height
-            new_height = ph_height
-            new_width = int(ph_height * img_aspect)
+        new_width, new_height = _fit_within(img_width, img_height, ph_width, ph_height)
         
-        print(f"    Calculated image size: width={new_width/914400:.2f}in, height={new_height/914400:.2f}in", file=sys.stderr, flush=True)
+        log.debug("Calculated image size: width=%.2fin, height=%.2fin", new_width / 914400, new_height / 914400)
         
         # Center within placeholder
         left = ph_left + (ph_width - new_width) // 2
         top = ph_top + (ph_height - new_height) // 2
         
         # Remove the placeholder and add image in its place
-        sp = picture_placeholder.element
-        sp.getparent().remove(sp)
-        pic = slide.shapes.add_picture(image_path, left, top, width=new_width, height=new_height)
+        placeholders.remove(placeholder)
+        pic = slide.shapes.add_picture(_embedded_image(image_path, info, new_width, new_height, downscale_images),
+                                       left, top, width=new_width, height=new_height)
         
         # Send image to back so it doesn't cover text
         slide.shapes._spTree.remove(pic._element)
         slide.shapes._spTree.insert(2, pic._element)
-        # Clean up any temporary fallback PNG we created for GIFs
-        try:
-            if 'fallback_path' in locals() and fallback_path:
-                os.remove(fallback_path)
-        except Exception:
-            pass
         return pic, {'left': ph_left, 'top': ph_top, 'width': ph_width, 'height': ph_height}
     else:
-        # No explicit picture placeholder; try to find a large empty content/object placeholder to place the image
-        largest_ph = None
-        largest_area = 0
-        for shape in slide.shapes:
-            if getattr(shape, 'is_placeholder', False):
-                try:
-                    ph_type = shape.placeholder_format.type
-                except Exception:
-                    continue
-                # Consider Body, Object, or Content placeholders
-                if ph_type in [2, 7, 14]:
-                    # Only use placeholders that are empty (no text) or don't have a text frame
-                    empty_text = True
-                    if getattr(shape, 'has_text_frame', False):
-                        txt = shape.text or ''
-                        if txt.strip():
-                            empty_text = False
-                    if not empty_text:
-                        continue
-                    area = shape.width * shape.height
-                    if area > largest_area:
-                        largest_area = area
-                        largest_ph = shape
-        if largest_ph is not None and largest_area > 0:
-            ph_width = largest_ph.width
-            ph_height = largest_ph.height
-            ph_left = largest_ph.left
-            ph_top = largest_ph.top
-            print(f"    Using largest empty placeholder for image: {getattr(largest_ph, 'name', None)} size={ph_width/914400:.2f}x{ph_height/914400:.2f}in", file=sys.stderr, flush=True)
-            img_aspect = img_width / img_height
-            ph_aspect = ph_width / ph_height
-            if img_aspect > ph_aspect:
-                new_width = ph_width
-                new_height = int(ph_width / img_aspect)
-            else:
-                new_height = ph_height
-                new_width = int(ph_height * img_aspect)
-            left = ph_left + (ph_width - new_width) // 2
-            top = ph_top + (ph_height - new_height) // 2
-            # Remove placeholder and insert picture
-            sp = largest_ph.element
-            sp.getparent().remove(sp)
-            pic = slide.shapes.add_picture(image_path, left, top, width=new_width, height=new_height)
-            # Send to back
-            slide.shapes._spTree.remove(pic._element)
-            slide.shapes._spTree.insert(2, pic._element)
-            # Clean up any temporary fallback PNG we created for GIFs
-            try:
-                if 'fallback_path' in locals() and fallback_path:
-                    os.remove(fallback_path)
-            except Exception:
-                pass
-            return pic, {'left': ph_left, 'top': ph_top, 'width': ph_width, 'height': ph_height}
-        else:
-            # Fallback to native centered size behavior
-            # Use the dimensions already determined above (img_width, img_height)
-            img_width_px, img_height_px = img_width, img_height
-            # Convert pixels to EMUs (English Metric Units): 1 inch = 914400 EMUs, assume 96 DPI
-            dpi = 96
-            img_width_emu = int(img_width_px * 914400 / dpi)
-            img_height_emu = int(img_height_px * 914400 / dpi)
-            
-            # Get slide dimensions (standard is 10" x 7.5")
-            slide_width = 9144000  # 10 inches in EMUs
-            slide_height = 6858000  # 7.5 inches in EMUs
-            
-            # Center the image
+        # Fallback to native centered size behavior
+        # Use the dimensions already determined above (img_width, img_height)
+        img_width_px, img_height_px = img_width, img_height
+        # Convert pixels to EMUs (English Metric Units): 1 inch = 914400 EMUs, assume 96 DPI
+        dpi = 96
+        img_width_emu = int(img_width_px * 914400 / dpi)
+        img_height_emu = int(img_height_px * 914400 / dpi)
+        
+        slide_width, slide_height = SLIDE_WIDTH, SLIDE_HEIGHT
+        
+        # Center the image
+        left = (slide_width - img_width_emu) // 2
+        top = (slide_height - img_height_emu) // 2
+        
+        # Ensure image doesn't exceed slide bounds
+        if img_width_emu > slide_width or img_height_emu > slide_height:
+            # Scale down to fit
+            scale = min(slide_width / img_width_emu, slide_height / img_height_emu) * 0.9
+            img_width_emu = int(img_width_emu * scale)
+            img_height_emu = int(img_height_emu * scale)
             left = (slide_width - img_width_emu) // 2
             top = (slide_height - img_height_emu) // 2
-            
-            # Ensure image doesn't exceed slide bounds
-            if img_width_emu > slide_width or img_height_emu > slide_height:
-                # Scale down to fit
-                scale = min(slide_width / img_width_emu, slide_height / img_height_emu) * 0.9
-                img_width_emu = int(img_width_emu * scale)
-                img_height_emu = int(img_height_emu * scale)
-                left = (slide_width - img_width_emu) // 2
-                top = (slide_height - img_height_emu) // 2
-            
-            pic = slide.shapes.add_picture(image_path, left, top, width=img_width_emu, height=img_height_emu)
-            # Clean up any temporary fallback PNG we created for GIFs
-            try:
-                if 'fallback_path' in locals() and fallback_path:
-                    os.remove(fallback_path)
-            except Exception:
-                pass
-            return pic, None
+        
+        # larger_image may later grow this picture up to the slide size, so size the rendition for that
+        embedded = _embedded_image(image_path, info, slide_width, slide_height, downscale_images)
+        pic = slide.shapes.add_picture(embedded, left, top, width=img_width_emu, height=img_height_emu)
+        return pic, None
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Per-request preview workspaces.
+
+Each preview is rendered under its own name, previews/<scope>-<content hash>,
+where scope is e.g. "presentation-3" or "deck-12". Two editors or tabs
+previewing different content therefore never overwrite each other's HTML.
+Previewing identical content again reuses the workspace that already exists.
+
+Workspaces that have not been rendered or reused for MAX_AGE_SECONDS are
+deleted by collect_garbage(). It runs every GC_INTERVAL_SECONDS on a
+background timer that is started with the first preview.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import marp_worker
+
+log = logging.getLogger(__name__)
+
+WORKSPACE_DIR = 'previews'
+
+# Workspaces untouched for this long are deleted
+MAX_AGE_SECONDS = 6 * 3600
+
+# How often the garbage collector runs
+GC_INTERVAL_SECONDS = 15 * 60
+
+_gc_timer = None
+_gc_guard = threading.Lock()
+
+
+def workspace_name(scope, content):
+    """Name of the workspace for this scope and markdown content"""
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+    return f'{WORKSPACE_DIR}/{scope}-{digest}'
+
+
+def render(scope, content):
+    """Render content in its own workspace and return the preview's URL path"""
+    _schedule_gc()
+    name = workspace_name(scope, content)
+    path = marp_worker.render(name, content)
+    os.utime(path)  # Mark as recently used for the garbage collector
+    return '/' + path.replace(os.sep, '/')
+
+
+def collect_garbage(max_age=None):
+    """Delete workspaces that have not been used for max_age seconds; return their names"""
+    max_age = MAX_AGE_SECONDS if max_age is None else max_age
+    cutoff = time.time() - max_age
+    removed = []
+    for base, ext in ((marp_worker.SOURCE_DIR, '.md'), (marp_worker.OUTPUT_DIR, '.html')):
+        directory = os.path.join(base, WORKSPACE_DIR)
+        try:
+            entries = os.listdir(directory)
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if not entry.endswith(ext):
+                continue
+            name = f'{WORKSPACE_DIR}/{entry[:-len(ext)]}'
+            html = os.path.join(marp_worker.OUTPUT_DIR, name + '.html')
+            try:
+                last_used = os.stat(html).st_mtime
+            except FileNotFoundError:
+                try:
+                    last_used = os.stat(os.path.join(directory, entry)).st_mtime
+                except FileNotFoundError:
+                    continue  # Removed while we were scanning
+            if last_used < cutoff and name not in removed:
+                marp_worker.discard(name)
+                removed.append(name)
+    return removed
+
+
+def _run_gc():
+    global _gc_timer
+    try:
+        collect_garbage()
+    except OSError as e:
+        log.warning("Preview cleanup failed: %s", e)
+    with _gc_guard:
+        _gc_timer = None
+    _schedule_gc()
+
+
+def _schedule_gc():
+    global _gc_timer
+    with _gc_guard:
+        if _gc_timer is None:
+            _gc_timer = threading.Timer(GC_INTERVAL_SECONDS, _run_gc)
+            _gc_timer.daemon = True
+            _gc_timer.start()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Export every deck of a presentation into one ZIP (the CLI twin of /api/presentations/<id>/export-all).
+
+Decks are built in parallel with the same worker limits and export cache as the
+web app, so a nightly cron run only rebuilds decks that changed.
+
+Example (cron):
+    cd /path/to/course-kit && python3 scripts/export_semester.py --presentation 1 --format pptx \
+        --output output/semester_pptx.zip
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import export_jobs  # noqa: E402
+
+
+def _load_app(db_path: str):
+    """Import app pointed at db_path, with db_path migrated."""
+    # Importing app migrates its database, so choose it first
+    os.environ['PRESENTATIONS_DB'] = db_path
+    import app
+    app.DB_PATH = db_path
+    app.init_db()  # Nothing to do if the import just migrated it
+    return app
+
+
+def export_semester(presentation_id: int, format_type: str, output: str, db_path: str = 'presentations.db') -> int:
+    """Write the ZIP to output and return the number of decks that failed to export."""
+    app = _load_app(db_path)
+    with app.app.app_context():
+        prepared = app.prepare_presentation_exports(app.get_db(), presentation_id, format_type)
+    if prepared is None:
+        raise ValueError(f'Presentation {presentation_id} not found')
+    _name, specs = prepared
+
+    failures = 0
+
+    def report(results):
+        nonlocal failures
+        for spec, path, error in results:
+            if error is None:
+                print(f"  ok      {spec['download_name']}")
+            else:
+                failures += 1
+                print(f"  FAILED  {spec['download_name']}: {error}")
+            yield spec, path, error
+
+    # Write to a temp name and rename so a half-written ZIP never replaces a good one
+    tmp_output = output + '.partial'
+    with open(tmp_output, 'wb') as f:
+        for chunk in export_jobs.stream_zip(report(export_jobs.export_many(specs))):
+            f.write(chunk)
+    os.replace(tmp_output, output)
+    print(f"Exported {len(specs) - failures}/{len(specs)} decks to {output}")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Export all decks of a presentation to a ZIP')
+    parser.add_argument('--presentation', '-p', type=int, required=True, help='Presentation id')
+    parser.add_argument('--format', '-f', default='pptx', choices=['pptx', 'pdf', 'odp'], help='Export format')
+    parser.add_argument('--output', '-o', help='ZIP path (default: output/presentation_<id>_<format>.zip)')
+    parser.add_argument('--db', default='presentations.db', help='Path to SQLite DB')
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.join('output', f'presentation_{args.presentation}_{args.format}.zip')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    try:
+        failures = export_semester(args.presentation, args.format, output, db_path=args.db)
+    except Exception as e:
+        print(f"Error: {e}")
+        return 2
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
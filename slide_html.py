@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Native HTML rendering of a single slide for the editor's live preview.
+
+render_fragment() turns a SlideRecord straight into the <section> Marp would
+produce for it, with the same classes (see markdown_renderer.slide_classes),
+so presentation-styles.css styles it the same way. No Marp or Node process is
+involved, which makes it cheap enough to call on every keystroke.
+
+Slide text is HTML-escaped, except that a typed <br> still breaks the line;
+**bold**, *italic*, `code` and [links](url) are converted. Links are only
+emitted for http(s), mailto and relative targets.
+Fragments are memoized on the substituted slide record and deck context, and
+each comes with a hash of its content for use as an ETag.
+"""
+
+import functools
+import hashlib
+import html
+import re
+
+import markdown_renderer
+
+# Fragments kept in memory; one per slide revision being previewed
+FRAGMENT_CACHE_SIZE = 1024
+
+STYLESHEET_URL = '/presentation-styles.css'
+
+INLINE_PATTERN = re.compile(
+    r'`([^`]+)`'
+    r'|\*\*([\s\S]+?)\*\*'
+    r'|\*([^*\s][^*]*?)\*'
+    r'|\[([^\]]+)\]\(([^)\s]+)\)'
+)
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+LINE_BREAK_TAG = re.compile(r'&lt;br\s*/?&gt;', re.IGNORECASE)
+
+# Link targets that cannot run script: http(s), mailto, or no scheme at all
+SAFE_URL = re.compile(r'https?:|mailto:|[^:]*(?:[/?#]|$)', re.IGNORECASE)
+URL_IGNORED_CHARS = re.compile(r'[\x00-\x20]')  # Browsers skip these when reading a scheme
+
+
+def _safe_url(url):
+    return SAFE_URL.match(URL_IGNORED_CHARS.sub('', html.unescape(url))) is not None
+
+
+def _inline(text):
+    return _markup(LINE_BREAK_TAG.sub('\n', html.escape(text.strip())))
+
+
+def _markup(escaped):
+    # escaped is already HTML-escaped, so captured groups are safe to emit as-is
+    def replace(match):
+        code, bold, italic, label, url = match.groups()
+        if code is not None:
+            return f'<code>{code}</code>'
+        if bold is not None:
+            return f'<strong>{_markup(bold)}</strong>'
+        if italic is not None:
+            return f'<em>{_markup(italic)}</em>'
+        if not _safe_url(url):
+            return _markup(label)
+        return f'<a href="{url}">{_markup(label)}</a>'
+    # Marp renders single newlines as line breaks
+    return INLINE_PATTERN.sub(replace, escaped).replace('\n', '<br>')
+
+
+def _paragraphs(text):
+    return ''.join(f'<p>{_inline(p)}</p>' for p in PARAGRAPH_BREAK.split(text.strip()) if p.strip())
+
+
+def _image_url(image_path):
+    # Stored paths are relative to the site root; the fragment may be loaded from /api/...
+    if image_path.startswith(('/', 'http://', 'https://', 'data:')):
+        return image_path
+    return '/' + image_path
+
+
+def _image(image_path):
+    return f'<p><img src="{html.escape(_image_url(image_path))}" alt="Image"></p>'
+
+
+def _bullets(bullets):
+    return '<ul>' + ''.join(f'<li>{_inline(b)}</li>' for b in bullets) + '</ul>'
+
+
+def _render(slide, deck):
+    if slide.is_title:
+        out = [f'<h1>{_inline(deck.title)}</h1>']
+        if deck.week:
+            out.append(f'<h2>{_inline(deck.week)}</h2>')
+        if deck.date:
+            out.append(f'<p>{_inline(deck.date)}</p>')
+        return ['title'], out
+
+    slide_class = slide.slide_class
+    headline = slide.headline
+    is_quote_template = slide_class and 'quote' in slide_class
+    is_image_template = slide_class and ('image' in slide_class or slide_class == 'photo-centered')
+    is_text_only = slide_class and 'lines' in slide_class
+    out = []
+
+    if slide_class == 'closing':
+        if headline:
+            first, *rest = headline.split('\n')
+            out.append(f'<h1><span class="closing-name">{_inline(first)}</span>'
+                       + ''.join(f'<br>{_inline(line)}' for line in rest) + '</h1>')
+        if slide.paragraph:
+            out.append(_paragraphs(slide.paragraph))
+    elif is_quote_template:
+        if slide.quote:
+            citation = f'<p>{_inline(slide.quote_citation)}</p>' if slide.quote_citation else ''
+            out.append(f'<blockquote><p>{_inline(slide.quote)}</p>{citation}</blockquote>')
+    elif slide_class == 'photo-centered':
+        if headline:
+            out.append(f'<h1>{_inline(headline)}</h1>')
+        if slide.image_path:
+            out.append(_image(slide.image_path))
+    else:
+        if headline:
+            out.append(f'<h1>{_inline(headline)}</h1>')
+        if slide.paragraph:
+            out.append(_paragraphs(slide.paragraph))
+        bullets = [] if is_text_only else markdown_renderer.bullet_list(slide.bullets)
+        if bullets:
+            if slide_class and '2col' in slide_class:
+                midpoint = (len(bullets) + 1) // 2
+                out.append(f'<div>{_bullets(bullets[:midpoint])}</div><div>{_bullets(bullets[midpoint:])}</div>')
+            else:
+                out.append(_bullets(bullets))
+        if is_image_template and slide.image_path:
+            out.append(_image(slide.image_path))
+    return markdown_renderer.slide_classes(slide), out
+
+
+@functools.lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def render_fragment(slide, deck):
+    """Render a SlideRecord (placeholders already substituted) to (html, content hash)"""
+    classes, body = _render(slide, deck)
+    class_attr = f' class="{html.escape(" ".join(classes))}"' if classes else ''
+    fragment = f'<section{class_attr}>{"".join(body)}</section>'
+    return fragment, hashlib.sha256(fragment.encode('utf-8')).hexdigest()[:32]
+
+
+def standalone_page(fragment):
+    """Wrap a fragment in a minimal page that loads the slide theme"""
+    return ('<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<link rel="stylesheet" href="{STYLESHEET_URL}"></head>'
+            f'<body>{fragment}</body></html>')
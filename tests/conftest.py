@@ -0,0 +1,67 @@
+"""Fixtures shared by several test modules."""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import zipfile
+
+import pytest
+from pptx import Presentation
+
+import marp_worker
+
+# app migrates DB_PATH when it is first imported; keep that out of the working directory
+_db_dir = tempfile.mkdtemp(prefix='presentations-test-')
+os.environ['PRESENTATIONS_DB'] = os.path.join(_db_dir, 'presentations.db')
+
+# Stands in for `marp --watch`: re-renders any .md newer than its .html and counts its own starts
+FAKE_MARP = textwrap.dedent('''
+    import os, sys, time
+    src, out, starts = sys.argv[1:4]
+    with open(starts, 'a') as f:
+        f.write('x')
+    while True:
+        for root, _, files in os.walk(src):
+            for name in files:
+                md = os.path.join(root, name)
+                html = os.path.join(out, os.path.relpath(md, src))[:-3] + '.html'
+                if not os.path.exists(html) or os.path.getmtime(html) < os.path.getmtime(md):
+                    os.makedirs(os.path.dirname(html), exist_ok=True)
+                    with open(md) as f, open(html, 'w') as g:
+                        g.write('<html>' + f.read() + '</html>')
+        time.sleep(0.01)
+''')
+
+
+@pytest.fixture
+def potx(tmp_path):
+    # python-pptx's default deck, relabelled as a template the way PowerPoint saves .potx files
+    buf = io.BytesIO()
+    Presentation().save(buf)
+    out = tmp_path / 'template.potx'
+    with zipfile.ZipFile(buf) as zin, zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
+            if item.filename == '[Content_Types].xml':
+                data = data.replace(b'presentationml.presentation.main', b'presentationml.template.main')
+            zout.writestr(item, data)
+    return out
+
+
+@pytest.fixture
+def fake_marp(tmp_path, monkeypatch):
+    script = tmp_path / 'fake_marp.py'
+    script.write_text(FAKE_MARP)
+    src, out, starts = tmp_path / 'src', tmp_path / 'out', tmp_path / 'starts'
+    monkeypatch.setattr(marp_worker, 'SOURCE_DIR', str(src))
+    monkeypatch.setattr(marp_worker, 'OUTPUT_DIR', str(out))
+    monkeypatch.setattr(marp_worker, 'LOG_PATH', str(tmp_path / 'marp.log'))
+    monkeypatch.setattr(marp_worker, 'command', lambda: [sys.executable, str(script), str(src), str(out), str(starts)])
+    yield starts
+    marp_worker.stop()
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_db_dir, ignore_errors=True)
@@ -1,6 +1,7 @@
 import sqlite3
 import app
 import os
+import pptx_builder
 
 
 def test_put_updates_topics(tmp_path):
@@ -134,7 +135,7 @@ def test_roundtrip_topic_update_and_export(tmp_path):
         processed_slides.append((slide_class, headline, paragraph, bullets, quote, quote_citation, image_path, is_title, hide_headline, larger_image, fullscreen, template_base))
 
     out = str(tmp_path / 'roundtrip.pptx')
-    success = app.build_pptx_from_slides(
+    success = pptx_builder.build_pptx_from_slides(
         slides_data=processed_slides,
         output_path=out,
         template_path='templates/4734_template.potx',
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+
+import asset_index
+import pptx_builder
+
+
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(asset_index, 'INDEX_PATH', str(tmp_path / 'index.db'))
+    os.makedirs('assets')
+    Image.new('RGB', (40, 20)).save('assets/wide.png')
+    frames = [Image.new('RGB', (8, 8), (80 * i, 0, 0)) for i in range(3)]
+    frames[0].save('assets/anim.gif', save_all=True, append_images=frames[1:])
+    return tmp_path
+
+
+def _count_decodes(monkeypatch):
+    # Image files opened by path (python-pptx itself reads the embedded blob from memory)
+    opened = []
+    real_open = Image.open
+
+    def counting_open(fp, *args, **kwargs):
+        if isinstance(fp, str):
+            opened.append(fp)
+        return real_open(fp, *args, **kwargs)
+    monkeypatch.setattr(Image, 'open', counting_open)
+    return opened
+
+
+def test_lookup_indexes_and_reuses_metadata(assets, monkeypatch):
+    info = asset_index.lookup('assets/wide.png')
+    assert (info.width, info.height, info.format, info.animated) == (40, 20, 'PNG', 0)
+    assert asset_index.lookup('assets/anim.gif').animated == 1
+    assert asset_index.lookup('assets/missing.png') is None
+
+    opened = _count_decodes(monkeypatch)
+    assert asset_index.lookup('assets/wide.png') == info
+    assert opened == []
+
+    # A changed file is rescanned
+    Image.new('RGB', (10, 30)).save('assets/wide.png')
+    stat = os.stat('assets/wide.png')
+    os.utime('assets/wide.png', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    changed = asset_index.lookup('assets/wide.png')
+    assert (changed.width, changed.height) == (10, 30)
+    assert changed.sha256 != info.sha256
+
+
+def test_refresh_is_incremental(assets):
+    assert asset_index.refresh() == 2
+    assert asset_index.refresh() == 0
+    os.remove('assets/anim.gif')
+    assert asset_index.refresh() == 0
+    rows = asset_index._connection().execute('SELECT path FROM assets').fetchall()
+    assert rows == [('assets/wide.png',)]
+
+
+def test_builder_does_not_decode_indexed_images(assets, monkeypatch):
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    asset_index.refresh()
+    opened = _count_decodes(monkeypatch)
+    pic, _ = pptx_builder.add_image_to_slide(slide, '/assets/wide.png')
+    assert opened == []
+    assert pic.width / pic.height == pytest.approx(2, rel=0.01)
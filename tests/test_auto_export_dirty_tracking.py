@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+import app
+import db
+
+
+@pytest.fixture
+def migrated_db(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'tracked.db')
+    conn = db.connect(db_path)
+    db.migrate(conn, app.MIGRATIONS, db_path)
+    conn.execute("INSERT INTO presentations (id, name) VALUES (1, 'Course')")
+    conn.execute("INSERT INTO presentations (id, name) VALUES (2, 'Other')")
+    conn.execute("INSERT INTO decks (id, presentation_id, week, date, order_index) VALUES (1, 1, 'Week 1', 'Jan 5', 0)")
+    conn.execute("INSERT INTO slides (id, deck_id, slide_class, headline, order_index) VALUES (1, 1, 'bullets', 'Hello', 0)")
+    conn.commit()
+    monkeypatch.setattr(app, 'DB_PATH', db_path)
+    monkeypatch.setattr(app, 'AUTO_EXPORT_DIR', str(tmp_path))
+    monkeypatch.setattr(app, '_auto_exports', {})
+    yield conn
+    conn.close()
+
+
+def test_triggers_bump_only_the_affected_presentation(migrated_db):
+    conn = migrated_db
+    before = app.presentation_version(conn, 1)
+    other = app.presentation_version(conn, 2)
+
+    conn.execute("UPDATE slides SET headline = 'Changed' WHERE id = 1")
+    conn.commit()
+    after = app.presentation_version(conn, 1)
+    assert after[0] > before[0]
+    assert app.presentation_version(conn, 2) == other
+
+    # Assignments are shared, so they bump the global counter seen by every presentation
+    conn.execute("INSERT INTO assignments (semester, name, due_date) VALUES ('SP26', 'HW1', '2026-02-01')")
+    conn.commit()
+    assert app.presentation_version(conn, 1)[1] > after[1]
+    assert app.presentation_version(conn, 2)[1] > other[1]
+
+
+def test_auto_export_skips_when_unchanged(migrated_db, tmp_path):
+    client = app.app.test_client()
+
+    first = client.post('/api/presentations/1/auto-export').get_json()
+    assert first['changed'] is True
+    assert first['generationMs'] >= 0
+    path = tmp_path / first['file']
+    assert '# Hello' in path.read_text()
+    mtime = os.stat(path).st_mtime_ns
+
+    second = client.post('/api/presentations/1/auto-export').get_json()
+    assert second['changed'] is False
+    assert os.stat(path).st_mtime_ns == mtime
+
+    with app.db.write_transaction(migrated_db, app.DB_PATH):
+        migrated_db.execute("UPDATE slides SET headline = 'Edited' WHERE id = 1")
+    third = client.post('/api/presentations/1/auto-export').get_json()
+    assert third['changed'] is True
+    assert '# Edited' in path.read_text()
+    # No temp files are left behind by the atomic write
+    assert [n for n in os.listdir(tmp_path) if 'Course' in n] == ['Course.md']
@@ -0,0 +1,46 @@
+import io
+import json
+import zipfile
+
+from pptx import Presentation
+
+import pptx_builder
+
+P14 = '{http://schemas.microsoft.com/office/powerpoint/2010/main}'
+LAYOUTS = {'bullets': 'Title and Content'}
+
+
+def _deck(week, count):
+    slides = [(None, f'{week} slide {i}', None, json.dumps(['One']), None, None, None,
+               False, False, False, False, 'bullets') for i in range(count)]
+    return {'slides': slides, 'deck_info': {'week': week, 'date': '1/21/26'}}
+
+
+def test_decks_build_into_one_package_with_sections(potx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    opened = []
+    real_open = pptx_builder.PreparedTemplate.open
+    monkeypatch.setattr(pptx_builder.PreparedTemplate, 'open', lambda self: opened.append(self) or real_open(self))
+
+    decks = (_deck(f'Week {n}', n) for n in (1, 2, 3))  # Consumed lazily
+    buf = io.BytesIO()
+    assert pptx_builder.build_pptx_from_decks(decks, buf, str(potx), LAYOUTS) == 6
+    assert len(opened) == 1
+
+    prs = Presentation(io.BytesIO(buf.getvalue()))
+    assert [s.shapes.title.text for s in prs.slides][:3] == ['Week 1 slide 0', 'Week 2 slide 0', 'Week 2 slide 1']
+    sections = prs.part._element.findall(f'.//{P14}section')
+    assert [s.get('name') for s in sections] == ['Week 1 1/21/26', 'Week 2 1/21/26', 'Week 3 1/21/26']
+    slide_ids = [s.slide_id for s in prs.slides]
+    assert [[int(i.get('id')) for i in s.iter(f'{P14}sldId')] for s in sections] == [
+        slide_ids[:1], slide_ids[1:3], slide_ids[3:]]
+
+
+def test_sections_can_be_left_out(potx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    buf = io.BytesIO()
+    pptx_builder.build_pptx_from_decks([_deck('Week 1', 2), _deck('Week 2', 1)], buf, str(potx), LAYOUTS,
+                                       sections=False)
+    with zipfile.ZipFile(io.BytesIO(buf.getvalue())) as zf:
+        assert b'sectionLst' not in zf.read('ppt/presentation.xml')
+        assert len([n for n in zf.namelist() if n.startswith('ppt/slides/slide')]) == 3
@@ -0,0 +1,89 @@
+import sqlite3
+import threading
+
+import pytest
+
+import app
+import db
+
+
+def test_connect_applies_pragmas(tmp_path):
+    conn = db.connect(str(tmp_path / 'pragmas.db'))
+    try:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+        assert conn.execute('PRAGMA foreign_keys').fetchone()[0] == 1
+        assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == db.BUSY_TIMEOUT_MS
+    finally:
+        conn.close()
+
+
+def test_write_transaction_rolls_back_on_error(tmp_path):
+    db_path = str(tmp_path / 'rollback.db')
+    conn = db.connect(db_path)
+    conn.execute('CREATE TABLE t (v INTEGER)')
+    conn.commit()
+
+    with pytest.raises(RuntimeError):
+        with db.write_transaction(conn, db_path):
+            conn.execute('INSERT INTO t (v) VALUES (1)')
+            raise RuntimeError('boom')
+
+    with db.write_transaction(conn, db_path):
+        conn.execute('INSERT INTO t (v) VALUES (2)')
+        # Nested use joins the outer transaction instead of failing on BEGIN
+        with db.write_transaction(conn, db_path):
+            conn.execute('INSERT INTO t (v) VALUES (3)')
+
+    assert [r[0] for r in conn.execute('SELECT v FROM t ORDER BY v')] == [2, 3]
+    conn.close()
+
+
+def test_concurrent_writers_and_reader_do_not_lock(tmp_path):
+    db_path = str(tmp_path / 'concurrent.db')
+    setup = db.connect(db_path)
+    setup.execute('CREATE TABLE t (v INTEGER)')
+    setup.commit()
+    setup.close()
+
+    errors = []
+
+    def writer(n):
+        conn = db.connect(db_path)
+        try:
+            for i in range(50):
+                with db.write_transaction(conn, db_path):
+                    conn.execute('INSERT INTO t (v) VALUES (?)', (n * 1000 + i,))
+        except sqlite3.OperationalError as e:
+            errors.append(e)
+        finally:
+            conn.close()
+
+    # A reader holding an open read transaction must not block the writers under WAL
+    reader = db.connect(db_path)
+    reader.execute('BEGIN')
+    reader.execute('SELECT COUNT(*) FROM t').fetchone()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    reader.rollback()
+
+    assert not errors
+    assert reader.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 200
+    reader.close()
+
+
+def test_request_connection_is_reused_and_closed(tmp_path, monkeypatch):
+    db_path = tmp_path / 'request.db'
+    sqlite3.connect(str(db_path)).close()
+    monkeypatch.setattr(app, 'DB_PATH', str(db_path))
+
+    with app.app.app_context():
+        first = app.get_db()
+        assert app.get_db() is first
+    # Teardown closes the request connection
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.execute('SELECT 1')
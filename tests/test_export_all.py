@@ -0,0 +1,104 @@
+import io
+import os
+import sqlite3
+import zipfile
+
+import pytest
+from pptx import Presentation
+
+import app
+import export_cache
+import export_jobs
+from scripts import export_semester
+
+
+@pytest.fixture
+def semester_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    db_path = tmp_path / 'semester.db'
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript('''
+        CREATE TABLE presentations (id INTEGER PRIMARY KEY, name TEXT, front_matter TEXT);
+        CREATE TABLE decks (id INTEGER PRIMARY KEY, presentation_id INTEGER, week TEXT, date TEXT,
+                            topic1 TEXT, topic2 TEXT, order_index INTEGER);
+        CREATE TABLE slides (id INTEGER PRIMARY KEY, deck_id INTEGER, slide_class TEXT, headline TEXT,
+                             paragraph TEXT, bullets TEXT, quote TEXT, quote_citation TEXT, image_path TEXT,
+                             is_title INTEGER, hide_headline INTEGER, larger_image INTEGER, fullscreen INTEGER,
+                             template_base TEXT, order_index INTEGER);
+        INSERT INTO presentations (id, name) VALUES (1, 'Spring 2026');
+    ''')
+    # Insert decks out of order to check the archive follows order_index
+    for deck_id, order_index in [(1, 2), (2, 0), (3, 1)]:
+        conn.execute('INSERT INTO decks (id, presentation_id, week, date, order_index) VALUES (?, 1, ?, ?, ?)',
+                     (deck_id, str(deck_id), 'Feb 2', order_index))
+        conn.execute("INSERT INTO slides (deck_id, slide_class, headline, bullets, order_index) VALUES (?, 'bullets', ?, '[]', 0)",
+                     (deck_id, f'Deck {deck_id}'))
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(app, 'DB_PATH', str(db_path))
+
+    def fake_build(slides_data, output_path, template_path, pptx_layouts_map, deck_info=None, downscale_images=True):
+        if slides_data[0][1] == 'Deck 3':
+            raise RuntimeError('broken deck')
+        with open(output_path, 'wb') as f:
+            f.write(f'PK {slides_data[0][1]}'.encode())
+        return True
+
+    monkeypatch.setattr(export_jobs, 'build_pptx_from_slides', fake_build)
+    return db_path
+
+
+def test_export_all_streams_zip_in_deck_order(semester_db):
+    client = app.app.test_client()
+    response = client.get('/api/presentations/1/export-all?format=pptx')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+    assert 'Spring_2026_pptx.zip' in response.headers['Content-Disposition']
+
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    decks = sorted(n for n in archive.namelist() if n != 'errors.txt')
+    assert decks == ['01_Week_2_Feb_2.pptx', '03_Week_1_Feb_2.pptx']
+    assert archive.read('01_Week_2_Feb_2.pptx') == b'PK Deck 2'
+    assert 'broken deck' in archive.read('errors.txt').decode()
+
+    assert client.get('/api/presentations/99/export-all').status_code == 404
+
+
+def test_cli_writes_zip(semester_db, tmp_path, monkeypatch):
+    monkeypatch.delenv('PRESENTATIONS_DB', raising=False)  # Restored after main() sets it
+    output = tmp_path / 'semester.zip'
+    code = export_semester.main(['--presentation', '1', '--db', str(semester_db), '--output', str(output)])
+    assert code == 1  # One deck failed
+    assert len(zipfile.ZipFile(str(output)).namelist()) == 3
+
+
+def test_export_pptx_builds_one_sectioned_package(semester_db, potx, monkeypatch):
+    monkeypatch.setattr(app, 'PPTX_TEMPLATE_PATH', str(potx))
+    client = app.app.test_client()
+    response = client.get('/api/presentations/1/export-pptx')
+    assert response.status_code == 200
+    assert 'Spring_2026.pptx' in response.headers['Content-Disposition']
+
+    prs = Presentation(io.BytesIO(response.data))
+    assert len(prs.slides) == 3
+    sections = prs.part._element.findall('.//{http://schemas.microsoft.com/office/powerpoint/2010/main}section')
+    assert [s.get('name') for s in sections] == ['2 Feb 2', '3 Feb 2', '1 Feb 2']  # Deck order
+
+    assert client.get('/api/presentations/1/export-pptx', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client.get('/api/presentations/99/export-pptx').status_code == 404
+
+
+def test_cli_migrates_the_database_it_is_given(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app, 'DB_PATH', app.DB_PATH)
+    monkeypatch.delenv('PRESENTATIONS_DB', raising=False)
+    monkeypatch.setattr(export_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    db_path = tmp_path / 'other.db'
+    sqlite3.connect(str(db_path)).close()  # Empty, never migrated
+
+    code = export_semester.main(['--presentation', '1', '--db', str(db_path), '--output', str(tmp_path / 'out.zip')])
+    assert code == 2  # Presentation 1 does not exist
+    conn = sqlite3.connect(str(db_path))
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == len(app.MIGRATIONS)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'slides'").fetchone()
+    assert not os.path.exists('presentations.db')
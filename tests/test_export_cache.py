@@ -0,0 +1,226 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import app
+import export_cache
+import export_jobs
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / 'cache'
+    monkeypatch.setattr(export_cache, 'CACHE_DIR', str(path))
+    return path
+
+
+def _rows(image=None):
+    return [('bullets', 'Headline', '', '["a"]', '', '', image, 0, 0, 0, 0, 'bullets')]
+
+
+def test_key_tracks_slide_content_and_image_bytes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('assets')
+    with open('assets/pic.png', 'wb') as f:
+        f.write(b'one')
+
+    key = export_cache.export_key('pptx', _rows('/assets/pic.png'), {'week': '1'})
+    assert key == export_cache.export_key('pptx', _rows('/assets/pic.png'), {'week': '1'})
+    assert key != export_cache.export_key('pdf', _rows('/assets/pic.png'), {'week': '1'})
+    assert key != export_cache.export_key('pptx', _rows('/assets/pic.png'), {'week': '2'})
+
+    # Same path, new bytes: the key must change
+    time.sleep(0.01)
+    with open('assets/pic.png', 'wb') as f:
+        f.write(b'two!')
+    assert key != export_cache.export_key('pptx', _rows('/assets/pic.png'), {'week': '1'})
+
+
+def test_file_digest_keeps_one_entry_per_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_cache, '_file_digests', {})
+    theme = tmp_path / 'theme.css'
+    digests = set()
+    for i in range(3):
+        theme.write_text('a' * (i + 1))  # A new size each time, so the change is seen whatever the mtime
+        digests.add(export_cache.file_digest(str(theme)))
+        assert export_cache.file_digest(str(theme)) in digests
+    assert len(digests) == 3
+    assert list(export_cache._file_digests) == [str(theme)]
+
+
+def test_concurrent_requests_build_once(cache_dir):
+    builds = []
+    started = threading.Barrier(4)
+
+    def build(path):
+        builds.append(path)
+        time.sleep(0.05)
+        with open(path, 'wb') as f:
+            f.write(b'pptx')
+
+    results = []
+
+    def worker():
+        started.wait()
+        results.append(export_cache.get_or_build('k1', 'pptx', build))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(builds) == 1
+    assert set(results) == {export_cache.cache_path('k1', 'pptx')}
+    assert os.listdir(cache_dir) == ['k1.pptx']
+
+
+def test_failed_build_leaves_no_entry(cache_dir):
+    def build(path):
+        with open(path, 'wb') as f:
+            f.write(b'partial')
+        raise RuntimeError('Conversion failed: boom')
+
+    with pytest.raises(RuntimeError):
+        export_cache.get_or_build('bad', 'pdf', build)
+    assert os.listdir(cache_dir) == []
+
+
+def test_evict_removes_least_recently_used(cache_dir):
+    os.makedirs(cache_dir)
+    now = time.time()
+    for i, name in enumerate(['old.pptx', 'mid.pptx', 'new.pptx']):
+        path = cache_dir / name
+        path.write_bytes(b'x' * 100)
+        os.utime(path, (now - 100 + i, now - 100 + i))
+
+    removed = export_cache.evict(max_bytes=150, keep=[str(cache_dir / 'mid.pptx')])
+    assert [os.path.basename(p) for p in removed] == ['old.pptx', 'new.pptx']
+    assert os.listdir(cache_dir) == ['mid.pptx']
+
+
+def test_deck_export_is_served_from_cache(tmp_path, cache_dir, monkeypatch):
+    db_path = tmp_path / 'export.db'
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript('''
+        CREATE TABLE presentations (id INTEGER PRIMARY KEY, name TEXT, front_matter TEXT);
+        CREATE TABLE decks (id INTEGER PRIMARY KEY, presentation_id INTEGER, week TEXT, date TEXT,
+                            topic1 TEXT, topic2 TEXT, order_index INTEGER);
+        CREATE TABLE slides (id INTEGER PRIMARY KEY, deck_id INTEGER, slide_class TEXT, headline TEXT,
+                             paragraph TEXT, bullets TEXT, quote TEXT, quote_citation TEXT, image_path TEXT,
+                             is_title INTEGER, hide_headline INTEGER, larger_image INTEGER, fullscreen INTEGER,
+                             template_base TEXT, order_index INTEGER);
+        INSERT INTO presentations (id, name) VALUES (1, 'Course');
+        INSERT INTO decks (id, presentation_id, week, date, order_index) VALUES (1, 1, '3', 'Feb 2', 0);
+        INSERT INTO slides (deck_id, slide_class, headline, bullets, order_index) VALUES (1, 'bullets', 'Hi', '[]', 0);
+    ''')
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(app, 'DB_PATH', str(db_path))
+
+    builds = []
+
+    def fake_build(slides_data, output_path, template_path, pptx_layouts_map, deck_info=None, downscale_images=True):
+        builds.append(output_path)
+        output_path.write(b'PK fake pptx')  # Deck downloads build into a buffer
+        return True
+
+    monkeypatch.setattr(export_jobs, 'build_pptx_from_slides', fake_build)
+    client = app.app.test_client()
+
+    first = client.get('/api/decks/1/export?format=pptx')
+    second = client.get('/api/decks/1/export?format=pptx')
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data == b'PK fake pptx'
+    assert first.content_length == len(b'PK fake pptx')
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert len(builds) == 1
+
+    # Revalidation is answered without sending the file again
+    cached = client.get('/api/decks/1/export?format=pptx', headers={'If-None-Match': first.headers['ETag']})
+    assert cached.status_code == 304
+    assert len(builds) == 1
+
+    # Editing the deck invalidates the cached export
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("UPDATE slides SET headline = 'Changed'")
+    conn.commit()
+    conn.close()
+    assert client.get('/api/decks/1/export?format=pptx').status_code == 200
+    assert len(builds) == 2
+
+
+def test_fetch_streams_without_keeping_oversized_exports(cache_dir, monkeypatch):
+    builds = []
+
+    def build(f):
+        builds.append(f)
+        f.write(b'x' * 100)
+
+    monkeypatch.setattr(export_cache, 'MAX_ENTRY_BYTES', 50)
+    export_file, size = export_cache.fetch('big', 'pptx', build)
+    with export_file:
+        assert (export_file.read(), size) == (b'x' * 100, 100)
+    assert not os.path.exists(export_cache.cache_path('big', 'pptx'))
+
+    monkeypatch.setattr(export_cache, 'MAX_ENTRY_BYTES', 1000)
+    export_cache.fetch('big', 'pptx', build)[0].close()
+    export_file, size = export_cache.fetch('big', 'pptx', build)
+    with export_file:
+        assert export_file.name == export_cache.cache_path('big', 'pptx')
+    assert len(builds) == 2
+    assert os.listdir(cache_dir) == ['big.pptx']
+
+
+def _concurrently(n, fn):
+    started = threading.Barrier(n)
+    results, errors = [], []
+
+    def worker():
+        started.wait()
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_waiters_share_an_oversized_build(cache_dir, monkeypatch):
+    builds = []
+
+    def build(f):
+        builds.append(f)
+        time.sleep(0.1)
+        f.write(b'x' * 100)
+
+    monkeypatch.setattr(export_cache, 'MAX_ENTRY_BYTES', 50)
+    results, errors = _concurrently(4, lambda: export_cache.fetch('big', 'pptx', build))
+    assert errors == [] and len(builds) == 1
+    for export_file, size in results:
+        with export_file:
+            assert (export_file.read(), size) == (b'x' * 100, 100)
+    assert os.listdir(cache_dir) == []  # The shared copy is gone once everyone has it
+    assert export_cache._flights == {}
+
+
+def test_waiters_share_a_failed_build(cache_dir):
+    builds = []
+
+    def build(f):
+        builds.append(f)
+        time.sleep(0.1)
+        raise RuntimeError('boom')
+
+    results, errors = _concurrently(3, lambda: export_cache.fetch('bad', 'pptx', build))
+    assert len(builds) == 1 and len(errors) == 3
+    assert all('boom' in str(e) for e in errors)
+    assert export_cache._flights == {}
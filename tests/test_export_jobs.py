@@ -0,0 +1,153 @@
+import sqlite3
+import subprocess
+import threading
+import time
+
+import pytest
+
+import app
+import export_cache
+import export_jobs
+
+
+@pytest.fixture
+def deck_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    db_path = tmp_path / 'jobs.db'
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript('''
+        CREATE TABLE presentations (id INTEGER PRIMARY KEY, name TEXT, front_matter TEXT);
+        CREATE TABLE decks (id INTEGER PRIMARY KEY, presentation_id INTEGER, week TEXT, date TEXT,
+                            topic1 TEXT, topic2 TEXT, order_index INTEGER);
+        CREATE TABLE slides (id INTEGER PRIMARY KEY, deck_id INTEGER, slide_class TEXT, headline TEXT,
+                             paragraph TEXT, bullets TEXT, quote TEXT, quote_citation TEXT, image_path TEXT,
+                             is_title INTEGER, hide_headline INTEGER, larger_image INTEGER, fullscreen INTEGER,
+                             template_base TEXT, order_index INTEGER);
+        INSERT INTO presentations (id, name) VALUES (1, 'Course');
+    ''')
+    for deck_id in range(1, 4):
+        conn.execute('INSERT INTO decks (id, presentation_id, week, date, order_index) VALUES (?, 1, ?, ?, ?)',
+                     (deck_id, str(deck_id), 'Feb 2', deck_id))
+        conn.execute("INSERT INTO slides (deck_id, slide_class, headline, bullets, order_index) VALUES (?, 'bullets', ?, '[]', 0)",
+                     (deck_id, f'Deck {deck_id}'))
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(app, 'DB_PATH', str(db_path))
+    return db_path
+
+
+def _fake_builder(delay):
+    def fake_build(slides_data, output_path, template_path, pptx_layouts_map, deck_info=None, downscale_images=True):
+        time.sleep(delay)
+        with open(output_path, 'wb') as f:
+            f.write(f'PK {slides_data[0][1]}'.encode())
+        return True
+    return fake_build
+
+
+def _wait(client, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = client.get(f'/api/export-jobs/{job_id}').get_json()
+        if info['status'] in ('done', 'failed'):
+            return info
+        time.sleep(0.02)
+    raise AssertionError('export job did not finish')
+
+
+def test_job_runs_in_background_and_serves_result(deck_db, monkeypatch):
+    monkeypatch.setattr(export_jobs, 'build_pptx_from_slides', _fake_builder(0.2))
+    client = app.app.test_client()
+
+    response = client.post('/api/decks/1/export-jobs?format=pptx')
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status'] in ('queued', 'running')
+
+    info = _wait(client, job['id'])
+    assert info['status'] == 'done', info
+    download = client.get(info['downloadUrl'])
+    assert download.status_code == 200
+    assert download.data == b'PK Deck 1'
+
+    assert client.get('/api/export-jobs/nope').status_code == 404
+    assert client.post('/api/decks/99/export-jobs?format=pptx').status_code == 404
+
+
+def test_job_is_killed_after_timeout(deck_db, monkeypatch):
+    monkeypatch.setattr(export_jobs, 'build_pptx_from_slides', _fake_builder(30))
+    monkeypatch.setitem(export_jobs.FORMAT_TIMEOUTS, 'pptx', 0.3)
+    client = app.app.test_client()
+
+    job_id = client.post('/api/decks/2/export-jobs?format=pptx').get_json()['id']
+    info = _wait(client, job_id)
+    assert info['status'] == 'failed'
+    assert 'timed out' in info['error']
+    assert client.get(f'/api/export-jobs/{job_id}?download=1').status_code == 409
+
+
+def _alive(pid):
+    # Orphans may linger as zombies until init reaps them; those are not running
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+def test_timeout_kills_processes_started_by_the_build(deck_db, tmp_path, monkeypatch):
+    pid_file = tmp_path / 'grandchild.pid'
+
+    def hanging_build(*args, **kwargs):
+        proc = subprocess.Popen('sleep 30', shell=True)  # Like the Marp/soffice shells
+        pid_file.write_text(str(proc.pid))
+        proc.wait()
+    monkeypatch.setattr(export_jobs, 'build_pptx_from_slides', hanging_build)
+    monkeypatch.setitem(export_jobs.FORMAT_TIMEOUTS, 'pptx', 0.5)
+    client = app.app.test_client()
+
+    job_id = client.post('/api/decks/3/export-jobs?format=pptx').get_json()['id']
+    assert 'timed out' in _wait(client, job_id)['error']
+    pid = int(pid_file.read_text())
+    deadline = time.time() + 5
+    while _alive(pid) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not _alive(pid)
+
+
+def test_full_queue_turns_jobs_away(deck_db, monkeypatch):
+    monkeypatch.setattr(export_jobs, 'build_pptx_from_slides', _fake_builder(0.3))
+    monkeypatch.setattr(export_jobs, 'MAX_QUEUED_JOBS', 1)
+    client = app.app.test_client()
+
+    job_id = client.post('/api/decks/1/export-jobs?format=pptx').get_json()['id']
+    response = client.post('/api/decks/2/export-jobs?format=pptx')
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+    assert _wait(client, job_id)['status'] == 'done'
+    assert client.post('/api/decks/2/export-jobs?format=pptx').status_code == 202
+
+
+def test_per_format_limit_serializes_builds(deck_db, monkeypatch):
+    monkeypatch.setattr(export_jobs, 'build_pptx_from_slides', _fake_builder(0.2))
+    monkeypatch.setitem(export_jobs._format_slots, 'pptx', threading.BoundedSemaphore(1))
+    client = app.app.test_client()
+
+    job_ids = [client.post(f'/api/decks/{d}/export-jobs?format=pptx').get_json()['id'] for d in (1, 2, 3)]
+    for job_id in job_ids:
+        assert _wait(client, job_id)['status'] == 'done'
+
+    spans = sorted((export_jobs.get(j)['startedAt'], export_jobs.get(j)['finishedAt']) for j in job_ids)
+    for (_, first_end), (second_start, _) in zip(spans, spans[1:]):
+        assert second_start >= first_end - 0.05
+
+
+def test_synchronous_command_timeout_kills_what_it_started(tmp_path):
+    pid_file = tmp_path / 'grandchild.pid'
+    with pytest.raises(subprocess.TimeoutExpired):
+        export_jobs._run_command(f'sleep 30 & echo $! > "{pid_file}"; wait', 0.5)
+    pid = int(pid_file.read_text())
+    deadline = time.time() + 5
+    while _alive(pid) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not _alive(pid)
@@ -0,0 +1,90 @@
+import io
+import json
+import os
+import zipfile
+
+from PIL import Image
+
+import asset_index
+import image_renditions
+import pptx_builder
+
+LAYOUTS = {'bullets-image': 'Picture with Caption', 'photo-centered': 'Blank'}
+
+
+def _slide(template, image_path):
+    return (None, 'Headline', None, json.dumps(['One']), None, None, image_path,
+            False, True, False, False, template)
+
+
+def _media(buf):
+    with zipfile.ZipFile(io.BytesIO(buf.getvalue())) as zf:
+        return sorted(zf.read(name) for name in zf.namelist() if name.startswith('ppt/media/'))
+
+
+def _build(slides, potx):
+    buf = io.BytesIO()
+    pptx_builder.build_pptx_from_slides(slides, buf, str(potx), LAYOUTS)
+    return buf
+
+
+def _track_rendition_builds(monkeypatch):
+    # Records, for each rendition built, whether it was built by prefetch_images
+    built_in_prefetch = []
+    real_build = image_renditions._build
+    real_prefetch = pptx_builder.prefetch_images
+    in_prefetch = []
+
+    def tracking_build(*args):
+        built_in_prefetch.append(bool(in_prefetch))
+        return real_build(*args)
+
+    def tracking_prefetch(*args):
+        in_prefetch.append(True)
+        try:
+            real_prefetch(*args)
+        finally:
+            in_prefetch.clear()
+    monkeypatch.setattr(image_renditions, '_build', tracking_build)
+    monkeypatch.setattr(pptx_builder, 'prefetch_images', tracking_prefetch)
+    return built_in_prefetch
+
+
+def test_images_are_prepared_before_slides_are_built(potx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(asset_index, 'INDEX_PATH', str(tmp_path / 'index.db'))
+    monkeypatch.setattr(image_renditions, 'RENDITION_DIR', str(tmp_path / 'renditions'))
+    os.makedirs('assets')
+    for i in range(3):
+        Image.effect_noise((1600, 1000), 64).convert('RGB').save(f'assets/photo{i}.jpg', quality=95)
+    slides = [_slide('bullets-image', f'/assets/photo{i}.jpg') for i in range(3)]
+    slides += [_slide('photo-centered', 'photo0.jpg'), _slide('bullets-image', 'missing.jpg')]
+
+    # Reference build without the prefetch stage
+    monkeypatch.setattr(pptx_builder, 'prefetch_images', lambda *args: None)
+    expected = _media(_build(slides, potx))
+    monkeypatch.undo()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(asset_index, 'INDEX_PATH', str(tmp_path / 'index2.db'))
+    monkeypatch.setattr(image_renditions, 'RENDITION_DIR', str(tmp_path / 'renditions2'))
+
+    # Renditions are only ever built by the prefetch stage, never while populating slides
+    built_in_prefetch = _track_rendition_builds(monkeypatch)
+    assert _media(_build(slides, potx)) == expected
+    assert built_in_prefetch == [True] * 3  # one per photo; the full-slide one needs no downscaling
+
+
+def test_prefetch_sizes_images_for_an_empty_body_placeholder(potx, tmp_path, monkeypatch):
+    # Without a picture placeholder the image goes into the empty second column, not the whole slide
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(asset_index, 'INDEX_PATH', str(tmp_path / 'index.db'))
+    monkeypatch.setattr(image_renditions, 'RENDITION_DIR', str(tmp_path / 'renditions'))
+    os.makedirs('assets')
+    Image.effect_noise((1600, 1000), 64).convert('RGB').save('assets/photo.jpg', quality=95)
+    built_in_prefetch = _track_rendition_builds(monkeypatch)
+
+    buf = io.BytesIO()
+    pptx_builder.build_pptx_from_slides([_slide('bullets-image', 'photo.jpg')], buf, str(potx),
+                                        {'bullets-image': 'Two Content'})
+    assert built_in_prefetch == [True]
+    assert len(_media(buf)) == 1
@@ -0,0 +1,104 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches
+
+import asset_index
+import image_renditions
+import pptx_builder
+
+
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(asset_index, 'INDEX_PATH', str(tmp_path / 'index.db'))
+    monkeypatch.setattr(image_renditions, 'RENDITION_DIR', str(tmp_path / 'renditions'))
+    os.makedirs('assets')
+    # Noisy so that compression cannot hide the resolution
+    Image.effect_noise((1500, 1000), 64).convert('RGB').save('assets/photo.jpg', quality=95)
+    logo = Image.new('RGBA', (1000, 1000), (0, 0, 0, 0))
+    logo.paste((200, 0, 0, 255), (250, 250, 750, 750))
+    logo.save('assets/logo.png')
+    Image.effect_noise((800, 800), 64).convert('RGBA').save('assets/opaque.png')
+    return tmp_path
+
+
+def _rendition(path, inches):
+    info = asset_index.lookup(path)
+    return image_renditions.rendition(path, info, Inches(inches), Inches(inches * 2 / 3))
+
+
+def test_rendition_matches_placed_size(assets):
+    path = _rendition('assets/photo.jpg', 2)
+    assert path != 'assets/photo.jpg'
+    with Image.open(path) as img:
+        assert img.size == (300, 200)  # 2in x 1.33in at 150 DPI
+    assert os.path.getsize(path) < os.path.getsize('assets/photo.jpg')
+
+    # Cached on source hash + size (a rebuild would replace the file)
+    inode = os.stat(path).st_ino
+    assert _rendition('assets/photo.jpg', 2) == path
+    assert os.stat(path).st_ino == inode
+
+    # Never upscaled
+    assert _rendition('assets/photo.jpg', 20) == 'assets/photo.jpg'
+
+
+def test_transparency_is_kept_and_opaque_alpha_flattened(assets):
+    with Image.open(_rendition('assets/logo.png', 2)) as img:
+        assert img.format == 'PNG' and img.mode == 'RGBA'
+    with Image.open(_rendition('assets/opaque.png', 2)) as img:
+        assert img.format == 'JPEG' and img.mode == 'RGB'
+
+
+def test_least_recently_used_renditions_are_evicted(assets, monkeypatch):
+    first = _rendition('assets/photo.jpg', 2)
+    second = _rendition('assets/photo.jpg', 3)
+    os.utime(first, (1, 1))
+    os.utime(second, (2, 2))
+    _rendition('assets/photo.jpg', 2)  # Reuse marks it as recently used
+
+    # Room for the two renditions already built, so a third (smaller) one pushes one out
+    monkeypatch.setattr(image_renditions, 'MAX_BYTES', os.path.getsize(first) + os.path.getsize(second))
+    third = _rendition('assets/opaque.png', 1)
+    assert os.path.exists(third)
+    assert not os.path.exists(second)
+    assert sorted(os.listdir(image_renditions.RENDITION_DIR)) == sorted(
+        os.path.basename(p) for p in (first, third))
+
+
+def _embedded_bytes(downscale_images):
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[8])  # Picture with Caption
+    pptx_builder.add_image_to_slide(slide, 'photo.jpg', downscale_images=downscale_images)
+    buf = io.BytesIO()
+    prs.save(buf)
+    return len(buf.getvalue())
+
+
+def test_builder_embeds_rendition_unless_disabled(assets):
+    assert _embedded_bytes(True) < _embedded_bytes(False) / 2
+
+
+def test_large_gif_fallback_is_converted_once(assets, monkeypatch):
+    frames = [Image.new('RGB', (64, 48), (80 * i, 0, 0)) for i in range(3)]
+    frames[0].save('assets/anim.gif', save_all=True, append_images=frames[1:])
+    monkeypatch.setattr(pptx_builder, 'GIF_FALLBACK_THRESHOLD', 10)
+    opened = []
+    real_open = Image.open
+    monkeypatch.setattr(Image, 'open', lambda fp, *a, **k: opened.append(fp) or real_open(fp, *a, **k))
+
+    for _ in range(2):
+        opened.clear()
+        prs = Presentation()
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        pic, _ = pptx_builder.add_image_to_slide(slide, 'anim.gif')
+        assert pic.image.content_type == 'image/png'
+        assert pic.width / pic.height == pytest.approx(64 / 48, rel=0.01)
+
+    # The second export reuses the cached PNG without decoding the GIF again
+    assert 'assets/anim.gif' not in opened
+    assert [n for n in os.listdir(image_renditions.RENDITION_DIR) if n.endswith('_frame0.png')]
@@ -0,0 +1,36 @@
+from pptx import Presentation
+from pptx.util import Inches
+
+import pptx_builder
+from pptx_builder import InlineRun
+
+
+def test_inline_runs_nest_formatting():
+    assert pptx_builder.inline_runs('a **bold *both* `code`** b') == (
+        InlineRun('a '),
+        InlineRun('bold ', bold=True),
+        InlineRun('both', bold=True, italic=True),
+        InlineRun(' ', bold=True),
+        InlineRun('code', bold=True, code=True),
+        InlineRun(' b'),
+    )
+    assert pptx_builder.inline_runs('see [the *docs*](https://example.com)') == (
+        InlineRun('see '),
+        InlineRun('the ', link='https://example.com'),
+        InlineRun('docs', italic=True, link='https://example.com'),
+    )
+    # Unpaired markers stay literal
+    assert pptx_builder.inline_runs('5 * 3 = `x') == (InlineRun('5 * 3 = `x'),)
+
+
+def test_paragraph_runs_are_memoized():
+    pptx_builder.inline_runs.cache_clear()
+    prs = Presentation()
+    tf = prs.slides.add_slide(prs.slide_layouts[6]).shapes.add_textbox(0, 0, Inches(4), Inches(1)).text_frame
+    for _ in range(3):
+        pptx_builder.parse_markdown_to_paragraph(tf.add_paragraph(), '**Due** [today](https://example.com)')
+    assert pptx_builder.inline_runs.cache_info().hits == 2
+
+    runs = tf.paragraphs[-1].runs
+    assert [r.text for r in runs] == ['Due', ' ', 'today']
+    assert runs[0].font.bold and runs[2].hyperlink.address == 'https://example.com'
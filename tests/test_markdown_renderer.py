@@ -0,0 +1,66 @@
+import json
+import sqlite3
+
+import app
+import markdown_renderer
+from markdown_renderer import DeckContext, SlideRecord
+
+
+def test_marp_and_pdf_styles():
+    deck = DeckContext('Course', 'Week 2', 'Jan 12')
+    slide = SlideRecord('bullets-image-top', '', 'Intro', json.dumps(['a', ' ', 'b']), None, None, '/assets/pic.png')
+
+    marp = markdown_renderer.render_slide(slide, deck)
+    assert marp.startswith('<!-- _class: bullets-image-top hide-headline -->\n')
+    assert '- a\n-  \n- b\n' in marp  # Kept as-is in the editor markdown
+    assert '![Image](/assets/pic.png)' in marp
+
+    pdf = markdown_renderer.render_slide(slide, deck, 'pdf')
+    assert pdf.startswith('<!-- _class: bullets-image-top -->\n')
+    assert '- a\n- b\n' in pdf  # Blank bullets are dropped for PDF
+    assert '![Image](../assets/pic.png)' in pdf
+
+    title = SlideRecord(None, None, None, None, None, None, None, is_title=1)
+    assert '# Course\n## Week 2\nJan 12\n' in markdown_renderer.render_slide(title, deck)
+    assert '# Journalism Innovation\n' in markdown_renderer.render_slide(title, deck, 'pdf')
+
+
+def test_two_column_bullets_are_split():
+    slide = SlideRecord('bullets-2col', 'H', None, json.dumps(['1', '2', '3']), None, None, None)
+    chunk = markdown_renderer.render_slide(slide, DeckContext('Course'))
+    assert '<div>\n\n- 1\n- 2\n\n</div>\n<div>\n\n- 3\n\n</div>\n' in chunk
+
+
+def test_only_changed_slides_are_rerendered(tmp_path, monkeypatch):
+    db_path = tmp_path / 'render.db'
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript('''
+        CREATE TABLE presentations (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE decks (id INTEGER PRIMARY KEY, presentation_id INTEGER, week TEXT, date TEXT, order_index INTEGER);
+        CREATE TABLE slides (id INTEGER PRIMARY KEY, deck_id INTEGER, slide_class TEXT, headline TEXT, paragraph TEXT,
+                             bullets TEXT, quote TEXT, quote_citation TEXT, image_path TEXT, is_title INTEGER,
+                             hide_headline INTEGER, larger_image INTEGER, fullscreen INTEGER, order_index INTEGER);
+        INSERT INTO presentations (id, name) VALUES (1, 'Course');
+    ''')
+    for deck_id in (1, 2, 3):
+        conn.execute("INSERT INTO decks VALUES (?, 1, ?, 'Jan 5', ?)", (deck_id, f'Week {deck_id}', deck_id))
+        for i in range(10):
+            conn.execute('''INSERT INTO slides (deck_id, slide_class, headline, bullets, is_title, order_index)
+                            VALUES (?, 'bullets', ?, '["x"]', ?, ?)''', (deck_id, f'Slide {deck_id}.{i}', int(i == 0), i))
+    conn.commit()
+    monkeypatch.setattr(app, 'DB_PATH', str(db_path))
+
+    markdown_renderer.render_slide.cache_clear()
+    first, _ = app.generate_presentation_markdown(1)
+    assert markdown_renderer.render_slide.cache_info().misses == 30
+
+    second, _ = app.generate_presentation_markdown(1)
+    assert second == first
+    assert markdown_renderer.render_slide.cache_info().misses == 30
+
+    conn.execute("UPDATE slides SET headline = 'Edited' WHERE deck_id = 2 AND order_index = 3")
+    conn.commit()
+    conn.close()
+    third, _ = app.generate_presentation_markdown(1)
+    assert '# Edited\n' in third
+    assert markdown_renderer.render_slide.cache_info().misses == 31
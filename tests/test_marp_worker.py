@@ -0,0 +1,104 @@
+import os
+import shutil
+import subprocess
+import textwrap
+import threading
+import time
+
+import pytest
+
+import markdown_renderer
+import marp_worker
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_worker_is_reused_and_skips_unchanged_markdown(fake_marp):
+    path = marp_worker.render('presentation', '# One', timeout=10)
+    assert open(path).read() == '<html># One</html>'
+    mtime = os.stat(path).st_mtime_ns
+
+    assert marp_worker.render('presentation', '# One', timeout=10) == path
+    assert os.stat(path).st_mtime_ns == mtime
+
+    marp_worker.render('presentation', '# Two', timeout=10)
+    assert open(path).read() == '<html># Two</html>'
+    assert fake_marp.read_text() == 'x'  # Started once
+
+
+def test_worker_is_restarted_after_exit(fake_marp):
+    marp_worker.render('presentation', '# One', timeout=10)
+    marp_worker.stop()
+    marp_worker.render('presentation', '# Two', timeout=10)
+    assert fake_marp.read_text() == 'xx'
+
+
+def test_missing_marp_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(marp_worker, 'SOURCE_DIR', str(tmp_path / 'src'))
+    monkeypatch.setattr(marp_worker, 'OUTPUT_DIR', str(tmp_path / 'out'))
+    monkeypatch.setattr(marp_worker, 'LOG_PATH', str(tmp_path / 'marp.log'))
+    monkeypatch.setattr(marp_worker, 'MARP_EXECUTABLE', str(tmp_path / 'no-such-marp'))
+    with pytest.raises(RuntimeError):
+        marp_worker.render('presentation', '# One', timeout=1)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+def test_template_variables_match_build_js(tmp_path):
+    markdown = textwrap.dedent('''\
+        ---
+        marp: true
+        COURSE_TITLE: "Course"
+        ---
+
+        <!--
+        WEEK: "Week 3"
+        DATE: "Feb 2"
+        _class: title
+        -->
+        # {{COURSE_TITLE}}
+        ## {{WEEK}} {{DATE}}
+
+        ---
+
+        <!-- _class: bullets -->
+        # {{COURSE_TITLE}} {{WEEK}} {{UNKNOWN}}
+        ''')
+    (tmp_path / 'presentation.md').write_text(markdown)
+    (tmp_path / 'output').mkdir()
+    subprocess.run(['node', os.path.join(REPO_ROOT, 'build.js')], cwd=str(tmp_path), check=True, capture_output=True)
+
+    expected = (tmp_path / 'output' / 'presentation.output.md').read_text()
+    assert markdown_renderer.apply_template_variables(markdown) == expected
+
+
+def test_discard_does_not_let_two_renders_of_a_name_overlap(tmp_path, monkeypatch):
+    monkeypatch.setattr(marp_worker, 'SOURCE_DIR', str(tmp_path / 'src'))
+    monkeypatch.setattr(marp_worker, 'OUTPUT_DIR', str(tmp_path / 'out'))
+    inside = []
+    overlaps = []
+
+    def critical_section(*args):
+        inside.append(1)
+        if len(inside) > 1:
+            overlaps.append(len(inside))
+        time.sleep(0.001)
+        inside.pop()
+    # discard() removes its files while holding the name's lock
+    monkeypatch.setattr(marp_worker.os, 'remove', critical_section)
+
+    def render():
+        with marp_worker._render_lock('deck'):
+            critical_section()
+
+    def discard():
+        marp_worker.discard('deck')
+
+    for _ in range(20):
+        threads = [threading.Thread(target=target) for target in (render, discard) * 4]
+        for t in threads:
+            t.start()
+            time.sleep(0.0005)  # Arrive while others hold or wait for the lock
+        for t in threads:
+            t.join()
+    assert not overlaps
+    assert marp_worker._render_locks == {}
@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+from PIL import Image
+from pptx.shapes import shapetree
+
+import asset_index
+import pptx_builder
+
+
+@pytest.fixture
+def template(potx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(asset_index, 'INDEX_PATH', str(tmp_path / 'index.db'))
+    os.makedirs('assets')
+    Image.new('RGB', (400, 100)).save('assets/wide.png')
+    return pptx_builder.prepared_template(str(potx))
+
+
+def _slide(template, layout_name):
+    prs, layout_map = template.open()
+    slide = prs.slides.add_slide(layout_map[layout_name])
+    return slide, pptx_builder.PlaceholderIndex(slide, template.placeholder_geometry[layout_name])
+
+
+def test_index_uses_layout_geometry(template):
+    slide, placeholders = _slide(template, 'Picture with Caption')
+    assert sorted(placeholders.by_type) == [1, 2, 18]
+    picture = placeholders.first(pptx_builder.PICTURE_PLACEHOLDER)
+    assert picture._element.xfrm is None  # Inherited, so read from the cached layout geometry
+    assert placeholders.bounds(picture) == (picture.left, picture.top, picture.width, picture.height)
+
+    placeholders.remove(picture)
+    assert placeholders.first(pptx_builder.PICTURE_PLACEHOLDER) is None
+    assert len(slide.placeholders) == 2
+
+
+def test_populating_a_slide_does_not_rescan_its_shapes(template, monkeypatch):
+    slide, placeholders = _slide(template, 'Picture with Caption')
+    scans = []
+    for cls in (shapetree._BaseShapes, shapetree.SlidePlaceholders):
+        real_iter = cls.__iter__
+        monkeypatch.setattr(cls, '__iter__', lambda self, real_iter=real_iter: scans.append(self) or real_iter(self))
+
+    pptx_builder.populate_content_slide(slide, 'Headline', None, json.dumps(['One', 'Two']), 'wide.png',
+                                        False, placeholders=placeholders)
+    assert scans == []
+
+    monkeypatch.undo()
+    pic = next(shape for shape in slide.shapes if shape.shape_type == 13)  # Picture
+    assert slide.shapes.title.text == 'Headline'
+    assert pic.width / pic.height == pytest.approx(4, rel=0.01)
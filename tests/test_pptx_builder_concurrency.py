@@ -0,0 +1,67 @@
+import io
+import json
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pptx import Presentation
+
+import pptx_builder
+
+EXPORTS = 8
+LAYOUTS = {'bullets': 'Title and Content'}
+
+
+def _slides(n):
+    return [(None, f'Deck {n} slide {i}', None, json.dumps([f'Point {n}.{i}']), None, None, None,
+             False, False, False, False, 'bullets') for i in range(5)]
+
+
+def _build(args):
+    n, template = args
+    buf = io.BytesIO()
+    pptx_builder.build_pptx_from_slides(_slides(n), buf, template, LAYOUTS)
+    return buf.getvalue()
+
+
+def _parts(package):
+    # Member contents; ZIP timestamps are not part of the comparison
+    with zipfile.ZipFile(io.BytesIO(package)) as zf:
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+def _check(results, serial, tmp_path):
+    for n, package in enumerate(results):
+        prs = Presentation(io.BytesIO(package))
+        assert [s.shapes.title.text for s in prs.slides] == [f'Deck {n} slide {i}' for i in range(5)]
+        assert _parts(package) == _parts(serial[n])
+    # Nothing is written next to the caller
+    assert sorted(os.listdir(tmp_path)) == ['template.potx']
+
+
+def test_parallel_thread_exports_match_serial(potx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    jobs = [(n, str(potx)) for n in range(EXPORTS)]
+    serial = [_build(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=EXPORTS) as pool:
+        results = list(pool.map(_build, jobs))
+    _check(results, serial, tmp_path)
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='needs fork')
+def test_parallel_process_exports_match_serial(potx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    jobs = [(n, str(potx)) for n in range(EXPORTS)]
+    serial = [_build(job) for job in jobs]
+    with multiprocessing.get_context('fork').Pool(4) as pool:
+        results = pool.map(_build, jobs)
+    _check(results, serial, tmp_path)
+
+
+def test_build_writes_to_path_and_file_object(potx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    out = tmp_path / 'deck.pptx'
+    pptx_builder.build_pptx_from_slides(_slides(0), str(out), str(potx), LAYOUTS)
+    assert _parts(out.read_bytes()) == _parts(_build((0, str(potx))))
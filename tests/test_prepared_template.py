@@ -0,0 +1,39 @@
+import io
+import json
+import os
+import zipfile
+
+from pptx import Presentation
+
+import pptx_builder
+
+
+def test_template_is_prepared_once_per_revision(potx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = pptx_builder.prepared_template(str(potx))
+    assert pptx_builder.prepared_template(str(potx)) is first
+    assert 'Title and Content' in first.layout_index
+    geometry = first.placeholder_geometry['Title and Content']
+    assert geometry[0][1:] != (None, None, None, None)
+
+    with zipfile.ZipFile(io.BytesIO(first.package)) as zf:
+        content_types = zf.read('[Content_Types].xml').decode('utf-8')
+    assert 'presentationml.presentation.main' in content_types
+
+    # A rewritten template is picked up
+    stat = os.stat(potx)
+    os.utime(potx, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert pptx_builder.prepared_template(str(potx)) is not first
+
+
+def test_build_opens_template_from_memory(potx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    slides = [(None, 'Headline', None, json.dumps(['One']), None, None, None, False, False, False, False, 'bullets')]
+    output = str(tmp_path / 'deck.pptx')
+    assert pptx_builder.build_pptx_from_slides(slides, output, str(potx), {'bullets': 'Title and Content'})
+
+    assert len(Presentation(output).slides) == 1
+    assert sorted(os.listdir(tmp_path)) == ['deck.pptx', 'template.potx']  # No temp_template.pptx
+    # Each build gets its own Presentation; the prepared package is untouched
+    prepared = pptx_builder.prepared_template(str(potx))
+    assert len(prepared.open()[0].slides) == 0
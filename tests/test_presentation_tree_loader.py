@@ -0,0 +1,70 @@
+import json
+import sqlite3
+
+import app
+
+
+SCHEMA = '''
+CREATE TABLE presentations (id INTEGER PRIMARY KEY, name TEXT, front_matter TEXT);
+CREATE TABLE decks (id INTEGER PRIMARY KEY, presentation_id INTEGER, week TEXT, date TEXT,
+                    order_index INTEGER, notes TEXT, topic1 TEXT, topic2 TEXT);
+CREATE TABLE slides (id INTEGER PRIMARY KEY, deck_id INTEGER, slide_class TEXT, headline TEXT,
+                     paragraph TEXT, bullets TEXT, quote TEXT, quote_citation TEXT, image_path TEXT,
+                     order_index INTEGER, is_title INTEGER, hide_headline INTEGER, larger_image INTEGER,
+                     has_bullets INTEGER, has_image INTEGER, has_quote INTEGER, is_gold INTEGER,
+                     is_two_column INTEGER, is_photo_centered INTEGER, template_base TEXT, module TEXT,
+                     master_slide_id INTEGER, fullscreen INTEGER, is_draft INTEGER);
+'''
+
+
+def _make_db(db_path):
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript(SCHEMA)
+    conn.execute('INSERT INTO presentations (id, name, front_matter) VALUES (1, ?, ?)', ('Semester', ''))
+    conn.execute('INSERT INTO presentations (id, name, front_matter) VALUES (2, ?, ?)', ('Other', ''))
+    # Deck order is deliberately different from id order; deck 3 has no slides
+    decks = [(1, 1, 'Week 2', 'Jan 20', 1), (2, 1, 'Week 1', 'Jan 13', 0), (3, 1, 'Week 3', 'Jan 27', 2),
+             (4, 2, 'Other', 'Feb 1', 0)]
+    conn.executemany('INSERT INTO decks (id, presentation_id, week, date, order_index) VALUES (?, ?, ?, ?, ?)', decks)
+    slides = [
+        (1, 1, 'title', '', '[]', 0, 1, 0),
+        (2, 1, 'template-bullets', 'B', json.dumps(['one', 'two']), 2, 0, 1),
+        (3, 1, 'template-quote', 'A', None, 1, 0, 0),
+        (4, 2, 'title', '', '[]', 0, 1, 0),
+        (5, 4, 'title', '', '[]', 0, 1, 0),
+    ]
+    conn.executemany('''INSERT INTO slides (id, deck_id, slide_class, headline, bullets, order_index, is_title, is_draft)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', slides)
+    conn.commit()
+    conn.close()
+
+
+def test_loader_groups_and_orders_decks_and_slides(tmp_path):
+    db_path = tmp_path / 'tree.db'
+    _make_db(db_path)
+    conn = sqlite3.connect(str(db_path))
+
+    decks = app.load_presentation_decks(conn, 1)
+    conn.close()
+
+    assert [d['id'] for d in decks] == [2, 1, 3]
+    assert [s['id'] for s in decks[1]['slides']] == [1, 3, 2]
+    assert decks[2]['slides'] == []
+    bullets_slide = decks[1]['slides'][2]
+    assert bullets_slide['bullets'] == ['one', 'two']
+    assert bullets_slide['isDraft'] is True
+    assert decks[1]['slides'][1]['bullets'] == []
+
+
+def test_presentation_endpoint_uses_tree(tmp_path, monkeypatch):
+    db_path = tmp_path / 'tree_api.db'
+    _make_db(db_path)
+    monkeypatch.setattr(app, 'DB_PATH', str(db_path))
+
+    resp = app.app.test_client().get('/api/presentations/1')
+
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data['name'] == 'Semester'
+    assert [d['week'] for d in data['decks']] == ['Week 1', 'Week 2', 'Week 3']
+    assert [len(d['slides']) for d in data['decks']] == [1, 3, 0]
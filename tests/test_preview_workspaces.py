@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import threading
+import time
+
+import app
+import marp_worker
+import preview_workspaces
+
+
+def test_previews_get_isolated_reusable_workspaces(fake_marp):
+    url_a = preview_workspaces.render('deck-1', '# A')
+    url_b = preview_workspaces.render('deck-1', '# B')
+    assert url_a != url_b
+    assert url_a.startswith('/') and '/previews/deck-1-' in url_a
+
+    # Both previews stay intact side by side
+    path_a = os.path.join(marp_worker.OUTPUT_DIR, 'previews', os.path.basename(url_a))
+    assert open(path_a).read() == '<html># A</html>'
+
+    # Identical content maps to the same workspace
+    assert preview_workspaces.render('deck-1', '# A') == url_a
+    assert preview_workspaces.render('deck-2', '# A') != url_a
+
+
+def test_concurrent_previews_do_not_collide(fake_marp):
+    urls = {}
+
+    def preview(n):
+        urls[n] = preview_workspaces.render('presentation-1', f'# Tab {n}')
+
+    threads = [threading.Thread(target=preview, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(urls.values())) == 4
+    for n, url in urls.items():
+        path = os.path.join(marp_worker.OUTPUT_DIR, 'previews', os.path.basename(url))
+        assert open(path).read() == f'<html># Tab {n}</html>'
+
+
+def test_stale_workspaces_are_collected(fake_marp):
+    old = preview_workspaces.render('deck-1', '# Old')
+    fresh = preview_workspaces.render('deck-1', '# Fresh')
+    old_html = os.path.join(marp_worker.OUTPUT_DIR, 'previews', os.path.basename(old))
+    stale = time.time() - 3600
+    os.utime(old_html, (stale, stale))
+
+    removed = preview_workspaces.collect_garbage(max_age=600)
+    assert removed == [preview_workspaces.workspace_name('deck-1', '# Old')]
+    assert not os.path.exists(old_html)
+    assert not os.path.exists(os.path.join(marp_worker.SOURCE_DIR, 'previews', os.path.basename(old_html)[:-5] + '.md'))
+    assert os.path.exists(os.path.join(marp_worker.OUTPUT_DIR, 'previews', os.path.basename(fresh)))
+
+
+def test_preview_endpoint_returns_workspace_url(fake_marp, tmp_path, monkeypatch):
+    db_path = tmp_path / 'preview.db'
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript('''
+        CREATE TABLE presentations (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE decks (id INTEGER PRIMARY KEY, presentation_id INTEGER, week TEXT, date TEXT, order_index INTEGER);
+        CREATE TABLE slides (id INTEGER PRIMARY KEY, deck_id INTEGER, slide_class TEXT, headline TEXT, paragraph TEXT,
+                             bullets TEXT, quote TEXT, quote_citation TEXT, image_path TEXT, is_title INTEGER,
+                             hide_headline INTEGER, larger_image INTEGER, fullscreen INTEGER, order_index INTEGER);
+        INSERT INTO presentations VALUES (1, 'Course');
+        INSERT INTO decks VALUES (1, 1, 'Week 1', 'Jan 5', 0);
+        INSERT INTO slides (deck_id, slide_class, headline, order_index) VALUES (1, 'bullets', 'Hello', 0);
+    ''')
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(app, 'DB_PATH', str(db_path))
+
+    result = app.app.test_client().post('/api/decks/1/preview').get_json()
+    assert result['success']
+    assert '/previews/deck-1-' in result['url']
+    path = os.path.join(marp_worker.OUTPUT_DIR, 'previews', os.path.basename(result['url']))
+    assert '# Hello' in open(path).read()
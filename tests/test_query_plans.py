@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+import app
+
+
+# The hot queries issued by app.py and the import scripts, with sample parameters
+HOT_QUERIES = [
+    ('SELECT id FROM slides WHERE deck_id = ? ORDER BY order_index', (1,)),
+    ('SELECT MAX(order_index) FROM slides WHERE deck_id = ?', (1,)),
+    ('SELECT id FROM slides WHERE master_slide_id = ? AND id != ?', (1, 2)),
+    ('''SELECT id FROM slides WHERE module = ? AND is_title = 0 AND master_slide_id IS NULL
+        ORDER BY order_index''', ('Intro',)),
+    ('SELECT id, week FROM decks WHERE presentation_id = ? ORDER BY order_index', (1,)),
+    ('''SELECT d.id, s.id FROM decks d LEFT JOIN slides s ON s.deck_id = d.id
+        WHERE d.presentation_id = ? ORDER BY d.order_index, d.id, s.order_index, s.id''', (1,)),
+    ('SELECT name, due_date FROM assignments WHERE name = ?', ('HW1',)),
+    ('SELECT id, due_date, short, name FROM assignments WHERE semester = ? AND short = ?', ('SP2026', 'HW1')),
+]
+
+
+@pytest.fixture
+def indexed_conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'plans.db'))
+    conn.executescript('''
+        CREATE TABLE decks (id INTEGER PRIMARY KEY, presentation_id INTEGER, week TEXT, date TEXT,
+                            order_index INTEGER);
+        CREATE TABLE slides (id INTEGER PRIMARY KEY, deck_id INTEGER, order_index INTEGER, is_title INTEGER,
+                             module TEXT, master_slide_id INTEGER);
+        CREATE TABLE assignments (id INTEGER PRIMARY KEY, semester TEXT, name TEXT, due_date TEXT, short TEXT);
+    ''')
+    app.ensure_indexes(conn.cursor())
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('sql,params', HOT_QUERIES)
+def test_hot_query_uses_index(indexed_conn, sql, params):
+    plan = [row[3] for row in indexed_conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+    scans = [step for step in plan if step.startswith('SCAN')]
+    assert not scans, f"Query regressed to a table scan: {plan}"
@@ -0,0 +1,68 @@
+import hashlib
+import io
+import json
+import os
+import time
+import zipfile
+
+import pytest
+from PIL import Image
+
+import asset_index
+import image_renditions
+import pptx_builder
+
+LAYOUTS = {'bullets-image': 'Picture with Caption'}
+
+
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(asset_index, 'INDEX_PATH', str(tmp_path / 'index.db'))
+    monkeypatch.setattr(image_renditions, 'RENDITION_DIR', str(tmp_path / 'renditions'))
+    os.makedirs('assets')
+    Image.new('RGB', (40, 30), (200, 0, 0)).save('assets/red.png')
+    Image.new('RGB', (30, 40), (0, 0, 200)).save('assets/blue.png')
+
+
+def _build(potx, images, clock):
+    slides = [(None, f'Slide {i}', None, json.dumps(['One']), None, None, image, False, False, False, False,
+               'bullets-image') for i, image in enumerate(images)]
+    buf = io.BytesIO()
+    # Any timestamp taken from the clock would differ between builds
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(time, 'time', lambda: clock)
+        pptx_builder.build_pptx_from_slides(slides, buf, str(potx), LAYOUTS)
+    return buf.getvalue()
+
+
+def test_identical_input_gives_identical_bytes(potx, assets):
+    first = _build(potx, ['red.png', 'blue.png'], 1_000_000_000)
+    second = _build(potx, ['red.png', 'blue.png'], 1_500_000_000)
+    assert hashlib.sha256(first).hexdigest() == hashlib.sha256(second).hexdigest()
+
+    with zipfile.ZipFile(io.BytesIO(first)) as zf:
+        assert {info.date_time for info in zf.infolist()} == {pptx_builder.ZIP_EPOCH}
+        media = {name: zf.read(name) for name in zf.namelist() if name.startswith('ppt/media/')}
+    for name, blob in media.items():
+        assert name == f'ppt/media/image-{hashlib.sha1(blob).hexdigest()[:16]}.png'
+
+    # Image names do not depend on the order images were added in
+    with zipfile.ZipFile(io.BytesIO(_build(potx, ['blue.png', 'red.png'], 1_000_000_000))) as zf:
+        assert sorted(n for n in zf.namelist() if n.startswith('ppt/media/')) == sorted(media)
+
+
+def test_reproducible_normalize(potx, assets):
+    buf = io.BytesIO()
+    pptx_builder.build_pptx_from_slides([], buf, str(potx), LAYOUTS, reproducible=False)
+    package = buf.getvalue()
+    restamped = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(package)) as zin, zipfile.ZipFile(restamped, 'w') as zout:
+        for item in reversed(zin.infolist()):
+            item.date_time = (2020, 5, 5, 12, 0, 0)
+            zout.writestr(item, zin.read(item.filename))
+
+    normalized = pptx_builder.normalize_pptx_bytes(package, reproducible=True)
+    assert normalized != package
+    assert pptx_builder.normalize_pptx_bytes(restamped.getvalue(), reproducible=True) == normalized
+    assert zipfile.ZipFile(io.BytesIO(normalized)).namelist()[0] == '[Content_Types].xml'
@@ -0,0 +1,96 @@
+import sqlite3
+
+import pytest
+
+import app
+import db
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+
+def test_fresh_database_is_fully_migrated(tmp_path):
+    db_path = str(tmp_path / 'fresh.db')
+    conn = db.connect(db_path)
+
+    version = db.migrate(conn, app.MIGRATIONS, db_path)
+
+    assert version == len(app.MIGRATIONS)
+    assert db.schema_version(conn) == len(app.MIGRATIONS)
+    assert 'is_draft' in _columns(conn, 'slides')
+    assert 'uuid' in _columns(conn, 'assignments')
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {name for name, _, _ in app.INDEXES} <= indexes
+    conn.close()
+
+
+def test_current_database_reads_version_once(tmp_path):
+    db_path = str(tmp_path / 'current.db')
+    conn = db.connect(db_path)
+    db.migrate(conn, app.MIGRATIONS, db_path)
+    statements = []
+    conn.set_trace_callback(statements.append)
+
+    assert db.migrate(conn, app.MIGRATIONS, db_path) == len(app.MIGRATIONS)
+    assert statements == ['PRAGMA user_version']
+    conn.close()
+
+
+def test_unversioned_database_is_upgraded(tmp_path):
+    # A database created by an older app.py: no user_version, missing later columns
+    db_path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(db_path)
+    conn.executescript('''
+        CREATE TABLE presentations (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, front_matter TEXT);
+        CREATE TABLE decks (id INTEGER PRIMARY KEY AUTOINCREMENT, presentation_id INTEGER, week TEXT, date TEXT,
+                            order_index INTEGER);
+        CREATE TABLE slides (id INTEGER PRIMARY KEY AUTOINCREMENT, deck_id INTEGER, slide_class TEXT, headline TEXT,
+                             order_index INTEGER, is_title BOOLEAN DEFAULT 0);
+        CREATE TABLE assignments (id INTEGER PRIMARY KEY AUTOINCREMENT, semester TEXT, name TEXT NOT NULL,
+                                  due_date TEXT NOT NULL);
+        INSERT INTO assignments (semester, name, due_date) VALUES ('SP2026', 'HW1', '2026-02-01');
+    ''')
+    conn.close()
+
+    conn = db.connect(db_path)
+    db.migrate(conn, app.MIGRATIONS, db_path)
+
+    assert {'topic1', 'topic2', 'notes'} <= set(_columns(conn, 'decks'))
+    assert {'module', 'master_slide_id', 'fullscreen', 'is_draft'} <= set(_columns(conn, 'slides'))
+    assert conn.execute('SELECT name FROM assignments').fetchall() == [('HW1',)]
+    conn.execute("UPDATE assignments SET uuid = 'abc'")
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO assignments (name, due_date, uuid) VALUES ('HW2', '2026-03-01', 'abc')")
+    conn.close()
+
+
+def test_migrations_run_once_and_failures_roll_back(tmp_path):
+    db_path = str(tmp_path / 'once.db')
+    conn = db.connect(db_path)
+    calls = []
+
+    def create_t(c):
+        calls.append('create_t')
+        c.execute('CREATE TABLE t (v INTEGER)')
+
+    def broken(c):
+        calls.append('broken')
+        c.execute('ALTER TABLE t ADD COLUMN w INTEGER')
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        db.migrate(conn, [create_t, broken], db_path)
+
+    # The first migration stuck; the failing one was rolled back entirely
+    assert db.schema_version(conn) == 1
+    assert _columns(conn, 't') == ['v']
+
+    def add_w(c):
+        calls.append('add_w')
+        c.execute('ALTER TABLE t ADD COLUMN w INTEGER')
+
+    assert db.migrate(conn, [create_t, add_w], db_path) == 2
+    assert db.migrate(conn, [create_t, add_w], db_path) == 2
+    assert calls == ['create_t', 'broken', 'add_w']
+    conn.close()
@@ -0,0 +1,85 @@
+import json
+import sqlite3
+
+import pytest
+
+import app
+from markdown_renderer import DeckContext, SlideRecord
+import slide_html
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    db_path = tmp_path / 'slides.db'
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript('''
+        CREATE TABLE presentations (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE decks (id INTEGER PRIMARY KEY, presentation_id INTEGER, week TEXT, date TEXT, order_index INTEGER);
+        CREATE TABLE slides (id INTEGER PRIMARY KEY, deck_id INTEGER, slide_class TEXT, headline TEXT, paragraph TEXT,
+                             bullets TEXT, quote TEXT, quote_citation TEXT, image_path TEXT, is_title INTEGER,
+                             hide_headline INTEGER, larger_image INTEGER, fullscreen INTEGER, order_index INTEGER);
+        INSERT INTO presentations VALUES (1, 'Course');
+        INSERT INTO decks VALUES (1, 1, 'Week 1', 'Jan 5', 0);
+    ''')
+    conn.execute('INSERT INTO slides (id, deck_id, slide_class, headline, bullets, order_index) VALUES (?, ?, ?, ?, ?, ?)',
+                 (1, 1, 'template-bullets', 'Hello {{WEEK}}', json.dumps(['**One**', 'Two']), 0))
+    conn.execute('INSERT INTO slides (id, deck_id, is_title, order_index) VALUES (2, 1, 1, 1)')
+    conn.commit()
+    monkeypatch.setattr(app, 'DB_PATH', str(db_path))
+    yield app.app.test_client(), conn
+    conn.close()
+
+
+def test_fragment_matches_marp_structure():
+    slide = SlideRecord('template-bullets-image', None, 'Line one\nline two', json.dumps(['A', 'B']),
+                        None, None, 'assets/a.png')
+    fragment, etag = slide_html.render_fragment(slide, DeckContext('Course'))
+    assert fragment == ('<section class="template-bullets-image hide-headline"><p>Line one<br>line two</p>'
+                        '<ul><li>A</li><li>B</li></ul><p><img src="/assets/a.png" alt="Image"></p></section>')
+    assert slide_html.render_fragment(slide, DeckContext('Course')) == (fragment, etag)
+
+    quote = SlideRecord('template-quote', 'Ignored', None, None, 'Be *bold*', 'Someone', None)
+    assert slide_html.render_fragment(quote, DeckContext('Course'))[0] == (
+        '<section class="template-quote"><blockquote><p>Be <em>bold</em></p><p>Someone</p></blockquote></section>')
+
+
+def test_slide_text_is_escaped_and_unsafe_links_dropped():
+    slide = SlideRecord('template-bullets', '<img src=x onerror=alert(1)>', 'One<br>two',
+                        json.dumps(['[site](https://a.test/?q=1&r=2)', '[bad](javascript:alert`1`)',
+                                    '[ctl](\x01javascript:x)', '[page](/assets/a.png)']), None, None, None)
+    fragment, _ = slide_html.render_fragment(slide, DeckContext('Course'))
+    assert '<h1>&lt;img src=x onerror=alert(1)&gt;</h1>' in fragment
+    assert '<p>One<br>two</p>' in fragment
+    assert '<li><a href="https://a.test/?q=1&amp;r=2">site</a></li>' in fragment
+    assert '<li>bad</li><li>ctl</li>' in fragment
+    assert '<li><a href="/assets/a.png">page</a></li>' in fragment
+
+
+def test_preview_endpoint_substitutes_and_revalidates(client):
+    client, _ = client
+    response = client.get('/api/slides/1/preview')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/html'
+    body = response.get_data(as_text=True)
+    assert body.startswith('<section class="template-bullets">')
+    assert '<h1>Hello Week 1</h1>' in body
+    assert '<li><strong>One</strong></li>' in body
+
+    again = client.get('/api/slides/1/preview', headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+
+    title = client.get('/api/slides/2/preview?standalone=1').get_data(as_text=True)
+    assert slide_html.STYLESHEET_URL in title
+    assert '<section class="title"><h1>Course</h1><h2>Week 1</h2><p>Jan 5</p></section>' in title
+
+    assert client.get('/api/slides/99/preview').status_code == 404
+
+
+def test_preview_changes_with_slide_content(client):
+    client, conn = client
+    first = client.get('/api/slides/1/preview')
+    conn.execute("UPDATE slides SET headline = 'Edited' WHERE id = 1")
+    conn.commit()
+    second = client.get('/api/slides/1/preview', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert '<h1>Edited</h1>' in second.get_data(as_text=True)
@@ -0,0 +1,73 @@
+import json
+import sqlite3
+
+import app
+
+
+def _make_db(path):
+    conn = sqlite3.connect(str(path))
+    conn.executescript('''
+        CREATE TABLE presentations (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE decks (id INTEGER PRIMARY KEY, presentation_id INTEGER, week TEXT, date TEXT,
+                            order_index INTEGER);
+        CREATE TABLE slides (id INTEGER PRIMARY KEY, deck_id INTEGER, slide_class TEXT, headline TEXT,
+                             paragraph TEXT, bullets TEXT, quote TEXT, quote_citation TEXT, image_path TEXT,
+                             is_title INTEGER, hide_headline INTEGER, larger_image INTEGER, fullscreen INTEGER,
+                             order_index INTEGER);
+        CREATE TABLE assignments (id INTEGER PRIMARY KEY, name TEXT, due_date TEXT);
+    ''')
+    conn.execute("INSERT INTO assignments (name, due_date) VALUES ('Final Project', '2026-05-07')")
+    conn.execute("INSERT INTO assignments (name, due_date) VALUES ('Pitch', 'TBD')")
+    conn.commit()
+    return conn
+
+
+def test_substitution_table_formats_dates_and_variables(tmp_path):
+    conn = _make_db(tmp_path / 'subs.db')
+    table = app.load_substitutions(conn, week='Week 3', date='Feb 2', course_title=None)
+    conn.close()
+
+    assert table['{assignment:Final Project}'] == 'May 7'
+    assert table['{assignment:Pitch}'] == 'TBD'  # Unparseable dates are kept as-is
+    assert app.substitute_text('{{WEEK}} ({{DATE}})', table) == 'Week 3 (Feb 2)'
+    # Unknown placeholders and unset variables are left literal
+    assert app.substitute_text('{assignment:Nope} {{COURSE_TITLE}}', table) == '{assignment:Nope} {{COURSE_TITLE}}'
+
+
+def test_substitute_slide_row_handles_bullet_json_and_lists():
+    table = {'{assignment:HW1}': 'Jan 9'}
+    row = ('bullets', 'Due {assignment:HW1}', None, json.dumps(['HW1: {assignment:HW1}', 'plain']), '', None, 'img.png')
+    out = app.substitute_slide_row(row, table)
+    assert out[1] == 'Due Jan 9'
+    assert json.loads(out[3]) == ['HW1: Jan 9', 'plain']
+    assert out[6] == 'img.png'
+
+    out = app.substitute_slide_row(('bullets', '', '', ['{assignment:HW1}'], '', ''), table)
+    assert out[3] == ['Jan 9']
+
+
+def test_markdown_export_fetches_assignments_once(tmp_path, monkeypatch):
+    db_path = tmp_path / 'export.db'
+    conn = _make_db(db_path)
+    conn.execute("INSERT INTO presentations (id, name) VALUES (1, 'Course')")
+    conn.execute("INSERT INTO decks (id, presentation_id, week, date, order_index) VALUES (1, 1, 'Week 1', 'Jan 5', 0)")
+    for i in range(5):
+        conn.execute('''INSERT INTO slides (deck_id, slide_class, headline, paragraph, bullets, quote, quote_citation,
+                        image_path, is_title, hide_headline, larger_image, fullscreen, order_index)
+                        VALUES (1, 'bullets', ?, ?, ?, '', '', '', 0, 0, 0, 0, ?)''',
+                     (f'Slide {i} due {{assignment:Final Project}}', '{{WEEK}} recap',
+                      json.dumps(['{assignment:Pitch}']), i))
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(app, 'DB_PATH', str(db_path))
+    statements = []
+    with app.app.app_context():
+        app.get_db().set_trace_callback(statements.append)
+        content, _ = app.generate_presentation_markdown(1)
+
+    assert 'Slide 4 due May 7' in content
+    assert 'Week 1 recap' in content
+    assert '{assignment:' not in content
+    lookups = [s for s in statements if 'FROM assignments' in s and 'ORDER BY id' in s]
+    assert len(lookups) == 1
@@ -0,0 +1,38 @@
+import io
+import json
+import xml.etree.ElementTree as ET
+import zipfile
+
+import pptx_builder
+
+EP = '{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}'
+A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+
+def test_single_pass_save_applies_package_fixups(potx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    slides = [(None, f'Headline {i}', None, json.dumps(['One two', 'Three']), None, None, None,
+               False, False, False, False, 'bullets') for i in range(3)]
+    buf = io.BytesIO()
+    pptx_builder.build_pptx_from_slides(slides, buf, str(potx), {'bullets': 'Title and Content'})
+
+    with zipfile.ZipFile(io.BytesIO(buf.getvalue())) as zf:
+        names = zf.namelist()
+        parts = {name: zf.read(name) for name in names}
+    assert names[0] == '[Content_Types].xml'
+    assert len(names) == len(set(names))
+
+    app = ET.fromstring(parts['docProps/app.xml'])
+    assert app.find(f'{EP}Slides').text == '3'
+    assert app.find(f'{EP}Words').text == str(3 * 5)  # "Headline N" + "One two" + "Three"
+    assert [t.text for t in app.find(f'{EP}TitlesOfParts')] == ['Headline 0', 'Headline 1', 'Headline 2']
+
+    overrides = [o.get('PartName') for o in ET.fromstring(parts['[Content_Types].xml']) if o.tag.endswith('Override')]
+    assert overrides[-1] == '/ppt/presentation.xml'
+    assert overrides.index('/docProps/app.xml') > overrides.index('/ppt/slides/slide1.xml')
+
+    for name, data in parts.items():
+        if name.endswith(('.xml', '.rels')):
+            assert data.startswith(b'<?xml version="1.0"'), name
+    for paragraph in ET.fromstring(parts['ppt/slides/slide1.xml']).iter(f'{A}p'):
+        assert paragraph[0].tag == f'{A}pPr'
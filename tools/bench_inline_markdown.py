@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Benchmark inline-markdown parsing of slide text: the per-call regex vs. the memoized tokenizer.
+
+Takes every bullet and headline in docs/J4734.md and parses them once per deck,
+as an export of a presentation that repeats the same module slides in each
+deck would. Reports the median time for tokenizing alone and for adding the
+runs to python-pptx paragraphs.
+
+Usage: python3 tools/bench_inline_markdown.py [--source docs/J4734.md] [--decks 30] [--repeat 5]
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pptx import Presentation  # noqa: E402
+from pptx.util import Inches  # noqa: E402
+
+import pptx_builder  # noqa: E402
+
+ITEM = re.compile(r'^\s*(?:[-*]|#{1,2}) (.+)$')
+
+
+def load_lines(path):
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    body = text.split('\n---\n', 1)[-1]  # Skip the front matter
+    return [m.group(1).strip() for m in map(ITEM.match, body.splitlines()) if m]
+
+
+def tokenize_per_call(text):
+    """The previous tokenizer: re-import and re-run the alternation on every call."""
+    import re
+    pattern = r'(`[^`]+`|\*\*[\s\S]*?\*\*|\*[\s\S]*?\*|[^*`]+|[*`])'
+    runs = []
+    for part in re.findall(pattern, text, re.DOTALL):
+        if part.startswith('`') and part.endswith('`') and len(part) > 2:
+            runs.append((part[1:-1], False, False, True))
+        elif part.startswith('**') and part.endswith('**') and len(part) > 4:
+            runs.append((part[2:-2], True, False, False))
+        elif part.startswith('*') and part.endswith('*') and len(part) > 2 and not part.startswith('**'):
+            runs.append((part[1:-1], False, True, False))
+        elif part:
+            runs.append((part, False, False, False))
+    return runs
+
+
+def parse_per_call(paragraph, text):
+    for part, bold, italic, code in tokenize_per_call(text):
+        run = paragraph.add_run()
+        run.text = part
+        if code:
+            run.font.name = 'Courier New'
+        if bold:
+            run.font.bold = True
+        if italic:
+            run.font.italic = True
+
+
+def text_frame():
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    return slide.shapes.add_textbox(0, 0, Inches(4), Inches(4)).text_frame
+
+
+def median_ms(fn, repeat, setup=lambda: None):
+    samples = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark inline-markdown parsing')
+    parser.add_argument('--source', default='docs/J4734.md', help='Markdown file to take bullets and headlines from')
+    parser.add_argument('--decks', type=int, default=30, help='Times each line is parsed')
+    parser.add_argument('--repeat', type=int, default=5, help='Samples per measurement')
+    args = parser.parse_args()
+
+    lines = load_lines(args.source)
+    clear = pptx_builder.inline_runs.cache_clear
+    print(f"{len(lines)} lines x {args.decks} decks")
+
+    def tokenize(fn):
+        return lambda: [fn(line) for _ in range(args.decks) for line in lines]
+
+    def parse(fn):
+        def run():
+            tf = text_frame()
+            for _ in range(args.decks):
+                for line in lines:
+                    fn(tf.add_paragraph(), line)
+        return run
+
+    old = median_ms(tokenize(tokenize_per_call), args.repeat)
+    new = median_ms(tokenize(pptx_builder.inline_runs), args.repeat, setup=clear)
+    print(f"{'tokenize':>10} {'per-call ms':>12} {old:>9.2f} {'memoized ms':>12} {new:>9.2f} {old / new:>7.1f}x")
+    old = median_ms(parse(parse_per_call), args.repeat)
+    new = median_ms(parse(pptx_builder.parse_markdown_to_paragraph), args.repeat, setup=clear)
+    print(f"{'paragraphs':>10} {'per-call ms':>12} {old:>9.2f} {'memoized ms':>12} {new:>9.2f} {old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
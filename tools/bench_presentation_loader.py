@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Benchmark GET /api/presentations/<id> tree loading: per-deck queries vs. the single JOIN loader.
+
+Builds a throwaway database per deck count (10 slides per deck by default) and
+reports the median latency of each approach.
+
+Usage: python3 tools/bench_presentation_loader.py [--decks 5,10,30,60,120] [--slides 10] [--repeat 50]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+SCHEMA = '''
+CREATE TABLE decks (id INTEGER PRIMARY KEY, presentation_id INTEGER, week TEXT, date TEXT,
+                    order_index INTEGER, notes TEXT, topic1 TEXT, topic2 TEXT);
+CREATE TABLE slides (id INTEGER PRIMARY KEY, deck_id INTEGER, slide_class TEXT, headline TEXT,
+                     paragraph TEXT, bullets TEXT, quote TEXT, quote_citation TEXT, image_path TEXT,
+                     order_index INTEGER, is_title INTEGER, hide_headline INTEGER, larger_image INTEGER,
+                     has_bullets INTEGER, has_image INTEGER, has_quote INTEGER, is_gold INTEGER,
+                     is_two_column INTEGER, is_photo_centered INTEGER, template_base TEXT, module TEXT,
+                     master_slide_id INTEGER, fullscreen INTEGER, is_draft INTEGER);
+CREATE TABLE assignments (id INTEGER PRIMARY KEY, semester TEXT, name TEXT, due_date TEXT, short TEXT);
+'''
+
+
+def build_db(path, deck_count, slides_per_deck):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    app.ensure_indexes(conn.cursor())
+    slide_id = 1
+    for d in range(deck_count):
+        conn.execute('INSERT INTO decks (id, presentation_id, week, date, order_index) VALUES (?, 1, ?, ?, ?)',
+                     (d + 1, f'Week {d + 1}', 'Jan 1', d))
+        for s in range(slides_per_deck):
+            conn.execute('''INSERT INTO slides (id, deck_id, slide_class, headline, paragraph, bullets, order_index, is_title)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                         (slide_id, d + 1, 'template-bullets', f'Headline {slide_id}', 'Some paragraph text',
+                          json.dumps([f'Bullet {i}' for i in range(4)]), s, 1 if s == 0 else 0))
+            slide_id += 1
+    conn.commit()
+    return conn
+
+
+def load_per_deck(conn, presentation_id):
+    """The previous loader: one slides query per deck."""
+    c = conn.cursor()
+    c.execute('SELECT id, week, date, order_index, notes, topic1, topic2 FROM decks WHERE presentation_id = ? ORDER BY order_index',
+              (presentation_id,))
+    decks = []
+    for deck_row in c.fetchall():
+        c.execute('''SELECT id, slide_class, headline, paragraph, bullets, quote, quote_citation,
+                    image_path, order_index, is_title, hide_headline, larger_image, has_bullets, has_image,
+                    has_quote, is_gold, is_two_column, is_photo_centered, template_base, module, master_slide_id, fullscreen, is_draft FROM slides
+                    WHERE deck_id = ? ORDER BY order_index''', (deck_row[0],))
+        slides = [{'id': s[0], 'slideClass': s[1], 'headline': s[2], 'paragraph': s[3],
+                   'bullets': json.loads(s[4]) if s[4] else [], 'quote': s[5],
+                   'quoteCitation': s[6], 'imagePath': s[7], 'orderIndex': s[8], 'isTitle': bool(s[9]),
+                   'hideHeadline': bool(s[10]), 'largerImage': bool(s[11]), 'hasBullets': bool(s[12]), 'hasImage': bool(s[13]),
+                   'hasQuote': bool(s[14]), 'isGold': bool(s[15]), 'isTwoColumn': bool(s[16]),
+                   'isPhotoCentered': bool(s[17]), 'templateBase': s[18], 'module': s[19], 'masterSlideId': s[20],
+                   'fullscreen': bool(s[21]), 'isDraft': bool(s[22])}
+                  for s in c.fetchall()]
+        decks.append({'id': deck_row[0], 'week': deck_row[1], 'date': deck_row[2], 'orderIndex': deck_row[3],
+                      'notes': deck_row[4], 'topic1': deck_row[5], 'topic2': deck_row[6], 'slides': slides})
+    return decks
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark presentation tree loading')
+    parser.add_argument('--decks', default='5,10,30,60,120', help='Comma-separated deck counts')
+    parser.add_argument('--slides', type=int, default=10, help='Slides per deck')
+    parser.add_argument('--repeat', type=int, default=50, help='Samples per measurement')
+    args = parser.parse_args()
+
+    print(f"{'decks':>6} {'slides':>7} {'per-deck ms':>12} {'join ms':>9} {'speedup':>8}")
+    for deck_count in [int(x) for x in args.decks.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = build_db(os.path.join(tmp, 'bench.db'), deck_count, args.slides)
+            assert load_per_deck(conn, 1) == app.load_presentation_decks(conn, 1)
+            old = median_ms(lambda: load_per_deck(conn, 1), args.repeat)
+            new = median_ms(lambda: app.load_presentation_decks(conn, 1), args.repeat)
+            conn.close()
+        print(f"{deck_count:>6} {deck_count * args.slides:>7} {old:>12.2f} {new:>9.2f} {old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()